@@ -1,15 +1,50 @@
-from datetime import datetime
-
-from fastapi import FastAPI, HTTPException
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+from uuid import UUID
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from postgrest.exceptions import APIError
 from pydantic import BaseModel
 
-from rag import build_doctor_chain, settings
-from rag.dashboard import get_dashboard_data
-from rag.patient_context import fetch_patient_data
-from rag.vectorstore import get_supabase_client
-
-app = FastAPI(title="HackRare 2026 — Physician RAG Chatbot")
+from rag import admission, metrics, settings, singleflight
+from rag.chains import chain_cache_stats
+from rag.chat_sessions import astream_turn, ask, chat_session_stats, end_session, get_session
+from rag.context_packer import ContextReport
+from rag.embeddings import get_embeddings
+from rag.jobs import UnknownJobKind, get_job_queue
+from rag.prewarm import PrewarmScheduler, prewarm
+from rag.prompts import CHAT_PROSE_INSTRUCTION, INTERPRETATION_PROMPT, SUMMARY_PROMPT
+from rag.result_cache import aresult_key, get_result, patient_data_changed, result_cache_stats
+from rag.dashboard import aget_dashboard_data
+from rag.roster import InvalidCursor, afetch_patient_roster
+from rag.vectorstore import get_async_supabase_client
+from rag.warmup import readiness, warm_up
+
+_prewarm_scheduler: PrewarmScheduler | None = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _prewarm_scheduler
+    # In the background, so the process answers /health while it warms (see /ready)
+    warmup_task = asyncio.create_task(warm_up()) if settings.warmup_enabled else None
+    if settings.prewarm_enabled:
+        _prewarm_scheduler = PrewarmScheduler()
+        _prewarm_scheduler.start()
+    yield
+    if warmup_task:
+        warmup_task.cancel()
+    if _prewarm_scheduler:
+        _prewarm_scheduler.stop()
+
+
+app = FastAPI(title="HackRare 2026 — Physician RAG Chatbot", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -20,11 +55,33 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Route template, not the raw path, so patient ids don't become label values
+        route = request.scope.get("route")
+        metrics.HTTP_REQUEST_SECONDS.labels(
+            request.method, getattr(route, "path", "unmatched"), str(status)
+        ).observe(time.perf_counter() - start)
+
+
 class ChatRequest(BaseModel):
     patient_id: str
     question: str
 
 
+class ChatSessionRequest(BaseModel):
+    physician_id: str
+    patient_id: str
+    question: str
+
+
 class SymptomLogEntry(BaseModel):
     symptom_name: str
     severity: int  # 1-10
@@ -37,95 +94,145 @@ class SymptomLogRequest(BaseModel):
 
 class ChatResponse(BaseModel):
     answer: str
+    context: dict | None = None  # packed-context token report (ContextReport)
+
+
+class ChatSessionResponse(BaseModel):
+    answer: str
+    session: dict  # turns, compactions, history tokens, packed-context report
+
+
+class JobRequest(BaseModel):
+    kind: str  # "summary" | "interpretation"
+    patient_id: str
+
+
+class PanelJobRequest(BaseModel):
+    kind: str
+    patient_ids: list[str] | None = None  # default: every patient on the roster
+
+
+ADMISSION_RETRY_AFTER_SECONDS = 2
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def _sse_event(data: dict, event: str | None = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+async def _stream_chain(patient_id: str, question: str, cached: bool = False, priority: int = admission.INTERACTIVE):
+    """
+    Yield Server-Sent Events for each token chunk as Ollama produces it.
+    With cached=True a stored result is replayed as a single chunk, and a
+    completed generation is stored for the next caller.  Identical requests
+    in flight share one generation (see rag/singleflight.py).
+    """
+    try:
+        key = await aresult_key(patient_id, question, settings.doctor_model)
+        hit = get_result(key) if cached else None
+        if hit is not None:
+            yield _sse_event({"token": hit})
+            yield _sse_event({"cached": True}, event="done")
+            return
+        report = ContextReport()
+        async for chunk in singleflight.astream(patient_id, question, key, store=cached, priority=priority, report=report):
+            yield _sse_event({"token": chunk})
+        yield _sse_event({"context": report.to_dict()}, event="done")
+    except Exception as e:
+        yield _sse_event({"detail": str(e)}, event="error")
 
 
-SUMMARY_PROMPT = """Max 90 words. Do NOT mention the patient's name or disease. Start directly with symptoms. Summarize: meds and adherence, symptom severity, upcoming appointments. One paragraph, no line breaks."""
+def _admission_error(e: admission.AdmissionRejected) -> HTTPException:
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(ADMISSION_RETRY_AFTER_SECONDS)})
 
-INTERPRETATION_PROMPT = """Based on the retrieved patient context, write a short "In plain English" paragraph (2-3 sentences). Use simple language for quick physician review. Write in plain prose only—no markdown, newlines, bullet points, or asterisks."""
 
-CHAT_PROSE_INSTRUCTION = " Write as ONE continuous paragraph with no line breaks—no newlines, no Enter. Plain prose only."
+def _sse_response(patient_id: str, question: str, cached: bool = False, priority: int = admission.INTERACTIVE) -> StreamingResponse:
+    # Reject before the 200 goes out when the class queue is already full
+    try:
+        admission.get_gate(settings.doctor_model).check(priority)
+    except admission.AdmissionRejected as e:
+        raise _admission_error(e)
+    return StreamingResponse(
+        _stream_chain(patient_id, question, cached=cached, priority=priority),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
+async def _cached_generation(patient_id: str, prompt: str) -> tuple[str, dict | None]:
+    """
+    Doctor-chain answer for a fixed prompt, reused until the patient's data changes.
+    Also returns the packed-context report (None when served from the cache).
+    """
+    key = await aresult_key(patient_id, prompt, settings.doctor_model)
+    answer = get_result(key)
+    if answer is not None:
+        return answer, None
+    report = ContextReport()
+    answer = await singleflight.agenerate(patient_id, prompt, key, store=True, priority=admission.SUMMARY, report=report)
+    return answer, report.to_dict()
 
 
 @app.get("/health")
-def health():
+async def health():
     return {"status": "ok", "model": settings.doctor_model}
 
 
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 200 once the DB client and models are warmed (rag/warmup.py), else 503."""
+    state = readiness()
+    return JSONResponse(status_code=200 if state["ready"] else 503, content=state)
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus exposition of pipeline stage, Ollama, admission and request latency metrics."""
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss counters for the in-process caches."""
+    embeddings = get_embeddings()
+    return {
+        "chains": chain_cache_stats(),
+        "results": result_cache_stats(),
+        "inflight": singleflight.singleflight_stats(),
+        "chat_sessions": chat_session_stats(),
+        "embeddings": embeddings.stats() if hasattr(embeddings, "stats") else None,
+    }
+
+
+@app.get("/admission/stats")
+async def admission_stats():
+    """Per-model slots in use, queue depth, admissions, rejections and wait times by priority class."""
+    return admission.admission_stats()
+
+
 @app.get("/patients")
-def list_patients():
-    """List patients for the physician panel."""
+async def list_patients(cursor: str | None = None, limit: int | None = None):
+    """List patients for the physician panel (one roster RPC per page)."""
     try:
-        client = get_supabase_client()
-        r = (
-            client.table("patients")
-            .select("id, name, disease_id, diseases(name)")
-            .execute()
-        )
-        rows = r.data or []
-
-        result = []
-        for p in rows:
-            disease = p.get("diseases") or p.get("disease")
-            if isinstance(disease, dict):
-                condition = disease.get("name", "Unknown")
-            elif isinstance(disease, list) and disease:
-                condition = disease[0].get("name", "Unknown") if isinstance(disease[0], dict) else "Unknown"
-            elif p.get("disease_id"):
-                dr = client.table("diseases").select("name").eq("id", p["disease_id"]).maybe_single().execute()
-                condition = dr.data.get("name", "Unknown") if dr.data else "Unknown"
-            else:
-                condition = "Unknown"
-
-            apt_r = (
-                client.table("appointments")
-                .select("scheduled_at")
-                .eq("patient_id", p["id"])
-                .order("scheduled_at", desc=True)
-                .limit(1)
-                .execute()
-            )
-            last_apt = (apt_r.data or [{}])[0].get("scheduled_at", "")
-            if last_apt:
-                try:
-                    dt = datetime.fromisoformat(str(last_apt).replace("Z", "+00:00"))
-                    last_visit = dt.strftime("%b %d")
-                except (ValueError, TypeError):
-                    last_visit = str(last_apt)[:10]
-            else:
-                last_visit = "N/A"
-
-            # Check for recent high-severity symptoms (alert)
-            sl_r = (
-                client.table("symptom_logs")
-                .select("severity")
-                .eq("patient_id", p["id"])
-                .order("logged_at", desc=True)
-                .limit(5)
-                .execute()
-            )
-            sevs = [s.get("severity", 0) or 0 for s in (sl_r.data or [])]
-            max_sev = max(sevs) if sevs else 0
-            severity = "High" if max_sev >= 7 else ("Moderate" if max_sev >= 5 else "Low")
-            alert = max_sev >= 6
-
-            result.append({
-                "id": p["id"],
-                "name": p["name"],
-                "condition": condition,
-                "lastVisit": last_visit,
-                "severity": severity,
-                "alert": alert,
-            })
-        return {"patients": result}
+        return await afetch_patient_roster(cursor=cursor, limit=limit)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/patients/{patient_id}/dashboard")
-def get_patient_dashboard(patient_id: str):
-    """Dashboard metrics and chart data (no LLM)."""
+async def get_patient_dashboard(patient_id: str, include_history: bool = True):
+    """
+    Dashboard metrics and chart data (no LLM).  The charts cover the
+    DASHBOARD_ROLLUP_DAYS window; the history lists are the patient's full
+    history, and include_history=false skips them.
+    """
     try:
-        data = get_dashboard_data(patient_id)
+        data = await aget_dashboard_data(patient_id, include_history=include_history)
         raw = data.get("raw", {})
         return {
             "patient": data["patient"],
@@ -148,59 +255,61 @@ def get_patient_dashboard(patient_id: str):
 
 
 @app.get("/patients/{patient_id}/summary")
-def get_patient_summary(patient_id: str):
+async def get_patient_summary(patient_id: str):
     """AI-generated clinical summary."""
     try:
-        chain = build_doctor_chain(patient_id=patient_id, streaming=False)
-        answer = chain.invoke(SUMMARY_PROMPT)
-        return {"summary": answer}
+        answer, context = await _cached_generation(patient_id, SUMMARY_PROMPT)
+        return {"summary": answer, "context": context}
+    except admission.AdmissionRejected as e:
+        raise _admission_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/patients/{patient_id}/summary/stream")
+async def stream_patient_summary(patient_id: str):
+    """AI-generated clinical summary, streamed token by token (SSE)."""
+    return _sse_response(patient_id, SUMMARY_PROMPT, cached=True, priority=admission.SUMMARY)
+
+
 @app.get("/patients/{patient_id}/interpretation")
-def get_patient_interpretation(patient_id: str):
+async def get_patient_interpretation(patient_id: str):
     """Plain-English interpretation of recent data."""
     try:
-        chain = build_doctor_chain(patient_id=patient_id, streaming=False)
-        answer = chain.invoke(INTERPRETATION_PROMPT)
-        return {"interpretation": answer}
+        answer, context = await _cached_generation(patient_id, INTERPRETATION_PROMPT)
+        return {"interpretation": answer, "context": context}
+    except admission.AdmissionRejected as e:
+        raise _admission_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/patients/{patient_id}/interpretation/stream")
+async def stream_patient_interpretation(patient_id: str):
+    """Plain-English interpretation, streamed token by token (SSE)."""
+    return _sse_response(patient_id, INTERPRETATION_PROMPT, cached=True, priority=admission.SUMMARY)
+
+
 class AdherenceRequest(BaseModel):
     medication_id: str
     taken: bool = True
 
 
 @app.post("/patients/{patient_id}/adherence")
-def log_medication_adherence(patient_id: str, body: AdherenceRequest):
+async def log_medication_adherence(patient_id: str, body: AdherenceRequest):
     """Mark a medication as taken or not taken for today."""
     try:
-        client = get_supabase_client()
+        client = await get_async_supabase_client()
         medication_id = body.medication_id
         taken = body.taken
-        mr = client.table("medications").select("id").eq("patient_id", patient_id).eq("id", medication_id).maybe_single().execute()
-        if not mr.data:
+        mr = await client.table("medications").select("id").eq("patient_id", patient_id).eq("id", medication_id).maybe_single().execute()
+        if not mr or not mr.data:
             raise HTTPException(status_code=404, detail="Medication not found for this patient")
-        today = datetime.utcnow().date().isoformat()
-        existing = (
-            client.table("medication_adherence_logs")
-            .select("id")
-            .eq("medication_id", medication_id)
-            .eq("logged_date", today)
-            .execute()
-        )
-        if existing.data and len(existing.data) > 0:
-            client.table("medication_adherence_logs").update({"taken": taken}).eq("id", existing.data[0]["id"]).execute()
-        else:
-            client.table("medication_adherence_logs").insert({
-                "medication_id": medication_id,
-                "logged_date": today,
-                "taken": taken,
-                "notes": None,
-            }).execute()
+        await client.table("medication_adherence_logs").upsert(
+            {"medication_id": medication_id, "logged_date": datetime.utcnow().date().isoformat(), "taken": taken},
+            on_conflict="medication_id,logged_date",
+        ).execute()
+        patient_data_changed(patient_id)
         return {"ok": True}
     except HTTPException:
         raise
@@ -209,44 +318,50 @@ def log_medication_adherence(patient_id: str, body: AdherenceRequest):
 
 
 @app.post("/patients/{patient_id}/symptom-logs")
-def log_symptoms(patient_id: str, request: SymptomLogRequest):
+async def log_symptoms(patient_id: str, request: SymptomLogRequest):
     """Patient self-reports symptom severity. Looks up or creates symptom for patient's disease."""
     try:
-        client = get_supabase_client()
-        r = client.table("patients").select("id, disease_id").eq("id", patient_id).maybe_single().execute()
-        if not r.data:
+        client = await get_async_supabase_client()
+        r = await client.table("patients").select("id, disease_id").eq("id", patient_id).maybe_single().execute()
+        if not r or not r.data:
             raise HTTPException(status_code=404, detail="Patient not found")
         disease_id = r.data.get("disease_id")
         if not disease_id:
             raise HTTPException(status_code=400, detail="Patient has no disease")
 
-        from datetime import datetime
         now = datetime.utcnow().isoformat() + "Z"
-        inserted = 0
+        entries = [e for e in request.entries if e.symptom_name and e.symptom_name.strip() and 1 <= e.severity <= 10]
 
-        symr = client.table("symptoms").select("id, name").eq("disease_id", disease_id).execute()
+        symr = await client.table("symptoms").select("id, name").eq("disease_id", disease_id).execute()
         existing = {s["name"].lower(): s["id"] for s in (symr.data or [])}
 
-        for entry in request.entries:
-            if not entry.symptom_name or entry.severity < 1 or entry.severity > 10:
-                continue
+        # Unknown names: one bulk insert (deduplicated case-insensitively)
+        missing = {}
+        for entry in entries:
             name = entry.symptom_name.strip()
-            symptom_id = existing.get(name.lower())
-            if not symptom_id:
-                ins = client.table("symptoms").insert({"disease_id": disease_id, "name": name}).execute()
-                symptom_id = (ins.data or [{}])[0].get("id") if ins.data else None
-                if symptom_id:
-                    existing[name.lower()] = symptom_id
-            if symptom_id:
-                client.table("symptom_logs").insert({
-                    "patient_id": patient_id,
-                    "symptom_id": symptom_id,
-                    "logged_at": now,
-                    "severity": entry.severity,
-                    "notes": entry.notes or None,
-                    "curated_by": None,
-                }).execute()
-                inserted += 1
+            if name.lower() not in existing:
+                missing.setdefault(name.lower(), name)
+        if missing:
+            ins = await client.table("symptoms").insert([{"disease_id": disease_id, "name": n} for n in missing.values()]).execute()
+            existing.update({s["name"].lower(): s["id"] for s in (ins.data or [])})
+
+        rows = [
+            {
+                "patient_id": patient_id,
+                "symptom_id": existing[entry.symptom_name.strip().lower()],
+                "logged_at": now,
+                "severity": entry.severity,
+                "notes": entry.notes or None,
+                "curated_by": None,
+            }
+            for entry in entries
+            if existing.get(entry.symptom_name.strip().lower())
+        ]
+        if rows:
+            await client.table("symptom_logs").insert(rows).execute()
+        inserted = len(rows)
+        if inserted:
+            patient_data_changed(patient_id)
         return {"ok": True, "inserted": inserted}
     except HTTPException:
         raise
@@ -254,13 +369,204 @@ def log_symptoms(patient_id: str, request: SymptomLogRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+class SyncSymptomEvent(BaseModel):
+    idempotency_key: str
+    symptom_name: str
+    severity: int  # 1-10
+    logged_at: datetime
+    notes: str | None = None
+
+
+class SyncAdherenceEvent(BaseModel):
+    idempotency_key: str
+    medication_id: UUID
+    logged_date: date
+    taken: bool = True
+
+
+class PatientSyncRequest(BaseModel):
+    symptoms: list[SyncSymptomEvent] = []
+    adherence: list[SyncAdherenceEvent] = []
+
+
+@app.post("/patients/{patient_id}/sync")
+async def sync_patient_events(patient_id: str, request: PatientSyncRequest):
+    """
+    Apply a device's offline backlog of symptom and adherence events in one transaction.
+    Events already applied (same idempotency_key) are skipped, so uploads can be retried.
+    """
+    try:
+        client = await get_async_supabase_client()
+        payload = request.model_dump(mode="json")
+        r = await client.rpc("apply_patient_sync", {
+            "p_patient_id": patient_id,
+            "p_symptoms": payload["symptoms"],
+            "p_adherence": payload["adherence"],
+        }).execute()
+        result = r.data or {}
+        if result.get("applied"):
+            patient_data_changed(patient_id)
+        return {"ok": True, **result}
+    except APIError as e:
+        if e.code == "P0002":
+            raise HTTPException(status_code=404, detail="Patient not found")
+        raise HTTPException(status_code=500, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/jobs", status_code=202)
+async def submit_job(request: JobRequest):
+    """Queue a summary / interpretation generation; poll GET /jobs/{id}."""
+    try:
+        job = get_job_queue().submit(request.kind, request.patient_id)
+    except UnknownJobKind as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"job_id": job.id, "status": job.status}
+
+
+@app.post("/jobs/panel", status_code=202)
+async def submit_panel_jobs(request: PanelJobRequest):
+    """Queue one generation per patient at batch priority (e.g. nightly for the whole panel)."""
+    try:
+        return await run_in_threadpool(get_job_queue().submit_panel, request.kind, request.patient_ids)
+    except UnknownJobKind as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/prewarm", status_code=202)
+async def run_prewarm(horizon_hours: float | None = None):
+    """Queue a pre-warm pass for upcoming appointments now; returns its batch id."""
+    try:
+        return await run_in_threadpool(prewarm, horizon_hours)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/prewarm/status")
+async def prewarm_status():
+    if _prewarm_scheduler is None:
+        return {"enabled": False}
+    return {
+        "enabled": True,
+        "interval_minutes": _prewarm_scheduler.interval_minutes,
+        "horizon_hours": _prewarm_scheduler.horizon_hours,
+        "last_run": _prewarm_scheduler.last_run,
+    }
+
+
+@app.get("/jobs/stats")
+async def job_stats():
+    return get_job_queue().stats()
+
+
+@app.get("/jobs/batches/{batch_id}")
+async def get_job_batch(batch_id: str):
+    status = get_job_queue().batch_status(batch_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return status
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {k: v for k, v in job.to_dict().items() if k != "result"}
+
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """The generated text once the job succeeded; 202 while it is still queued or running."""
+    job = get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=job.error)
+    if job.status != "succeeded":
+        return JSONResponse(status_code=202, content={"job_id": job.id, "status": job.status})
+    return {"job_id": job.id, "kind": job.kind, "patient_id": job.patient_id, "result": job.result}
+
+
 @app.post("/chat", response_model=ChatResponse)
-def chat(request: ChatRequest):
+async def chat(request: ChatRequest):
     """Run the physician RAG chain for a clinical query about a patient."""
     try:
-        chain = build_doctor_chain(patient_id=request.patient_id, streaming=False)
         question = request.question + CHAT_PROSE_INSTRUCTION
-        answer = chain.invoke(question)
-        return ChatResponse(answer=answer)
+        key = await aresult_key(request.patient_id, question, settings.doctor_model)
+        report = ContextReport()
+        answer = await singleflight.agenerate(request.patient_id, question, key, report=report)
+        return ChatResponse(answer=answer, context=report.to_dict())
+    except admission.AdmissionRejected as e:
+        raise _admission_error(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Streaming variant of /chat (Server-Sent Events).
+    Emits `data: {"token": ...}` per chunk, then `event: done` carrying the
+    packed-context report (or `event: error`).
+    """
+    return _sse_response(request.patient_id, request.question + CHAT_PROSE_INSTRUCTION)
+
+
+def _check_interactive_admission() -> None:
+    try:
+        admission.get_gate(settings.doctor_model).check(admission.INTERACTIVE)
+    except admission.AdmissionRejected as e:
+        raise _admission_error(e)
+
+
+@app.post("/chat/sessions", response_model=ChatSessionResponse)
+async def chat_session(request: ChatSessionRequest):
+    """
+    Ask within the physician's chat session for this patient (see rag/chat_sessions.py).
+    The first question retrieves the patient context; follow-ups reuse it.
+    """
+    session = get_session(request.physician_id, request.patient_id)
+    try:
+        answer = await ask(session, request.question)
+        return ChatSessionResponse(answer=answer, session=session.to_dict())
+    except admission.AdmissionRejected as e:
+        raise _admission_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+async def _stream_session_turn(physician_id: str, patient_id: str, question: str):
+    session = get_session(physician_id, patient_id)
+    try:
+        async for chunk in astream_turn(session, question):
+            yield _sse_event({"token": chunk})
+        yield _sse_event({"session": session.to_dict()}, event="done")
+    except Exception as e:
+        yield _sse_event({"detail": str(e)}, event="error")
+
+
+@app.post("/chat/sessions/stream")
+async def chat_session_stream(request: ChatSessionRequest):
+    """
+    Streaming variant of /chat/sessions (Server-Sent Events).
+    Emits `data: {"token": ...}` per chunk, then `event: done` carrying the
+    session state (or `event: error`).
+    """
+    _check_interactive_admission()
+    return StreamingResponse(
+        _stream_session_turn(request.physician_id, request.patient_id, request.question),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
+@app.delete("/chat/sessions/{physician_id}/{patient_id}")
+async def delete_chat_session(physician_id: str, patient_id: str):
+    """End a chat session (e.g. when the physician closes the patient)."""
+    if not end_session(physician_id, patient_id):
+        raise HTTPException(status_code=404, detail="No chat session for this physician and patient")
+    return {"status": "ended"}
@@ -0,0 +1,13 @@
+"""
+bench — Load-test harness for api.py with local Supabase and Ollama stand-ins.
+
+  synthetic.py      deterministic synthetic patients, logs and RAG chunks
+  fake_supabase.py  PostgREST/RPC-compatible in-memory backend
+  fake_ollama.py    Ollama-compatible chat (simulated token speeds) and embeddings
+  loadtest.py       closed-loop load generator, p50/p95/p99 + requests/s report
+  run.py            starts the fakes and the API, then runs loadtest
+  import_time.py    cold-import time of api / rag in fresh interpreters (-X importtime)
+
+Run from the repository root:
+    python -m bench.run --duration 30 --concurrency 16 --out bench/baseline.json
+"""
@@ -0,0 +1,159 @@
+"""
+fake_ollama.py — Ollama-compatible stand-in for load tests.
+
+Serves the endpoints langchain-ollama calls:
+
+  POST /api/chat    streams NDJSON tokens; prefill waits prompt_tokens / --prefill-tps,
+                    then each of --reply-tokens tokens waits 1 / --decode-tps.  The final
+                    message carries prompt_eval_count / eval_count and their durations,
+                    like the real server
+  POST /api/generate  empty-prompt model preload (the API's warm-up)
+  POST /api/embed   deterministic embeddings (embed_text), no model needed
+  GET  /api/tags, /api/version
+
+Timing is simulated with asyncio.sleep, so one process can stand in for a
+GPU box serving many concurrent requests; use --max-parallel to mimic
+OLLAMA_NUM_PARALLEL (extra requests queue, as on a real server).
+
+    python -m bench.fake_ollama --port 11435 --decode-tps 30 --prefill-tps 600
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import re
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+EMBED_DIM = 768
+
+_WORD = re.compile(r"[a-z0-9]+")
+_COMMON = np.random.default_rng(0).standard_normal(EMBED_DIM).astype(np.float32)
+_COMMON /= np.linalg.norm(_COMMON)
+
+
+def embed_text(text: str, dim: int = EMBED_DIM) -> list[float]:
+    """
+    Hashed bag-of-words vector mixed with a shared component, so texts that share
+    words rank higher while unrelated text still clears the retriever's similarity
+    threshold (cosine >= ~0.85) and stays below the redundancy filter's 0.95.
+    """
+    bow = np.zeros(dim, dtype=np.float32)
+    for word in _WORD.findall(text.lower()):
+        h = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+        bow[h % dim] += 1.0 if (h >> 32) & 1 else -1.0
+    norm = np.linalg.norm(bow)
+    if norm:
+        bow /= norm
+    vec = 0.7 * _COMMON + 0.3 * bow
+    return (vec / np.linalg.norm(vec)).round(6).tolist()
+
+
+def _approx_tokens(text: str) -> int:
+    return max(1, math.ceil(len(text) / 4))
+
+
+_FILLER = (
+    "Patient reports stable symptoms with intermittent fatigue and good adherence to the "
+    "current regimen; no new red flags are documented and follow-up is scheduled as planned. "
+).split()
+
+
+def create_app(prefill_tps: float, decode_tps: float, reply_tokens: int, max_parallel: int) -> FastAPI:
+    app = FastAPI(title="fake-ollama")
+    slots = asyncio.Semaphore(max(1, max_parallel))
+
+    def _now() -> str:
+        return datetime.now(timezone.utc).isoformat()
+
+    async def _chat_lines(model: str, messages: list[dict]):
+        prompt_tokens = sum(_approx_tokens(str(m.get("content", ""))) for m in messages)
+        async with slots:
+            t0 = time.perf_counter()
+            await asyncio.sleep(prompt_tokens / prefill_tps if prefill_tps > 0 else 0)
+            t1 = time.perf_counter()
+            for i in range(reply_tokens):
+                if decode_tps > 0:
+                    await asyncio.sleep(1 / decode_tps)
+                word = _FILLER[i % len(_FILLER)]
+                yield {"model": model, "created_at": _now(), "message": {"role": "assistant", "content": word + " "}, "done": False}
+            t2 = time.perf_counter()
+        yield {
+            "model": model,
+            "created_at": _now(),
+            "message": {"role": "assistant", "content": ""},
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": int((t2 - t0) * 1e9),
+            "load_duration": 0,
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": int((t1 - t0) * 1e9),
+            "eval_count": reply_tokens,
+            "eval_duration": int((t2 - t1) * 1e9),
+        }
+
+    @app.post("/api/chat")
+    async def chat(request: Request):
+        body = await request.json()
+        model, messages = body.get("model", ""), body.get("messages") or []
+        if body.get("stream", True):
+            async def ndjson():
+                async for line in _chat_lines(model, messages):
+                    yield json.dumps(line) + "\n"
+            return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+        content, last = [], {}
+        async for line in _chat_lines(model, messages):
+            content.append(line["message"]["content"])
+            last = line
+        last["message"] = {"role": "assistant", "content": "".join(content)}
+        return last
+
+    @app.post("/api/generate")
+    async def generate(request: Request):
+        # Only the empty-prompt preload the API's warm-up sends
+        body = await request.json()
+        return {"model": body.get("model", ""), "created_at": _now(), "response": "", "done": True, "done_reason": "load"}
+
+    @app.post("/api/embed")
+    async def embed(request: Request):
+        body = await request.json()
+        inputs = body.get("input") or []
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        return {"model": body.get("model", ""), "embeddings": [embed_text(t) for t in inputs]}
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": []}
+
+    @app.get("/api/version")
+    async def version():
+        return {"version": "0.0.0-fake"}
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Ollama-compatible fake for load tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--prefill-tps", type=float, default=600.0, help="Prompt tokens evaluated per second (0 = instant)")
+    parser.add_argument("--decode-tps", type=float, default=30.0, help="Tokens generated per second (0 = instant)")
+    parser.add_argument("--reply-tokens", type=int, default=60)
+    parser.add_argument("--max-parallel", type=int, default=4, help="Concurrent generations (OLLAMA_NUM_PARALLEL)")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    app = create_app(args.prefill_tps, args.decode_tps, args.reply_tokens, args.max_parallel)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,468 @@
+"""
+fake_supabase.py — PostgREST/RPC-compatible stand-in for load tests.
+
+An in-memory database seeded by synthetic.generate_dataset, served under
+/rest/v1 the way supabase-py talks to PostgREST:
+
+  GET  /rest/v1/{table}       select=<plain columns|*>, col=eq|neq|gt|gte|lt|lte|in|is filters,
+                              order, limit, offset; object Accept header for single/maybe_single
+  POST /rest/v1/{table}       insert, or upsert with on_conflict + resolution=merge-duplicates
+  POST /rest/v1/rpc/{name}    the RPCs the API calls: patient_roster, get_patient_bundle,
+                              get_dashboard_rollups, apply_patient_sync, match_rag_documents,
+                              match_rag_patient_records (exact cosine search in NumPy)
+
+Only what api.py needs is implemented: embedded resources (`diseases(name)`)
+are rejected with a 400, and unknown RPCs answer PGRST202 like a database
+without the migration, so the API's fallbacks can be exercised too.  Rollups
+are computed from the raw logs on read; the output matches
+get_dashboard_rollups.  --latency-ms adds a fixed delay per request to
+approximate the network hop to a hosted project.
+
+    python -m bench.fake_supabase --port 54321 --patients 200 --days 90
+"""
+
+import argparse
+import asyncio
+import json
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any
+
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+from .synthetic import generate_dataset
+
+_FILTER_OPS = {"eq", "neq", "gt", "gte", "lt", "lte", "in", "is"}
+_RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+
+class PostgrestError(Exception):
+    def __init__(self, status: int, code: str, message: str, details: str | None = None):
+        self.status = status
+        self.body = {"code": code, "message": message, "details": details, "hint": None}
+
+
+def _text(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return "" if value is None else str(value)
+
+
+def _matches(value: Any, op: str, arg: str) -> bool:
+    if op == "is":
+        return (value is None) if arg == "null" else _text(value) == arg
+    if value is None:
+        return False
+    text = _text(value)
+    if op == "eq":
+        return text == arg
+    if op == "neq":
+        return text != arg
+    if op == "in":
+        return text in {v.strip().strip('"') for v in arg.strip("()").split(",")}
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        value, arg = float(value), float(arg)
+    else:
+        value = text
+    return {"gt": value > arg, "gte": value >= arg, "lt": value < arg, "lte": value <= arg}[op]
+
+
+def _vector_text(vec: list[float]) -> str:
+    return "[" + ",".join(repr(float(x)) for x in vec) + "]"
+
+
+class _VectorTable:
+    """Exact cosine search over one RAG table, optionally partitioned by metadata.user_id."""
+
+    def __init__(self, rows: list[dict], partition_key: str | None = None):
+        self.rows = rows
+        for row in rows:
+            row["_vector_text"] = _vector_text(row["embedding"])
+        self.matrix = self._unit(np.asarray([r["embedding"] for r in rows], dtype=np.float32).reshape(len(rows), -1))
+        self.partitions: dict[str, np.ndarray] = {}
+        if partition_key:
+            groups = defaultdict(list)
+            for i, row in enumerate(rows):
+                groups[str(row["metadata"].get(partition_key))].append(i)
+            self.partitions = {k: np.asarray(v) for k, v in groups.items()}
+
+    @staticmethod
+    def _unit(mat: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(mat, axis=1, keepdims=True) if mat.size else mat
+        return mat / np.where(norms == 0, 1.0, norms) if mat.size else mat
+
+    def search(self, query: list[float], metadata_filter: dict, limit: int, partition: str | None = None) -> list[dict]:
+        if partition is not None:
+            candidates = self.partitions.get(partition, np.asarray([], dtype=int))
+        else:
+            candidates = np.arange(len(self.rows))
+        candidates = [
+            i for i in candidates
+            if all(self.rows[i]["metadata"].get(k) == v for k, v in metadata_filter.items())
+        ]
+        if not candidates:
+            return []
+        q = np.asarray(query, dtype=np.float32)
+        q /= np.linalg.norm(q) or 1.0
+        sims = self.matrix[candidates] @ q
+        order = np.argsort(-sims)[:limit]
+        return [
+            {
+                "id": self.rows[candidates[j]]["id"],
+                "content": self.rows[candidates[j]]["content"],
+                "metadata": self.rows[candidates[j]]["metadata"],
+                "embedding": self.rows[candidates[j]]["_vector_text"],
+                "similarity": float(sims[j]),
+            }
+            for j in order
+        ]
+
+
+class FakeDatabase:
+    def __init__(self, tables: dict[str, list[dict]]):
+        self.tables: dict[str, list[dict]] = defaultdict(list, {k: v for k, v in tables.items() if not k.startswith("rag_")})
+        self.vectors = {
+            "match_rag_documents": _VectorTable(tables.get("rag_documents", [])),
+            "match_rag_patient_records": _VectorTable(tables.get("rag_patient_records", []), partition_key="user_id"),
+        }
+        self.sync_keys: set[tuple[str, str]] = set()
+        self._reindex()
+
+    def _reindex(self) -> None:
+        self.by_id = {name: {r["id"]: r for r in rows if "id" in r} for name, rows in self.tables.items()}
+        self.by_patient: dict[str, dict[str, list[dict]]] = defaultdict(lambda: defaultdict(list))
+        for name in ("medications", "symptom_logs", "appointments", "calendar_events"):
+            for row in self.tables[name]:
+                self.by_patient[name][row["patient_id"]].append(row)
+        self.adherence_by_med: dict[str, list[dict]] = defaultdict(list)
+        for row in self.tables["medication_adherence_logs"]:
+            self.adherence_by_med[row["medication_id"]].append(row)
+
+    def _indexed(self, table: str, row: dict) -> None:
+        self.by_id.setdefault(table, {})[row["id"]] = row
+        if table in ("medications", "symptom_logs", "appointments", "calendar_events"):
+            self.by_patient[table][row["patient_id"]].append(row)
+        if table == "medication_adherence_logs":
+            self.adherence_by_med[row["medication_id"]].append(row)
+
+    # ── table access ─────────────────────────────────────────────────────────
+
+    def select(self, table: str, params: list[tuple[str, str]]) -> list[dict]:
+        rows = self.tables.get(table)
+        if rows is None:
+            raise PostgrestError(404, "42P01", f'relation "public.{table}" does not exist')
+        query = dict(params)
+        columns = [c.strip() for c in query.get("select", "*").split(",")]
+        if any("(" in c or "->" in c or ":" in c for c in columns):
+            raise PostgrestError(400, "PGRST100", "Embedded resources and JSON paths are not supported by the fake")
+
+        # Narrow by an equality on an indexed column first
+        filters = [(k, *v.split(".", 1)) for k, v in params if k not in _RESERVED_PARAMS]
+        for col, op, arg in filters:
+            if op not in _FILTER_OPS:
+                raise PostgrestError(400, "PGRST100", f"Unsupported operator {op!r}")
+            if op == "eq" and col == "id":
+                rows = [self.by_id.get(table, {}).get(arg)] if self.by_id.get(table, {}).get(arg) else []
+                break
+            if op == "eq" and col == "patient_id" and table in self.by_patient:
+                rows = self.by_patient[table].get(arg, [])
+                break
+        out = [r for r in rows if all(_matches(r.get(c), op, a) for c, op, a in filters)]
+
+        for part in reversed([p for p in query.get("order", "").split(",") if p]):
+            col, *mods = part.split(".")
+            out.sort(key=lambda r: (r.get(col) is None, _text(r.get(col))), reverse="desc" in mods)
+        offset = int(query.get("offset", 0))
+        limit = int(query["limit"]) if "limit" in query else None
+        out = out[offset:offset + limit if limit is not None else None]
+        if columns == ["*"]:
+            return [dict(r) for r in out]
+        return [{c: r.get(c) for c in columns} for r in out]
+
+    def insert(self, table: str, payload: dict | list, on_conflict: str | None, merge: bool) -> list[dict]:
+        rows = payload if isinstance(payload, list) else [payload]
+        keys = [k.strip() for k in on_conflict.split(",")] if on_conflict else None
+        written = []
+        for values in rows:
+            if keys:
+                existing = next(
+                    (r for r in self._conflict_candidates(table, values)
+                     if all(_text(r.get(k)) == _text(values.get(k)) for k in keys)),
+                    None,
+                )
+                if existing is not None:
+                    if merge:
+                        existing.update(values)
+                        written.append(dict(existing))
+                        self._data_changed(table, existing)
+                    continue
+            row = {"id": str(uuid.uuid4()), **values}
+            self.tables[table].append(row)
+            self._indexed(table, row)
+            written.append(dict(row))
+            self._data_changed(table, row)
+        return written
+
+    def _data_changed(self, table: str, row: dict) -> None:
+        # The data_version row triggers of migration 010
+        if table == "medication_adherence_logs":
+            med = self.by_id["medications"].get(row.get("medication_id"))
+            patient_id = med and med["patient_id"]
+        elif table in ("symptom_logs", "medications", "appointments", "calendar_events"):
+            patient_id = row.get("patient_id")
+        else:
+            return
+        if patient_id:
+            self._rpc_bump_patient_data_version(patient_id)
+
+    def _conflict_candidates(self, table: str, values: dict) -> list[dict]:
+        if table == "medication_adherence_logs" and "medication_id" in values:
+            return self.adherence_by_med.get(values["medication_id"], [])
+        return self.tables[table]
+
+    # ── RPCs ─────────────────────────────────────────────────────────────────
+
+    def rpc(self, name: str, args: dict) -> Any:
+        if name in self.vectors:
+            metadata_filter = dict(args.get("filter") or {})
+            partition = metadata_filter.pop("user_id", None) if name == "match_rag_patient_records" else None
+            if name == "match_rag_patient_records" and partition is None:
+                return []
+            return self.vectors[name].search(args["query_embedding"], metadata_filter, int(args.get("limit", 5)), partition)
+        handler = getattr(self, f"_rpc_{name}", None)
+        if handler is None:
+            raise PostgrestError(
+                404, "PGRST202", f"Could not find the function public.{name} in the schema cache",
+            )
+        return handler(**args)
+
+    def _patient(self, patient_id: str) -> dict | None:
+        return self.by_id["patients"].get(patient_id)
+
+    def _symptom_obj(self, symptom_id: str | None) -> dict | None:
+        s = self.by_id["symptoms"].get(symptom_id) if symptom_id else None
+        return {"name": s["name"]} if s else None
+
+    def _rpc_bump_patient_data_version(self, p_patient_id: str) -> int | None:
+        p = self._patient(p_patient_id)
+        if p is None:
+            return None
+        p["data_version"] = p.get("data_version", 0) + 1
+        return p["data_version"]
+
+    def _rpc_patient_roster(self, after_name: str | None = None, after_id: str | None = None, page_size: int = 100) -> list[dict]:
+        patients = sorted(self.tables["patients"], key=lambda p: (p["name"], p["id"]))
+        if after_id is not None:
+            patients = [p for p in patients if (p["name"], p["id"]) > (after_name, after_id)]
+        out = []
+        for p in patients[:page_size]:
+            disease = self.by_id["diseases"].get(p.get("disease_id"))
+            visits = [a["scheduled_at"] for a in self.by_patient["appointments"].get(p["id"], [])]
+            logs = sorted(self.by_patient["symptom_logs"].get(p["id"], []), key=lambda r: r["logged_at"], reverse=True)[:5]
+            out.append({
+                "id": p["id"],
+                "name": p["name"],
+                "condition": disease["name"] if disease else "Unknown",
+                "last_visit_at": max(visits) if visits else None,
+                "max_recent_severity": max((r["severity"] for r in logs), default=0),
+            })
+        return out
+
+    def _rpc_get_patient_bundle(self, p_patient_id: str, p_since: str | None = None) -> dict:
+        p = self._patient(p_patient_id)
+        disease = self.by_id["diseases"].get(p["disease_id"]) if p else None
+        meds = self.by_patient["medications"].get(p_patient_id, [])
+        adherence = [
+            {"medication_id": a["medication_id"], "logged_date": a["logged_date"], "taken": a["taken"],
+             "notes": a.get("notes"), "medications": {"name": m["name"]}}
+            for m in meds for a in self.adherence_by_med.get(m["id"], [])
+            if not p_since or a["logged_date"] >= p_since
+        ]
+        adherence.sort(key=lambda a: a["logged_date"], reverse=True)
+        logs = sorted(self.by_patient["symptom_logs"].get(p_patient_id, []), key=lambda r: r["logged_at"], reverse=True)
+        if p_since:
+            logs = [r for r in logs if r["logged_at"] >= p_since]
+        symptom_ids = {s["id"] for s in self.tables["symptoms"] if disease and s["disease_id"] == disease["id"]}
+        treatments = [
+            {"physician": t["physician"], "treatment": t["treatment"], "worked": t["worked"],
+             "symptoms": self._symptom_obj(t["symptom_id"])}
+            for t in self.tables["treatments"] if t["worked"] and t["symptom_id"] in symptom_ids
+        ][:10]
+        return {
+            "patient": {"id": p["id"], "name": p["name"], "disease_id": p["disease_id"]} if p else None,
+            "disease": {"id": disease["id"], "name": disease["name"]} if disease else None,
+            "medications": [
+                {"id": m["id"], "name": m["name"], "dosage": m["dosage"], "frequency": m["frequency"],
+                 "symptom_id": m["symptom_id"], "symptoms": self._symptom_obj(m["symptom_id"])}
+                for m in meds
+            ],
+            "adherence": adherence,
+            "appointments": [
+                {k: a.get(k) for k in ("scheduled_at", "physician", "visit_type", "notes")}
+                for a in sorted(self.by_patient["appointments"].get(p_patient_id, []), key=lambda a: a["scheduled_at"])
+            ],
+            "symptom_logs": [
+                {"logged_at": r["logged_at"], "severity": r["severity"], "notes": r.get("notes"),
+                 "curated_by": r.get("curated_by"), "symptoms": self._symptom_obj(r["symptom_id"])}
+                for r in logs
+            ],
+            "calendar": [
+                {k: c.get(k) for k in ("event_at", "title", "description", "event_type")}
+                for c in sorted(self.by_patient["calendar_events"].get(p_patient_id, []), key=lambda c: c["event_at"])
+            ],
+            "treatments": treatments,
+        }
+
+    def _rpc_get_dashboard_rollups(self, p_patient_id: str, p_since: str) -> dict:
+        p = self._patient(p_patient_id)
+        disease = self.by_id["diseases"].get(p["disease_id"]) if p else None
+        days: dict[str, dict] = {}
+
+        def day(d: str) -> dict:
+            return days.setdefault(d, {"day": d, "max_severity": 0, "log_count": 0, "flare": False, "doses_taken": 0, "doses_total": 0})
+
+        logs = self.by_patient["symptom_logs"].get(p_patient_id, [])
+        for r in logs:
+            d = day(datetime.fromisoformat(r["logged_at"]).astimezone(timezone.utc).date().isoformat())
+            d["max_severity"] = max(d["max_severity"], r["severity"] or 0)
+            d["log_count"] += 1
+            d["flare"] = d["max_severity"] > 4
+        for m in self.by_patient["medications"].get(p_patient_id, []):
+            for a in self.adherence_by_med.get(m["id"], []):
+                d = day(a["logged_date"])
+                d["doses_total"] += 1
+                d["doses_taken"] += 1 if a["taken"] else 0
+        latest = sorted(logs, key=lambda r: r["logged_at"], reverse=True)[:5]
+        return {
+            "patient": {"id": p["id"], "name": p["name"]} if p else None,
+            "disease": {"id": disease["id"], "name": disease["name"]} if disease else None,
+            "days": [days[d] for d in sorted(days) if d >= p_since],
+            "latest_logs": [
+                {"logged_at": r["logged_at"], "severity": r["severity"], "symptoms": self._symptom_obj(r["symptom_id"])}
+                for r in latest
+            ],
+            "symptom_names": sorted({self.by_id["symptoms"][r["symptom_id"]]["name"] for r in logs if r["symptom_id"] in self.by_id["symptoms"]}),
+        }
+
+    def _rpc_apply_patient_sync(self, p_patient_id: str, p_symptoms: list | None = None, p_adherence: list | None = None) -> dict:
+        p = self._patient(p_patient_id)
+        if p is None:
+            raise PostgrestError(404, "P0002", f"Patient {p_patient_id} not found")
+        applied = duplicates = 0
+        rejected = []
+        symptoms = {s["name"].lower(): s for s in self.tables["symptoms"] if s["disease_id"] == p["disease_id"]}
+        for ev in p_symptoms or []:
+            key, name, severity = ev.get("idempotency_key"), (ev.get("symptom_name") or "").strip(), ev.get("severity")
+            if not name or severity is None or not 1 <= int(severity) <= 10 or not p["disease_id"]:
+                rejected.append({"idempotency_key": key, "reason": "invalid symptom entry"})
+                continue
+            if (p_patient_id, key) in self.sync_keys:
+                duplicates += 1
+                continue
+            self.sync_keys.add((p_patient_id, key))
+            symptom = symptoms.get(name.lower())
+            if symptom is None:
+                symptom = symptoms[name.lower()] = self.insert("symptoms", {"disease_id": p["disease_id"], "name": name}, None, False)[0]
+            self.insert("symptom_logs", {
+                "patient_id": p_patient_id, "symptom_id": symptom["id"],
+                "logged_at": ev.get("logged_at") or datetime.now(timezone.utc).isoformat(),
+                "severity": int(severity), "notes": ev.get("notes") or None, "curated_by": None,
+            }, None, False)
+            applied += 1
+        meds = {m["id"] for m in self.by_patient["medications"].get(p_patient_id, [])}
+        for ev in p_adherence or []:
+            key = ev.get("idempotency_key")
+            if ev.get("medication_id") not in meds or not ev.get("logged_date"):
+                rejected.append({"idempotency_key": key, "reason": "medication not found for this patient"})
+                continue
+            if (p_patient_id, key) in self.sync_keys:
+                duplicates += 1
+                continue
+            self.sync_keys.add((p_patient_id, key))
+            self.insert("medication_adherence_logs", {
+                "medication_id": ev["medication_id"], "logged_date": ev["logged_date"], "taken": ev.get("taken", True),
+            }, "medication_id,logged_date", True)
+            applied += 1
+        return {"applied": applied, "duplicates": duplicates, "rejected": rejected}
+
+
+def create_app(db: FakeDatabase, latency_ms: float = 0.0) -> FastAPI:
+    app = FastAPI(title="fake-supabase")
+
+    def _error(e: PostgrestError) -> JSONResponse:
+        return JSONResponse(status_code=e.status, content=e.body)
+
+    async def _delay() -> None:
+        if latency_ms > 0:
+            await asyncio.sleep(latency_ms / 1000)
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok", "patients": len(db.tables["patients"])}
+
+    @app.get("/rest/v1/{table}")
+    async def select(table: str, request: Request):
+        await _delay()
+        try:
+            rows = db.select(table, list(request.query_params.multi_items()))
+        except PostgrestError as e:
+            return _error(e)
+        if "vnd.pgrst.object" in request.headers.get("accept", ""):
+            if len(rows) != 1:
+                return _error(PostgrestError(
+                    406, "PGRST116", "JSON object requested, multiple (or no) rows returned",
+                    f"The result contains {len(rows)} rows",
+                ))
+            return rows[0]
+        return rows
+
+    @app.post("/rest/v1/rpc/{name}")
+    async def rpc(name: str, request: Request):
+        await _delay()
+        body = await request.body()
+        try:
+            result = db.rpc(name, json.loads(body) if body else {})
+        except PostgrestError as e:
+            return _error(e)
+        except TypeError as e:
+            return _error(PostgrestError(404, "PGRST202", f"Could not find the function public.{name}({e})"))
+        return result
+
+    @app.post("/rest/v1/{table}", status_code=201)
+    async def insert(table: str, request: Request):
+        await _delay()
+        prefer = request.headers.get("prefer", "")
+        rows = db.insert(
+            table,
+            await request.json(),
+            on_conflict=request.query_params.get("on_conflict"),
+            merge="merge-duplicates" in prefer,
+        )
+        if "return=minimal" in prefer:
+            return Response(status_code=201)
+        return rows
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="PostgREST-compatible fake Supabase for load tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--patients", type=int, default=200)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Added delay per request")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    db = FakeDatabase(generate_dataset(args.patients, args.days, args.seed))
+    uvicorn.run(create_app(db, args.latency_ms), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+import_time.py — Cold-start import time of the API and the rag package.
+
+Imports each module in fresh interpreters with `python -X importtime` and
+reports the median wall time plus the modules with the largest cumulative
+import time (median across runs), so a dependency that sneaks back into the
+startup path shows up by name.  Save with --out, compare with --baseline:
+
+    python -m bench.import_time --out bench/import_baseline.json
+    python -m bench.import_time --baseline bench/import_baseline.json
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _parse_importtime(stderr: str) -> dict[str, float]:
+    """Cumulative seconds per module from -X importtime output."""
+    cumulative: dict[str, float] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cum, name = (part.strip() for part in line[len("import time:"):].split("|", 2))
+        if cum.isdigit():
+            cumulative[name.strip()] = int(cum) / 1e6
+    return cumulative
+
+
+def measure(module: str, runs: int) -> dict:
+    walls, per_module = [], {}
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=ROOT, capture_output=True, text=True,
+        )
+        walls.append(time.perf_counter() - t0)
+        if proc.returncode != 0:
+            raise SystemExit(f"import {module} failed:\n{proc.stderr[-2000:]}")
+        for name, seconds in _parse_importtime(proc.stderr).items():
+            per_module.setdefault(name, []).append(seconds)
+    medians = {name: statistics.median(v) for name, v in per_module.items()}
+    return {
+        "wall_seconds": round(statistics.median(walls), 3),
+        "import_seconds": round(medians.get(module, 0.0), 3),
+        "modules": {name: round(s, 4) for name, s in sorted(medians.items(), key=lambda kv: -kv[1])},
+    }
+
+
+def print_report(results: dict, top: int, baseline: dict | None = None) -> None:
+    for module, r in results.items():
+        line = f"{module}: wall {r['wall_seconds']:.3f}s, import {r['import_seconds']:.3f}s"
+        if baseline and module in baseline:
+            line += f"  (baseline wall {baseline[module]['wall_seconds']:.3f}s)"
+        print(line)
+        # Skip the module itself; the rest are its heaviest dependencies
+        heaviest = [(n, s) for n, s in r["modules"].items() if n != module][:top]
+        for name, seconds in heaviest:
+            was = baseline.get(module, {}).get("modules", {}).get(name) if baseline else None
+            suffix = f"  (was {was:.3f}s)" if was is not None else ("  (new)" if baseline else "")
+            print(f"  {seconds:7.3f}s  {name}{suffix}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure cold import time of the API.")
+    parser.add_argument("modules", nargs="*", default=["api", "rag"])
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per module")
+    parser.add_argument("--top", type=int, default=15, help="Heaviest dependencies to list")
+    parser.add_argument("--out", type=Path)
+    parser.add_argument("--baseline", type=Path)
+    args = parser.parse_args()
+
+    results = {module: measure(module, args.runs) for module in args.modules}
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else None
+    print_report(results, args.top, baseline)
+    if args.out:
+        args.out.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+loadtest.py — Closed-loop load generator for the API.
+
+--concurrency workers each loop for --duration seconds.  Every iteration
+picks a scenario by weight (--mix) and sends its request.  The patients and
+medications targeted are read from the API itself (GET /patients, then each
+patient's dashboard), so any running deployment can be load-tested:
+
+  roster      GET  /patients?limit=50
+  dashboard   GET  /patients/{id}/dashboard
+  chat        POST /chat
+  symptoms    POST /patients/{id}/symptom-logs
+  adherence   POST /patients/{id}/adherence
+  sync        POST /patients/{id}/sync
+
+Per scenario and overall, the report has the request count, errors, rate
+(requests/s) and p50/p95/p99/max latency in milliseconds.  --out writes it
+as JSON and --baseline compares against an earlier report.
+
+    python -m bench.loadtest --target http://127.0.0.1:8000 --concurrency 16 --duration 30
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+
+import httpx
+import numpy as np
+
+DEFAULT_MIX = {"roster": 2, "dashboard": 4, "chat": 1, "symptoms": 1, "adherence": 1, "sync": 1}
+
+QUESTIONS = [
+    "How has symptom severity changed over the last month?",
+    "Is the current medication regimen working?",
+    "Any red flags before the next appointment?",
+    "How consistent is medication adherence?",
+    "What should be reviewed at the next visit?",
+]
+
+SYMPTOM_NAMES = ["fatigue", "numbness", "muscle weakness", "double vision", "insomnia"]
+
+
+@dataclass
+class Target:
+    patient_id: str
+    medication_ids: list[str] = field(default_factory=list)
+
+
+@dataclass
+class Sample:
+    scenario: str
+    seconds: float
+    ok: bool
+
+
+async def discover(client: httpx.AsyncClient, max_patients: int) -> list[Target]:
+    """Patients (and their medication ids) to target, read through the API."""
+    patients, cursor = [], None
+    while len(patients) < max_patients:
+        params = {"limit": min(500, max_patients - len(patients))}
+        if cursor:
+            params["cursor"] = cursor
+        page = (await client.get("/patients", params=params)).raise_for_status().json()
+        patients += [p["id"] for p in page["patients"]]
+        cursor = page.get("next_cursor")
+        if not cursor:
+            break
+    targets = []
+    for pid in patients:
+        dash = (await client.get(f"/patients/{pid}/dashboard")).json()
+        meds = [m["id"] for m in (dash.get("history") or {}).get("medications") or [] if m.get("id")]
+        targets.append(Target(pid, meds))
+    return targets
+
+
+def _request(scenario: str, t: Target, rng: random.Random) -> tuple[str, str, dict]:
+    pid = t.patient_id
+    if scenario == "roster":
+        return "GET", "/patients", {"params": {"limit": 50}}
+    if scenario == "dashboard":
+        return "GET", f"/patients/{pid}/dashboard", {}
+    if scenario == "chat":
+        return "POST", "/chat", {"json": {"patient_id": pid, "question": rng.choice(QUESTIONS)}}
+    if scenario == "symptoms":
+        entries = [{"symptom_name": rng.choice(SYMPTOM_NAMES), "severity": rng.randint(1, 10)} for _ in range(rng.randint(1, 3))]
+        return "POST", f"/patients/{pid}/symptom-logs", {"json": {"entries": entries}}
+    if scenario == "adherence":
+        if not t.medication_ids:
+            return "GET", f"/patients/{pid}/dashboard", {}
+        return "POST", f"/patients/{pid}/adherence", {"json": {"medication_id": rng.choice(t.medication_ids), "taken": rng.random() < 0.9}}
+    if scenario == "sync":
+        now = datetime.now(timezone.utc).isoformat()
+        symptoms = [
+            {"idempotency_key": str(uuid.uuid4()), "symptom_name": rng.choice(SYMPTOM_NAMES), "severity": rng.randint(1, 10), "logged_at": now}
+            for _ in range(rng.randint(1, 5))
+        ]
+        adherence = [
+            {"idempotency_key": str(uuid.uuid4()), "medication_id": m, "logged_date": date.today().isoformat(), "taken": True}
+            for m in t.medication_ids[:2]
+        ]
+        return "POST", f"/patients/{pid}/sync", {"json": {"symptoms": symptoms, "adherence": adherence}}
+    raise ValueError(f"Unknown scenario {scenario!r}")
+
+
+async def _worker(client, targets, mix, deadline, samples, seed) -> None:
+    rng = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    while time.perf_counter() < deadline:
+        scenario = rng.choices(names, weights)[0]
+        method, path, kwargs = _request(scenario, rng.choice(targets), rng)
+        start = time.perf_counter()
+        try:
+            r = await client.request(method, path, **kwargs)
+            ok = r.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        samples.append(Sample(scenario, time.perf_counter() - start, ok))
+
+
+def _summary(samples: list[Sample], elapsed: float) -> dict:
+    ms = np.asarray([s.seconds * 1000 for s in samples]) if samples else np.zeros(1)
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for s in samples if not s.ok),
+        "rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "max_ms": round(float(ms.max()), 2),
+    }
+
+
+def report(samples: list[Sample], elapsed: float, config: dict) -> dict:
+    by_scenario: dict[str, list[Sample]] = {}
+    for s in samples:
+        by_scenario.setdefault(s.scenario, []).append(s)
+    return {
+        "config": config,
+        "elapsed_seconds": round(elapsed, 2),
+        "overall": _summary(samples, elapsed),
+        "scenarios": {name: _summary(group, elapsed) for name, group in sorted(by_scenario.items())},
+    }
+
+
+async def run_load(
+    target: str,
+    concurrency: int = 8,
+    duration: float = 30.0,
+    warmup: float = 5.0,
+    mix: dict[str, float] | None = None,
+    max_patients: int = 100,
+    seed: int = 1,
+) -> dict:
+    mix = mix or DEFAULT_MIX
+    limits = httpx.Limits(max_connections=concurrency * 2, max_keepalive_connections=concurrency * 2)
+    async with httpx.AsyncClient(base_url=target, timeout=300, limits=limits) as client:
+        targets = await discover(client, max_patients)
+        if not targets:
+            raise SystemExit("No patients returned by /patients; nothing to load-test")
+        if warmup > 0:
+            await asyncio.gather(*[
+                _worker(client, targets, mix, time.perf_counter() + warmup, [], seed * 1000 + i)
+                for i in range(concurrency)
+            ])
+        samples: list[Sample] = []
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            _worker(client, targets, mix, start + duration, samples, seed * 1000 + concurrency + i)
+            for i in range(concurrency)
+        ])
+        elapsed = time.perf_counter() - start
+    config = {"target": target, "concurrency": concurrency, "duration": duration, "mix": mix, "patients": len(targets)}
+    return report(samples, elapsed, config)
+
+
+def compare(current: dict, baseline: dict) -> list[str]:
+    """Lines comparing rps and latency percentiles per scenario (+ is slower / more)."""
+    lines = [f"{'scenario':<12}{'metric':<8}{'baseline':>12}{'current':>12}{'change':>10}"]
+    names = ["overall", *sorted(set(current["scenarios"]) | set(baseline["scenarios"]))]
+    for name in names:
+        cur = current["overall"] if name == "overall" else current["scenarios"].get(name)
+        base = baseline["overall"] if name == "overall" else baseline["scenarios"].get(name)
+        if not cur or not base:
+            continue
+        for metric in ("rps", "p50_ms", "p95_ms", "p99_ms"):
+            b, c = base[metric], cur[metric]
+            change = f"{(c - b) / b * 100:+.1f}%" if b else "n/a"
+            lines.append(f"{name:<12}{metric:<8}{b:>12.2f}{c:>12.2f}{change:>10}")
+    return lines
+
+
+def print_report(result: dict) -> None:
+    print(f"{'scenario':<12}{'requests':>10}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    rows = [("overall", result["overall"]), *result["scenarios"].items()]
+    for name, s in rows:
+        print(f"{name:<12}{s['requests']:>10}{s['errors']:>8}{s['rps']:>10.2f}{s['p50_ms']:>10.1f}{s['p95_ms']:>10.1f}{s['p99_ms']:>10.1f}")
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    """"dashboard=4,chat=1" → {"dashboard": 4.0, "chat": 1.0}"""
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown scenario {name.strip()!r}; expected {sorted(DEFAULT_MIX)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def add_load_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Unmeasured seconds before the run")
+    parser.add_argument("--mix", type=parse_mix, default=None, help="Scenario weights, e.g. dashboard=4,chat=1")
+    parser.add_argument("--max-patients", type=int, default=100, help="Patients to spread requests over")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", default=None, help="Write the JSON report here")
+    parser.add_argument("--baseline", default=None, help="Earlier JSON report to compare against")
+
+
+def finish(result: dict, out: str | None, baseline: str | None) -> None:
+    print_report(result)
+    if out:
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"report written to {out}")
+    if baseline:
+        with open(baseline, encoding="utf-8") as f:
+            print("\n".join(compare(result, json.load(f))))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load-test a running API.")
+    parser.add_argument("--target", default="http://127.0.0.1:8000")
+    add_load_arguments(parser)
+    args = parser.parse_args()
+    result = asyncio.run(run_load(
+        args.target, args.concurrency, args.duration, args.warmup, args.mix, args.max_patients, args.seed,
+    ))
+    finish(result, args.out, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
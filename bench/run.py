@@ -0,0 +1,139 @@
+"""
+run.py — Start the fakes and the API, then load-test it.
+
+Launches three local processes and drives the API through loadtest.py:
+
+  fake Supabase   python -m bench.fake_supabase   (synthetic patients, --supabase-latency-ms)
+  fake Ollama     python -m bench.fake_ollama     (--decode-tps / --prefill-tps / --reply-tokens)
+  API             uvicorn api:app                 SUPABASE_URL / OLLAMA_BASE_URL pointed at the fakes
+
+Settings for the API process can be overridden with --env KEY=VALUE (e.g.
+--env DASHBOARD_ROLLUPS=false) to compare configurations on the same data.
+Save a run with --out and pass it as --baseline next time:
+
+    python -m bench.run --out bench/baseline.json
+    python -m bench.run --baseline bench/baseline.json --concurrency 32
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import httpx
+
+from .loadtest import add_load_arguments, finish, run_load
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(url: str, proc: subprocess.Popen, timeout: float = 120.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"{url} exited with status {proc.returncode}")
+        try:
+            if httpx.get(url, timeout=2).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f"{url} not ready after {timeout:.0f}s")
+
+
+@contextmanager
+def _processes():
+    procs: list[subprocess.Popen] = []
+    try:
+        yield procs
+    finally:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            try:
+                p.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                p.kill()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load-test the API against local Supabase and Ollama fakes.")
+    parser.add_argument("--patients", type=int, default=200, help="Synthetic patients to seed")
+    parser.add_argument("--days", type=int, default=90, help="Days of synthetic logs per patient")
+    parser.add_argument("--supabase-latency-ms", type=float, default=5.0)
+    parser.add_argument("--decode-tps", type=float, default=30.0)
+    parser.add_argument("--prefill-tps", type=float, default=600.0)
+    parser.add_argument("--reply-tokens", type=int, default=60)
+    parser.add_argument("--ollama-parallel", type=int, default=4)
+    parser.add_argument("--api-workers", type=int, default=1)
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="Extra settings for the API")
+    add_load_arguments(parser)
+    args = parser.parse_args()
+
+    supabase_port, ollama_port, api_port = _free_port(), _free_port(), _free_port()
+    python = sys.executable
+    env = {
+        **os.environ,
+        "SUPABASE_URL": f"http://127.0.0.1:{supabase_port}",
+        "SUPABASE_SERVICE_ROLE_KEY": "bench-service-key",
+        "SUPABASE_SERVICE_KEY": "bench-service-key",
+        "OLLAMA_BASE_URL": f"http://127.0.0.1:{ollama_port}",
+        "EMBED_CACHE_PATH": "",
+        "PREWARM_ENABLED": "false",
+        "JOB_DB_PATH": "",
+    }
+    for item in args.env:
+        key, _, value = item.partition("=")
+        env[key] = value
+
+    with _processes() as procs:
+        procs.append(subprocess.Popen(
+            [python, "-m", "bench.fake_supabase", "--port", str(supabase_port), "--patients", str(args.patients),
+             "--days", str(args.days), "--latency-ms", str(args.supabase_latency_ms)],
+            cwd=ROOT,
+        ))
+        procs.append(subprocess.Popen(
+            [python, "-m", "bench.fake_ollama", "--port", str(ollama_port), "--decode-tps", str(args.decode_tps),
+             "--prefill-tps", str(args.prefill_tps), "--reply-tokens", str(args.reply_tokens),
+             "--max-parallel", str(args.ollama_parallel)],
+            cwd=ROOT,
+        ))
+        _wait_ready(f"http://127.0.0.1:{supabase_port}/health", procs[0])
+        _wait_ready(f"http://127.0.0.1:{ollama_port}/api/version", procs[1])
+
+        procs.append(subprocess.Popen(
+            [python, "-m", "uvicorn", "api:app", "--port", str(api_port), "--workers", str(args.api_workers),
+             "--log-level", "warning", "--no-access-log"],
+            cwd=ROOT, env=env,
+        ))
+        target = f"http://127.0.0.1:{api_port}"
+        _wait_ready(f"{target}/ready", procs[2])  # 503 until warmed, so the run starts warm
+
+        print(f"fakes ready ({args.patients} patients); load-testing {target}")
+        result = asyncio.run(run_load(
+            target, args.concurrency, args.duration, args.warmup, args.mix, args.max_patients, args.seed,
+        ))
+        result["config"].update({
+            "supabase_latency_ms": args.supabase_latency_ms,
+            "decode_tps": args.decode_tps,
+            "prefill_tps": args.prefill_tps,
+            "reply_tokens": args.reply_tokens,
+            "api_workers": args.api_workers,
+            "env": args.env,
+        })
+    finish(result, args.out, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
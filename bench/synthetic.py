@@ -0,0 +1,148 @@
+"""
+synthetic.py — Deterministic synthetic patients for the fake Supabase.
+
+generate_dataset(patients, days, seed) builds every table the API reads
+(patients, diseases, symptoms, medications, adherence / symptom logs,
+appointments, calendar events, treatments) plus the two RAG tables, with
+chunks embedded by fake_ollama.embed_text so retrieval through the fake
+Ollama finds them.  The same seed always yields the same rows.
+"""
+
+import random
+import uuid
+from datetime import date, datetime, time, timedelta, timezone
+
+from .fake_ollama import embed_text
+
+DISEASES = {
+    "Neuromyelitis Optica Spectrum Disorder": ["optic pain", "vision loss", "limb weakness", "numbness", "bladder dysfunction", "fatigue"],
+    "Myasthenia Gravis": ["ptosis", "double vision", "muscle weakness", "difficulty swallowing", "shortness of breath", "fatigue"],
+    "Amyotrophic Lateral Sclerosis": ["muscle cramps", "slurred speech", "hand weakness", "fasciculations", "difficulty swallowing", "fatigue"],
+    "Huntington's Disease": ["chorea", "irritability", "poor coordination", "memory lapses", "depressed mood", "insomnia"],
+}
+
+MEDICATIONS = [
+    ("Eculizumab", "900 mg", "every 2 weeks"),
+    ("Pyridostigmine", "60 mg", "3x daily"),
+    ("Riluzole", "50 mg", "2x daily"),
+    ("Tetrabenazine", "25 mg", "daily"),
+    ("Prednisone", "10 mg", "daily"),
+    ("Azathioprine", "100 mg", "daily"),
+]
+
+_FIRST = ["Ada", "Ben", "Cleo", "Dev", "Eli", "Fay", "Gus", "Hana", "Ivo", "Jun", "Kai", "Lena", "Mo", "Nia", "Otto", "Pia"]
+_LAST = ["Alvarez", "Brooks", "Chen", "Dubois", "Eriksen", "Fischer", "Garcia", "Haddad", "Ito", "Jensen", "Kowalski", "Laurent"]
+_PHYSICIANS = ["Dr. Patel", "Dr. Okafor", "Dr. Lindqvist", "Dr. Moreau"]
+
+_KNOWLEDGE = [
+    "{disease} commonly presents with {a} and {b}; relapses are defined by new or worsening {a} lasting over 24 hours.",
+    "First-line maintenance therapy for {disease} aims to prevent attacks; monitor {b} and adherence at every visit.",
+    "In {disease}, rising {a} severity over two weeks warrants escalation and an earlier follow-up appointment.",
+    "Guideline summary for {disease}: document {a}, {b} and treatment response; screen for infection before immunotherapy.",
+    "Patient education for {disease}: keep a daily log of {a} and {b}, and report sudden changes promptly.",
+]
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _ts(day: date, hour: int, minute: int = 0) -> str:
+    return datetime.combine(day, time(hour, minute), tzinfo=timezone.utc).isoformat()
+
+
+def generate_dataset(patients: int = 200, days: int = 90, seed: int = 7, today: date | None = None) -> dict[str, list[dict]]:
+    rng = random.Random(seed)
+    today = today or datetime.now(timezone.utc).date()
+    tables: dict[str, list[dict]] = {name: [] for name in (
+        "diseases", "patients", "symptoms", "medications", "medication_adherence_logs",
+        "symptom_logs", "appointments", "calendar_events", "treatments",
+        "rag_documents", "rag_patient_records",
+    )}
+
+    symptoms_by_disease: dict[str, list[dict]] = {}
+    for disease_name, symptom_names in DISEASES.items():
+        disease = {"id": _uuid(rng), "name": disease_name}
+        tables["diseases"].append(disease)
+        symptoms = [{"id": _uuid(rng), "disease_id": disease["id"], "name": n} for n in symptom_names]
+        symptoms_by_disease[disease["id"]] = symptoms
+        tables["symptoms"] += symptoms
+        for s in symptoms[:3]:
+            tables["treatments"].append({
+                "id": _uuid(rng), "symptom_id": s["id"], "physician": rng.choice(_PHYSICIANS),
+                "treatment": rng.choice(MEDICATIONS)[0], "worked": rng.random() < 0.7,
+            })
+        for template in _KNOWLEDGE:
+            a, b = rng.sample(symptom_names, 2)
+            content = template.format(disease=disease_name, a=a, b=b)
+            tables["rag_documents"].append({
+                "id": _uuid(rng), "content": content,
+                "metadata": {"source": f"{disease_name} guideline", "disease": disease_name},
+                "embedding": embed_text(content),
+            })
+
+    for _ in range(patients):
+        disease = rng.choice(tables["diseases"])
+        symptoms = symptoms_by_disease[disease["id"]]
+        patient = {
+            "id": _uuid(rng),
+            "name": f"{rng.choice(_FIRST)} {rng.choice(_LAST)}",
+            "disease_id": disease["id"],
+        }
+        tables["patients"].append(patient)
+        pid = patient["id"]
+
+        meds = []
+        for name, dosage, frequency in rng.sample(MEDICATIONS, rng.randint(1, 3)):
+            med = {
+                "id": _uuid(rng), "patient_id": pid, "name": name, "dosage": dosage,
+                "frequency": frequency, "symptom_id": rng.choice(symptoms)["id"],
+            }
+            meds.append(med)
+        tables["medications"] += meds
+
+        baseline = rng.randint(2, 6)
+        for d in range(days):
+            day = today - timedelta(days=days - 1 - d)
+            for med in meds:
+                tables["medication_adherence_logs"].append({
+                    "id": _uuid(rng), "medication_id": med["id"], "logged_date": day.isoformat(),
+                    "taken": rng.random() < 0.85, "notes": None,
+                })
+            for _ in range(rng.choice((0, 0, 1, 1, 2))):
+                severity = max(1, min(10, baseline + rng.randint(-2, 3)))
+                tables["symptom_logs"].append({
+                    "id": _uuid(rng), "patient_id": pid, "symptom_id": rng.choice(symptoms)["id"],
+                    "logged_at": _ts(day, rng.randint(7, 21), rng.randint(0, 59)),
+                    "severity": severity, "notes": "worse in the evening" if severity > 6 else None,
+                    "curated_by": None,
+                })
+
+        for offset in (-60, -30, rng.randint(0, 14)):
+            tables["appointments"].append({
+                "id": _uuid(rng), "patient_id": pid,
+                "scheduled_at": _ts(today + timedelta(days=offset), rng.randint(8, 16)),
+                "physician": rng.choice(_PHYSICIANS), "visit_type": "follow-up", "notes": None,
+            })
+        tables["calendar_events"].append({
+            "id": _uuid(rng), "patient_id": pid,
+            "event_at": _ts(today + timedelta(days=rng.randint(1, 21)), 9),
+            "title": "Infusion", "description": "Scheduled infusion", "event_type": "treatment",
+        })
+
+        chunks = [
+            f"{patient['name']} has {disease['name']}. Current medications: "
+            + ", ".join(f"{m['name']} {m['dosage']} {m['frequency']}" for m in meds) + ".",
+            f"Recent symptoms for {patient['name']}: "
+            + ", ".join(rng.sample([s["name"] for s in symptoms], 3))
+            + f" with typical severity around {baseline} out of 10.",
+            f"Adherence over the last {days} days is mostly consistent; missed doses cluster on weekends.",
+        ]
+        for i, content in enumerate(chunks):
+            tables["rag_patient_records"].append({
+                "id": _uuid(rng), "content": content,
+                "metadata": {"user_id": pid, "source": "patient_summary", "chunk_index": i, "date": today.isoformat()},
+                "embedding": embed_text(content),
+            })
+
+    return tables
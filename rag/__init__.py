@@ -1,14 +1,37 @@
-from .chains import build_patient_chain, build_doctor_chain
-from .ingest import ingest_documents, ingest_patient_entry
-from .patient_context import build_and_ingest_patient_context, fetch_patient_data
-from .config import settings
-
-__all__ = [
-    "build_patient_chain",
-    "build_doctor_chain",
-    "ingest_documents",
-    "ingest_patient_entry",
-    "build_and_ingest_patient_context",
-    "fetch_patient_data",
-    "settings",
-]
+"""
+rag — Retrieval-augmented generation for the patient and physician chatbots.
+
+Names below are resolved on first access (PEP 562 __getattr__), so
+`import rag` or `from rag import settings` doesn't load LangChain chains,
+ingestion or the Supabase client until something actually uses them.
+"""
+
+from importlib import import_module
+
+_EXPORTS = {
+    "build_patient_chain": ".chains",
+    "build_doctor_chain": ".chains",
+    "get_patient_chain": ".chains",
+    "get_doctor_chain": ".chains",
+    "ingest_documents": ".ingest",
+    "ingest_patient_entry": ".ingest",
+    "build_and_ingest_patient_context": ".patient_context",
+    "fetch_patient_data": ".patient_context",
+    "afetch_patient_data": ".patient_context",
+    "settings": ".config",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value  # later lookups skip __getattr__
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
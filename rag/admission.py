@@ -0,0 +1,359 @@
+"""
+admission.py — Priority-aware admission control in front of Ollama.
+
+Ollama works through requests in arrival order, so a burst of background
+summaries would queue ahead of a physician's chat.  Every chat-model call goes
+through a per-model gate instead:
+
+  - at most LLM_CONCURRENCY generations run per model at once
+    (LLM_MODEL_CONCURRENCY overrides it per model name)
+  - waiting calls are admitted by priority class, then arrival:
+        INTERACTIVE (chat) > SUMMARY (summary / interpretation) > BATCH (jobs, pre-warm)
+  - BATCH never holds the last free slot when a model has more than one,
+    so interactive work never waits behind a full set of batch generations
+  - when a class's queue is full (LLM_MAX_QUEUE_*), new calls are rejected
+    with AdmissionRejected (the API answers 429 + Retry-After); BATCH has
+    no limit by default, so job workers just block (backpressure)
+
+The priority of a call comes from the `llm_priority` context variable, set
+by whoever starts the generation (API handlers, job workers) and inherited
+by the tasks and runnables it spawns.  A generation shared by several callers
+(singleflight.py) runs under a SharedPriority instead (`llm_shared_priority`):
+when a more urgent caller joins, raise_to() moves the generation's queued
+gate calls into that class, so a physician who joins a pre-warm job doesn't
+wait in the batch queue.  `admitted(llm, model)` wraps a chat model as a
+streaming-transparent runnable for use in the LCEL chains.
+
+Per class the gate counts admissions and rejections and records how long
+calls waited for a slot; stats() returns them for /admission/stats.
+"""
+
+import asyncio
+import contextvars
+import itertools
+import threading
+import time
+from typing import Any, AsyncIterator, Iterator
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.runnables import RunnableConfig, RunnableGenerator
+
+from .config import settings
+from .metrics import ADMISSION_WAIT_SECONDS, LLMCallTimer
+
+INTERACTIVE = 0
+SUMMARY = 1
+BATCH = 2
+
+PRIORITY_NAMES = {INTERACTIVE: "interactive", SUMMARY: "summary", BATCH: "batch"}
+
+llm_priority: contextvars.ContextVar[int] = contextvars.ContextVar("llm_priority", default=INTERACTIVE)
+
+
+class SharedPriority:
+    """Priority of a generation several callers wait on; only ever raised (lower value)."""
+
+    def __init__(self, priority: int):
+        self.priority = priority
+        self._queued: list[tuple["ModelGate", "_Waiter"]] = []
+        self._lock = threading.Lock()
+
+    def raise_to(self, priority: int) -> None:
+        """Adopt `priority` if it is more urgent, re-queueing calls still waiting for a slot."""
+        with self._lock:
+            if priority >= self.priority:
+                return
+            self.priority = priority
+            queued = list(self._queued)
+        for gate, waiter in queued:
+            gate.reprioritize(waiter, priority)
+
+    def _track(self, gate: "ModelGate", waiter: "_Waiter") -> None:
+        with self._lock:
+            self._queued.append((gate, waiter))
+            priority = self.priority
+        # Raised between reading the priority and queueing
+        if priority < waiter.priority:
+            gate.reprioritize(waiter, priority)
+
+    def _untrack(self, waiter: "_Waiter") -> None:
+        with self._lock:
+            self._queued = [(g, w) for g, w in self._queued if w is not waiter]
+
+
+llm_shared_priority: contextvars.ContextVar[SharedPriority | None] = contextvars.ContextVar(
+    "llm_shared_priority", default=None
+)
+
+
+def current_priority() -> tuple[int, SharedPriority | None]:
+    """Priority for an LLM call made now, and the SharedPriority it follows (if any)."""
+    shared = llm_shared_priority.get()
+    return (shared.priority, shared) if shared is not None else (llm_priority.get(), None)
+
+
+class AdmissionRejected(RuntimeError):
+    """Raised when a priority class's queue for a model is full."""
+
+    def __init__(self, model: str, priority: int, queued: int):
+        self.model = model
+        self.priority = priority
+        self.queued = queued
+        super().__init__(
+            f"{PRIORITY_NAMES[priority]} queue for {model} is full ({queued} waiting); retry later"
+        )
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "event", "loop", "future", "granted")
+
+    def __init__(self, priority: int, seq: int, loop: asyncio.AbstractEventLoop | None = None):
+        self.priority = priority
+        self.seq = seq
+        self.loop = loop
+        self.event = None if loop else threading.Event()
+        self.future = loop.create_future() if loop else None
+        self.granted = False
+
+    def wake(self) -> None:
+        self.granted = True
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+
+
+def _resolve(fut: asyncio.Future) -> None:
+    if not fut.done():
+        fut.set_result(None)
+
+
+class _ClassStats:
+    __slots__ = ("admitted", "rejected", "wait_total", "wait_max")
+
+    def __init__(self) -> None:
+        self.admitted = 0
+        self.rejected = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+
+class ModelGate:
+    """Concurrency limiter with priority queueing for one model (thread- and loop-safe)."""
+
+    def __init__(self, model: str, limit: int, max_queue: dict[int, int | None]):
+        self.model = model
+        self.limit = max(1, limit)
+        self.batch_limit = max(1, self.limit - 1)
+        self.max_queue = max_queue
+        self.in_use = 0
+        self.batch_in_use = 0
+        self._waiters: list[_Waiter] = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._stats = {p: _ClassStats() for p in PRIORITY_NAMES}
+
+    # ── slot bookkeeping (call with self._lock held) ─────────────────────────
+
+    def _can_start(self, priority: int) -> bool:
+        if self.in_use >= self.limit:
+            return False
+        return priority != BATCH or self.batch_in_use < self.batch_limit
+
+    def _take(self, priority: int) -> None:
+        self.in_use += 1
+        if priority == BATCH:
+            self.batch_in_use += 1
+
+    def _dispatch(self) -> None:
+        for waiter in sorted(self._waiters, key=lambda w: (w.priority, w.seq)):
+            if self.in_use >= self.limit:
+                return
+            if self._can_start(waiter.priority):
+                self._waiters.remove(waiter)
+                self._take(waiter.priority)
+                waiter.wake()
+
+    def _queued(self, priority: int) -> int:
+        return sum(1 for w in self._waiters if w.priority == priority)
+
+    def _enqueue(self, priority: int, loop: asyncio.AbstractEventLoop | None) -> _Waiter | None:
+        """Take a slot now (returns None) or queue a waiter; raises when the class queue is full."""
+        if self._can_start(priority):
+            self._take(priority)
+            return None
+        limit = self.max_queue.get(priority)
+        queued = self._queued(priority)
+        if limit is not None and queued >= limit:
+            self._stats[priority].rejected += 1
+            raise AdmissionRejected(self.model, priority, queued)
+        waiter = _Waiter(priority, next(self._seq), loop)
+        self._waiters.append(waiter)
+        return waiter
+
+    def _record(self, priority: int, waited: float) -> None:
+        with self._lock:
+            s = self._stats[priority]
+            s.admitted += 1
+            s.wait_total += waited
+            s.wait_max = max(s.wait_max, waited)
+        ADMISSION_WAIT_SECONDS.labels(self.model, PRIORITY_NAMES[priority]).observe(waited)
+
+    # ── public API ───────────────────────────────────────────────────────────
+
+    def check(self, priority: int) -> None:
+        """Raise AdmissionRejected now if a call of this class would be rejected."""
+        with self._lock:
+            if self._can_start(priority):
+                return
+            limit = self.max_queue.get(priority)
+            queued = self._queued(priority)
+            if limit is not None and queued >= limit:
+                self._stats[priority].rejected += 1
+                raise AdmissionRejected(self.model, priority, queued)
+
+    def reprioritize(self, waiter: _Waiter, priority: int) -> None:
+        """Move a queued call to a more urgent class (keeping its arrival order)."""
+        with self._lock:
+            if waiter.granted or waiter not in self._waiters or priority >= waiter.priority:
+                return
+            waiter.priority = priority
+            self._dispatch()
+
+    def acquire(self, priority: int, shared: SharedPriority | None = None) -> int:
+        """Block for a slot; returns the priority it was granted under (pass it to release)."""
+        start = time.monotonic()
+        with self._lock:
+            waiter = self._enqueue(priority, None)
+        if waiter is not None:
+            if shared is not None:
+                shared._track(self, waiter)
+            try:
+                waiter.event.wait()
+            finally:
+                if shared is not None:
+                    shared._untrack(waiter)
+            priority = waiter.priority
+        self._record(priority, time.monotonic() - start)
+        return priority
+
+    async def aacquire(self, priority: int, shared: SharedPriority | None = None) -> int:
+        """Async acquire; returns the priority it was granted under (pass it to release)."""
+        start = time.monotonic()
+        with self._lock:
+            waiter = self._enqueue(priority, asyncio.get_running_loop())
+        if waiter is not None:
+            if shared is not None:
+                shared._track(self, waiter)
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                with self._lock:
+                    if waiter.granted:
+                        self._release_locked(waiter.priority)
+                    else:
+                        self._waiters.remove(waiter)
+                raise
+            finally:
+                if shared is not None:
+                    shared._untrack(waiter)
+            priority = waiter.priority
+        self._record(priority, time.monotonic() - start)
+        return priority
+
+    def _release_locked(self, priority: int) -> None:
+        self.in_use -= 1
+        if priority == BATCH:
+            self.batch_in_use -= 1
+        self._dispatch()
+
+    def release(self, priority: int) -> None:
+        with self._lock:
+            self._release_locked(priority)
+
+    def stats(self) -> dict:
+        with self._lock:
+            classes = {}
+            for p, name in PRIORITY_NAMES.items():
+                s = self._stats[p]
+                classes[name] = {
+                    "queued": self._queued(p),
+                    "admitted": s.admitted,
+                    "rejected": s.rejected,
+                    "wait_avg_seconds": s.wait_total / s.admitted if s.admitted else 0.0,
+                    "wait_max_seconds": s.wait_max,
+                }
+            return {
+                "limit": self.limit,
+                "batch_limit": self.batch_limit,
+                "in_use": self.in_use,
+                "classes": classes,
+            }
+
+
+_gates: dict[str, ModelGate] = {}
+_gates_lock = threading.Lock()
+
+
+def get_gate(model: str) -> ModelGate:
+    with _gates_lock:
+        gate = _gates.get(model)
+        if gate is None:
+            gate = _gates[model] = ModelGate(
+                model,
+                limit=settings.llm_model_concurrency.get(model, settings.llm_concurrency),
+                max_queue={
+                    INTERACTIVE: settings.llm_max_queue_interactive,
+                    SUMMARY: settings.llm_max_queue_summary,
+                    BATCH: settings.llm_max_queue_batch,
+                },
+            )
+        return gate
+
+
+def admission_stats() -> dict:
+    with _gates_lock:
+        gates = dict(_gates)
+    return {model: gate.stats() for model, gate in gates.items()}
+
+
+def admitted(llm: BaseChatModel, model: str) -> RunnableGenerator:
+    """
+    `llm` behind the model's gate.  The slot is held from the first token
+    request until the stream ends, so streaming and invoke are both bounded.
+    Each call's timings and Ollama token counts are recorded (metrics.py).
+    """
+
+    def _combine(items):
+        prompt = None
+        for item in items:
+            prompt = item if prompt is None else prompt + item
+        return prompt
+
+    def transform(inputs: Iterator[Any], config: RunnableConfig) -> Iterator[Any]:
+        prompt = _combine(inputs)
+        gate, (priority, shared) = get_gate(model), current_priority()
+        priority = gate.acquire(priority, shared)
+        timer = LLMCallTimer(model)
+        try:
+            for chunk in llm.stream(prompt, config=config):
+                timer.chunk(chunk)
+                yield chunk
+        finally:
+            timer.finish()
+            gate.release(priority)
+
+    async def atransform(inputs: AsyncIterator[Any], config: RunnableConfig) -> AsyncIterator[Any]:
+        prompt = _combine([item async for item in inputs])
+        gate, (priority, shared) = get_gate(model), current_priority()
+        priority = await gate.aacquire(priority, shared)
+        timer = LLMCallTimer(model)
+        try:
+            async for chunk in llm.astream(prompt, config=config):
+                timer.chunk(chunk)
+                yield chunk
+        finally:
+            timer.finish()
+            gate.release(priority)
+
+    return RunnableGenerator(transform, atransform, name=f"admitted:{model}")
@@ -0,0 +1,265 @@
+"""
+bulk_ingest.py — Resumable bulk knowledge-base ingestion (thousands of guideline PDFs).
+
+Pipeline per run:
+  files matching a glob under a directory
+    → parse + split in a process pool         (PDF parsing is CPU-bound)
+    → one shared queue of chunks from all files, embedded in sized batches
+      with N requests in flight                (small files still fill batches)
+    → bulk upsert of each file once all its chunks are embedded
+    → append the file to the checkpoint        (a restarted run skips finished files)
+
+Memory stays bounded: at most 2 × workers files are parsing at once, and new
+files are only parsed while fewer than 4 × batch × concurrency parsed chunks
+are waiting to be embedded and written.
+
+Chunk ids are deterministic (file path + chunk index + content hash), so a crash
+between the upsert and the checkpoint write just re-upserts the same rows.
+
+CLI:
+    python -m rag.bulk_ingest ./guidelines --pattern "**/*.pdf" \\
+        --checkpoint .cache/guidelines.ckpt --workers 4 --batch-size 64 --concurrency 4
+"""
+
+import argparse
+import hashlib
+import time
+import uuid
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+
+from langchain_core.documents import Document
+
+from .config import settings
+from .embeddings import get_embeddings
+from .ingest import SUPPORTED_SUFFIXES, load_file, split_knowledge_docs
+from .vectorstore import get_documents_store
+
+_KNOWLEDGE_NAMESPACE = uuid.UUID("0b8d7f52-3c6e-4f0a-8d21-7e9a4c1b5f36")
+
+
+@dataclass
+class BulkIngestStats:
+    files_total: int = 0
+    files_skipped: int = 0
+    files_done: int = 0
+    files_failed: int = 0
+    chunks: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    errors: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    @property
+    def docs_per_s(self) -> float:
+        return self.files_done / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def chunks_per_s(self) -> float:
+        return self.chunks / self.elapsed if self.elapsed else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.files_done}/{self.files_total - self.files_skipped} files "
+            f"({self.files_failed} failed, {self.files_skipped} already done) | "
+            f"{self.chunks} chunks | {self.docs_per_s:.2f} docs/s | "
+            f"{self.chunks_per_s:.1f} chunks/s | {self.elapsed:.1f}s"
+        )
+
+
+class _Checkpoint:
+    """Append-only list of finished file paths (one per line)."""
+
+    def __init__(self, path: str | None):
+        self.path = Path(path) if path else None
+        self.done: set[str] = set()
+        if self.path and self.path.exists():
+            self.done = {line.strip() for line in self.path.read_text(encoding="utf-8").splitlines() if line.strip()}
+
+    def mark(self, file_path: str) -> None:
+        self.done.add(file_path)
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(file_path + "\n")
+
+
+def _parse_file(path: str, doc_type: str, date: str) -> list[Document]:
+    """Process-pool worker: load and split one file."""
+    return split_knowledge_docs(load_file(path), Path(path).name, doc_type=doc_type, date=date)
+
+
+def _chunk_id(path: str, index: int, text: str) -> str:
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return str(uuid.uuid5(_KNOWLEDGE_NAMESPACE, f"{path}:{index}:{digest}"))
+
+
+def find_files(root: str | Path, pattern: str = "**/*") -> list[str]:
+    return sorted(
+        str(p) for p in Path(root).glob(pattern)
+        if p.is_file() and p.suffix.lower() in SUPPORTED_SUFFIXES
+    )
+
+
+class _PendingFile:
+    """A parsed file whose chunks are being embedded."""
+
+    def __init__(self, path: str, chunks: list[Document]):
+        self.path = path
+        self.chunks = chunks
+        self.vectors: list[list[float] | None] = [None] * len(chunks)
+        self.remaining = len(chunks)
+        self.error: str | None = None
+
+
+def ingest_directory(
+    root: str | Path,
+    pattern: str = "**/*",
+    doc_type: str = "knowledge",
+    date: str | None = None,
+    checkpoint_path: str | None = None,
+    workers: int | None = None,
+    embed_batch_size: int | None = None,
+    embed_concurrency: int | None = None,
+    progress: Callable[[BulkIngestStats], None] | None = None,
+) -> BulkIngestStats:
+    """
+    Ingest every supported file under `root` matching `pattern` into the knowledge base.
+
+    Args:
+        checkpoint_path:   File recording finished paths; rerunning with the same
+                           checkpoint resumes after the last finished file.
+        workers:           Parser processes (default settings.ingest_workers / CPU count).
+        embed_batch_size:  Texts per embedding request.
+        embed_concurrency: Embedding requests in flight against Ollama.
+        progress:          Called with the running stats after each file.
+    """
+    date = date or datetime.utcnow().date().isoformat()
+    batch_size = embed_batch_size or settings.ingest_embed_batch_size
+    concurrency = embed_concurrency or settings.ingest_embed_concurrency
+    checkpoint = _Checkpoint(checkpoint_path)
+
+    files = find_files(root, pattern)
+    todo = [f for f in files if f not in checkpoint.done]
+    stats = BulkIngestStats(files_total=len(files), files_skipped=len(files) - len(todo))
+    if not todo:
+        return stats
+
+    workers = workers or settings.ingest_workers or os.cpu_count() or 1
+    parse_window = 2 * workers
+    max_buffered_chunks = 4 * batch_size * concurrency
+
+    store = get_documents_store()
+    embeddings = get_embeddings()
+    paths = iter(todo)
+    parsing: dict[Future, str] = {}
+    embedding: dict[Future, list[tuple[_PendingFile, int]]] = {}
+    queued: list[tuple[_PendingFile, int]] = []   # chunks waiting for an embedding batch
+    buffered = 0                                  # parsed chunks not yet written
+
+    def finish(f: _PendingFile | None, path: str, error: str | None = None) -> None:
+        nonlocal buffered
+        chunks = f.chunks if f else []
+        buffered -= len(chunks)
+        error = error or (f.error if f else None)
+        if error is None and chunks:
+            try:
+                ids = [_chunk_id(path, i, c.page_content) for i, c in enumerate(chunks)]
+                store.add_vectors(f.vectors, chunks, ids)
+            except Exception as e:
+                error = str(e)
+        if error is None:
+            checkpoint.mark(path)
+            stats.files_done += 1
+            stats.chunks += len(chunks)
+        else:
+            stats.files_failed += 1
+            stats.errors[path] = error
+        if progress:
+            progress(stats)
+
+    with ProcessPoolExecutor(max_workers=workers) as parse_pool, \
+            ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="rag-embed") as embed_pool:
+        while True:
+            while len(parsing) < parse_window and buffered < max_buffered_chunks:
+                path = next(paths, None)
+                if path is None:
+                    break
+                parsing[parse_pool.submit(_parse_file, path, doc_type, date)] = path
+
+            # Send full batches; a partial one only when no parse can still top it up
+            while len(embedding) < concurrency and (len(queued) >= batch_size or (queued and not parsing)):
+                batch = queued[:batch_size]
+                del queued[:batch_size]
+                texts = [f.chunks[i].page_content for f, i in batch]
+                embedding[embed_pool.submit(embeddings.embed_documents, texts)] = batch
+
+            if not parsing and not embedding:
+                break
+            done, _ = wait([*parsing, *embedding], return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in parsing:
+                    path = parsing.pop(future)
+                    try:
+                        chunks = future.result()
+                    except Exception as e:
+                        finish(None, path, str(e))
+                        continue
+                    if not chunks:
+                        finish(None, path)
+                        continue
+                    pending = _PendingFile(path, chunks)
+                    buffered += len(chunks)
+                    queued.extend((pending, i) for i in range(len(chunks)))
+                else:
+                    batch = embedding.pop(future)
+                    try:
+                        vectors = future.result()
+                    except Exception as e:
+                        vectors = [None] * len(batch)
+                        for f, _ in batch:
+                            f.error = f.error or str(e)
+                    for (f, i), vector in zip(batch, vectors):
+                        f.vectors[i] = vector
+                        f.remaining -= 1
+                        if f.remaining == 0:
+                            finish(f, f.path)
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bulk-ingest a directory of documents into the knowledge base.")
+    parser.add_argument("root", help="Directory to scan")
+    parser.add_argument("--pattern", default="**/*", help="Glob relative to root (default: **/*)")
+    parser.add_argument("--doc-type", default="knowledge")
+    parser.add_argument("--date", default=None, help="Metadata date (default: today)")
+    parser.add_argument("--checkpoint", default=None, help="Checkpoint file for resumable runs")
+    parser.add_argument("--workers", type=int, default=None, help="Parser processes")
+    parser.add_argument("--batch-size", type=int, default=None, help="Texts per embedding request")
+    parser.add_argument("--concurrency", type=int, default=None, help="Embedding requests in flight")
+    args = parser.parse_args()
+
+    stats = ingest_directory(
+        args.root,
+        pattern=args.pattern,
+        doc_type=args.doc_type,
+        date=args.date,
+        checkpoint_path=args.checkpoint,
+        workers=args.workers,
+        embed_batch_size=args.batch_size,
+        embed_concurrency=args.concurrency,
+        progress=lambda s: print(f"\r{s.summary()}", end="", flush=True),
+    )
+    print(f"\r{stats.summary()}")
+    for path, err in stats.errors.items():
+        print(f"  failed: {path}: {err}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,7 @@ chains.py — Assembles the end-to-end RAG pipeline using LangChain LCEL.
 Pipeline (both modes):
   user question
     → retriever  (Supabase pgvector top-k similarity search)
-    → _format_docs  (chunks → single context string)
+    → _format_docs  (chunks → single context string, packed to a token budget)
     → prompt  (system + context + question → chat messages)
     → LLM  (Gemma3:27b via Ollama)
     → StrOutputParser  (extracts text from chat response)
@@ -14,39 +14,52 @@ RunnableParallel passes the original question AND retrieved docs
 into the prompt simultaneously — required because the retriever
 consumes the question but the prompt also needs it as {question}.
 
+Built chains hold no per-request state, so the API layer takes them from a
+bounded LRU/TTL cache keyed by (patient_id, mode, streaming) via
+get_doctor_chain / get_patient_chain instead of rebuilding the vector stores,
+merger retriever and redundancy filter on every request.
+
+The LLM step sits behind the model's admission gate (admission.py), which
+bounds concurrent generations per model and admits waiting calls by priority.
+
 Usage from the API layer:
-    chain = build_patient_chain(patient_id="uuid-here")
+    chain = get_patient_chain(patient_id="uuid-here")
     response = chain.invoke("When was my last flare?")
 
+    # Async (FastAPI request path — embeddings, pgvector RPC and Ollama are all awaited):
+    response = await chain.ainvoke("When was my last flare?")
+
     # Streaming (for responsive UI):
     async for chunk in chain.astream("What is NMOSD?"):
         send_to_client(chunk)
 """
 
-from langchain_core.runnables import RunnableParallel, RunnablePassthrough
+from langchain_core.runnables import RunnableLambda, RunnableParallel, RunnablePassthrough
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.documents import Document
 
+from .admission import admitted
+from .cache import LRUCache
+from .config import settings
+from .context_packer import pack_context
 from .retriever import get_patient_retriever, get_doctor_retriever
 from .llm import get_doctor_llm, get_patient_llm
 from .prompts import patient_prompt, doctor_prompt
 
 
-def _format_docs(docs: list[Document]) -> str:
+def _format_docs(docs: list[Document], budget: int = 0) -> str:
     """
     Concatenate retrieved chunks into a single context block for the prompt.
     Each chunk is separated by a divider so the LLM can distinguish sources.
     Source metadata (document title, patient_id, date) is prepended per chunk
-    so the doctor prompt can cite it.
+    so the doctor prompt can cite it.  Chunks are ranked by relevance and
+    diversity (MMR) and packed until `budget` tokens are used (see context_packer.py).
     """
-    sections = []
-    for i, doc in enumerate(docs, start=1):
-        meta = doc.metadata
-        source = meta.get("source", meta.get("title", f"chunk-{i}"))
-        date = meta.get("date", "")
-        header = f"[{i}] {source}" + (f" ({date})" if date else "")
-        sections.append(f"{header}\n{doc.page_content}")
-    return "\n\n---\n\n".join(sections) if sections else "No relevant context found."
+    return pack_context(docs, budget)
+
+
+def _doc_formatter(budget: int):
+    return RunnableLambda(lambda docs: _format_docs(docs, budget), name="pack_context")
 
 
 def build_patient_chain(patient_id: str, streaming: bool = False):
@@ -61,11 +74,11 @@ def build_patient_chain(patient_id: str, streaming: bool = False):
         A LangChain Runnable that accepts a question string and returns an answer string.
     """
     retriever = get_patient_retriever(patient_id)
-    llm = get_patient_llm(streaming=streaming)
+    llm = admitted(get_patient_llm(streaming=streaming), settings.patient_model)
 
     chain = (
         RunnableParallel({
-            "context": retriever | _format_docs,   # retrieve → format chunks
+            "context": retriever | _doc_formatter(settings.context_token_budget_patient),   # retrieve → pack chunks
             "question": RunnablePassthrough(),      # pass question through unchanged
         })
         | patient_prompt
@@ -91,11 +104,11 @@ def build_doctor_chain(patient_id: str, streaming: bool = False):
         a structured SOAP-adjacent note string.
     """
     retriever = get_doctor_retriever(patient_id)
-    llm = get_doctor_llm(streaming=streaming)
+    llm = admitted(get_doctor_llm(streaming=streaming), settings.doctor_model)
 
     chain = (
         RunnableParallel({
-            "context": retriever | _format_docs,
+            "context": retriever | _doc_formatter(settings.context_token_budget_doctor),
             "question": RunnablePassthrough(),
         })
         | doctor_prompt
@@ -103,3 +116,30 @@ def build_doctor_chain(patient_id: str, streaming: bool = False):
         | StrOutputParser()
     )
     return chain
+
+
+_chain_cache = LRUCache(
+    "chains",
+    maxsize=settings.chain_cache_size,
+    ttl=settings.chain_cache_ttl_seconds,
+)
+
+
+def get_patient_chain(patient_id: str, streaming: bool = False):
+    """Cached build_patient_chain — reuses the built pipeline per (patient, streaming)."""
+    return _chain_cache.get_or_create(
+        (patient_id, "patient", streaming),
+        lambda: build_patient_chain(patient_id, streaming=streaming),
+    )
+
+
+def get_doctor_chain(patient_id: str, streaming: bool = False):
+    """Cached build_doctor_chain — reuses the built pipeline per (patient, streaming)."""
+    return _chain_cache.get_or_create(
+        (patient_id, "doctor", streaming),
+        lambda: build_doctor_chain(patient_id, streaming=streaming),
+    )
+
+
+def chain_cache_stats() -> dict:
+    return _chain_cache.stats()
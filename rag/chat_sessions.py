@@ -0,0 +1,193 @@
+"""
+chat_sessions.py — Multi-turn physician chat with a stable prompt prefix.
+
+/chat is stateless: every question re-retrieves and re-prefills the whole
+patient context.  A session, keyed by (physician_id, patient_id), retrieves
+once and then keeps the conversation as a growing message list:
+
+    [Modelfile SYSTEM]
+    Human: packed patient context      ┐ fixed prefix, built on the first
+    AI:    "Understood."               ┘ question of the session
+    Human: (summary of compacted turns +) question 1
+    AI:    answer 1
+    ...
+    Human: new question
+
+Ollama keeps the KV cache of the last prompt it evaluated and reuses the
+longest matching prefix, so a follow-up only prefills the previous answer and
+the new question.  That holds while the model stays loaded with the same
+options: session turns use the doctor model with CHAT_SESSION_KEEP_ALIVE, and
+with several concurrent sessions OLLAMA_NUM_PARALLEL bounds how many prefixes
+stay cached.
+
+When the turns grow past CHAT_HISTORY_TOKEN_BUDGET, all but the last
+CHAT_KEEP_RECENT_TURNS are compacted into a summary by asking the model in
+the same conversation (so that call reuses the cached prefix too).  It runs
+after the answer has been returned; the next question in the session waits
+for it.  The context prefix is rebuilt only when the patient's data version
+changes (result_cache.py), retrieving for the question that triggered it.
+
+Sessions live in this process, in an LRU with an idle TTL
+(CHAT_SESSION_MAX, CHAT_SESSION_TTL_SECONDS).
+"""
+
+import asyncio
+import logging
+import time
+from typing import AsyncIterator
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.output_parsers import StrOutputParser
+
+from .admission import SUMMARY, admitted, llm_priority
+from .cache import LRUCache
+from .config import settings
+from .context_packer import ContextReport, count_tokens, pack_context, track_context
+from .llm import get_doctor_llm
+from .prompts import (
+    CHAT_PROSE_INSTRUCTION,
+    COMPACTION_PROMPT,
+    SESSION_ACK,
+    SESSION_SUMMARY_PREFIX,
+    session_context_message,
+)
+from .result_cache import apatient_data_version
+from .retriever import get_doctor_retriever
+
+logger = logging.getLogger(__name__)
+
+
+class ChatSession:
+    """Conversation state for one physician and one patient."""
+
+    def __init__(self, physician_id: str, patient_id: str):
+        self.physician_id = physician_id
+        self.patient_id = patient_id
+        self.prefix: list[BaseMessage] = []
+        self.context = ContextReport()
+        self.data_version: int | None = None
+        self.summary: str | None = None
+        self.turns: list[tuple[str, str]] = []   # (question, answer)
+        self.compactions = 0
+        self.created_at = time.time()
+        self.lock = asyncio.Lock()   # one turn (or compaction) at a time
+
+    def _history(self, turns: list[tuple[str, str]]) -> list[BaseMessage]:
+        messages: list[BaseMessage] = []
+        for i, (question, answer) in enumerate(turns):
+            if i == 0 and self.summary:
+                question = SESSION_SUMMARY_PREFIX.format(summary=self.summary) + question
+            messages += [HumanMessage(content=question), AIMessage(content=answer)]
+        return messages
+
+    def messages(self, question: str) -> list[BaseMessage]:
+        return [*self.prefix, *self._history(self.turns), HumanMessage(content=question)]
+
+    def history_tokens(self) -> int:
+        return sum(count_tokens(q) + count_tokens(a) for q, a in self.turns) + count_tokens(self.summary or "")
+
+    def to_dict(self) -> dict:
+        return {
+            "physician_id": self.physician_id,
+            "patient_id": self.patient_id,
+            "turns": len(self.turns),
+            "compactions": self.compactions,
+            "history_tokens": self.history_tokens(),
+            "context": self.context.to_dict(),
+        }
+
+
+_sessions = LRUCache(
+    "chat_sessions",
+    maxsize=settings.chat_session_max,
+    ttl=settings.chat_session_ttl_seconds,
+)
+_compaction_tasks: set[asyncio.Task] = set()
+_stats = {"turns": 0, "prefix_builds": 0, "compactions": 0, "compaction_failures": 0}
+
+
+def _llm():
+    llm = get_doctor_llm(streaming=True, keep_alive=settings.chat_session_keep_alive)
+    return admitted(llm, settings.doctor_model) | StrOutputParser()
+
+
+def get_session(physician_id: str, patient_id: str) -> ChatSession:
+    return _sessions.get_or_create(
+        (physician_id, patient_id),
+        lambda: ChatSession(physician_id, patient_id),
+    )
+
+
+def end_session(physician_id: str, patient_id: str) -> bool:
+    return _sessions.pop((physician_id, patient_id)) is not None
+
+
+async def _ensure_prefix(session: ChatSession, question: str) -> bool:
+    """Build the context prefix if missing or stale; True when it was (re)built."""
+    version = await apatient_data_version(session.patient_id)
+    if session.prefix and session.data_version == version:
+        return False
+    docs = await get_doctor_retriever(session.patient_id).ainvoke(question)
+    report = ContextReport()
+    track_context(report)
+    context = pack_context(docs, settings.context_token_budget_doctor)
+    session.prefix = [HumanMessage(content=session_context_message(context)), AIMessage(content=SESSION_ACK)]
+    session.context = report
+    session.data_version = version
+    _stats["prefix_builds"] += 1
+    return True
+
+
+async def _compact(session: ChatSession) -> None:
+    keep = max(0, settings.chat_keep_recent_turns)
+    if session.history_tokens() <= settings.chat_history_token_budget or len(session.turns) <= keep:
+        return
+    cut = len(session.turns) - keep
+    old = session.turns[:cut]
+    llm_priority.set(SUMMARY)  # this task's own context
+    summary = await _llm().ainvoke([*session.prefix, *session._history(old), HumanMessage(content=COMPACTION_PROMPT)])
+    session.summary = summary.strip()
+    session.turns = session.turns[cut:]
+    session.compactions += 1
+    _stats["compactions"] += 1
+
+
+async def _compact_locked(session: ChatSession) -> None:
+    async with session.lock:
+        try:
+            await _compact(session)
+        except Exception:
+            _stats["compaction_failures"] += 1
+            logger.exception("chat session compaction failed for %s/%s", session.physician_id, session.patient_id)
+
+
+def _schedule_compaction(session: ChatSession) -> None:
+    if session.history_tokens() <= settings.chat_history_token_budget:
+        return
+    task = asyncio.get_running_loop().create_task(_compact_locked(session))
+    _compaction_tasks.add(task)
+    task.add_done_callback(_compaction_tasks.discard)
+
+
+async def astream_turn(session: ChatSession, question: str) -> AsyncIterator[str]:
+    """Token chunks of the session's answer to `question`; the turn is recorded once it completes."""
+    question = question + CHAT_PROSE_INSTRUCTION
+    async with session.lock:
+        await _ensure_prefix(session, question)
+        chunks: list[str] = []
+        async for chunk in _llm().astream(session.messages(question)):
+            if chunk:
+                chunks.append(chunk)
+                yield chunk
+        session.turns.append((question, "".join(chunks)))
+        _stats["turns"] += 1
+    _schedule_compaction(session)
+
+
+async def ask(session: ChatSession, question: str) -> str:
+    chunks = [chunk async for chunk in astream_turn(session, question)]
+    return "".join(chunks)
+
+
+def chat_session_stats() -> dict:
+    return {**_sessions.stats(), **_stats, "compactions_running": len(_compaction_tasks)}
@@ -1,4 +1,5 @@
 import os
+from typing import Literal
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from functools import lru_cache
 from dotenv import load_dotenv
@@ -27,13 +28,76 @@ class Settings(BaseSettings):
     patient_model: str = "gemma3:12b" 
     ollama_embed_model: str = "nomic-embed-text:latest"  
 
+    embed_cache_enabled: bool = True
+    embed_cache_memory_size: int = 10_000
+    embed_cache_path: str = ".cache/embeddings.sqlite3"   # empty → memory tier only
+    embed_cache_max_disk_entries: int = 200_000
+
     documents_table: str = "rag_documents"         
     patient_records_table: str = "rag_patient_records"
 
+    pgvector_probes: int | None = None      # ivfflat.probes per match RPC (None → server default)
+    pgvector_ef_search: int | None = None   # hnsw.ef_search per match RPC (None → server default)
+    index_rebuild_growth: float = 1.5       # ivfflat: rebuild once rows exceed this × rows at build
+
+    vector_backend: Literal["supabase", "local"] = "supabase"
+    local_index_dir: str = ".cache/vector_index"
+    local_index_mode: Literal["exact", "ivf"] = "exact"
+    local_ivf_lists: int = 64
+    local_ivf_probes: int = 8
+
     rag_top_k: int = 5 
     rag_chunk_size: int = 800 
     rag_chunk_overlap: int = 150 
     rag_similarity_threshold: float = 0.5 
+
+    ingest_workers: int | None = None          # parser processes; None → CPU count
+    ingest_embed_batch_size: int = 64
+    ingest_embed_concurrency: int = 4
+
+    chain_cache_size: int = 256
+    chain_cache_ttl_seconds: float = 900
+
+    result_cache_size: int = 1024
+    result_cache_ttl_seconds: float = 6 * 3600
+    data_version_ttl_seconds: float = 2   # how long a worker reuses patients.data_version (migration 010)
+
+    patient_bundle_rpc: bool = True   # get_patient_bundle (migration 007); False → concurrent queries
+
+    context_token_budget_doctor: int = 2500   # packed context tokens per prompt (context_packer.py); 0 = no limit
+    context_token_budget_patient: int = 1500
+    context_mmr_lambda: float = 0.7           # 1 = pure relevance, lower favours diverse chunks
+    context_tokenizer: str = "cl100k_base"
+
+    chat_session_max: int = 256                   # (physician, patient) chat sessions kept (chat_sessions.py)
+    chat_session_ttl_seconds: float = 1800        # idle time before a session is dropped
+    chat_session_keep_alive: str = "30m"          # Ollama keep_alive for session turns
+    chat_history_token_budget: int = 1500         # turns beyond this are compacted into a summary
+    chat_keep_recent_turns: int = 2               # turns always kept verbatim
+
+    llm_concurrency: int = 2                        # generations in flight per chat model (admission.py)
+    llm_model_concurrency: dict[str, int] = {}      # per-model overrides, e.g. {"doctor-chatbot": 3}
+    llm_max_queue_interactive: int | None = 32      # queued calls per class before 429
+    llm_max_queue_summary: int | None = 16
+    llm_max_queue_batch: int | None = None          # None: never reject, callers block
+
+    job_workers: int = 2                  # background generation threads (jobs.py)
+    job_db_path: str | None = None        # set to persist jobs in SQLite, e.g. .cache/jobs.sqlite3
+    job_retention_seconds: float = 24 * 3600
+
+    prewarm_enabled: bool = False         # run the pre-warm scheduler inside the API (prewarm.py)
+    prewarm_interval_minutes: float = 60  # rolling passes; keep well below the horizon
+    prewarm_horizon_hours: float = 6     # look-ahead per pass; keep within RESULT_CACHE_TTL_SECONDS
+
+    dashboard_rollups: bool = True    # patient_daily_rollups (migration 008); False → compute from raw logs
+    dashboard_rollup_days: int = 180  # rollup window read per dashboard request
+
+    warmup_enabled: bool = True          # warm clients and models after startup; gates /ready (warmup.py)
+    warmup_models: bool = True           # include preloading the chat models into Ollama
+    warmup_retry_seconds: float = 5
+
+    roster_page_size: int = 500
+    roster_max_page_size: int = 1000
  
     app_env: str = "development"
     log_level: str = "INFO"
@@ -0,0 +1,169 @@
+"""
+context_packer.py — Fit retrieved chunks into a token budget before prompting.
+
+The doctor retriever can return 16 chunks of ~800 characters, and on CPU
+inference the prompt prefill dominates latency, so the context block is
+packed to a per-mode token budget (CONTEXT_TOKEN_BUDGET_DOCTOR / _PATIENT)
+instead of concatenating everything:
+
+  1. every chunk is rendered with its citation header and its tokens counted
+  2. chunks are picked greedily by MMR —
+         λ · similarity(query, chunk) − (1 − λ) · max similarity(chunk, picked)
+     using the query similarity the vector store returned (metadata[SCORE_KEY])
+     and the stored chunk embeddings (metadata[EMBEDDING_KEY]), so no extra
+     embedding calls are made
+  3. a chunk that doesn't fit the remaining budget is skipped and the next
+     best one is tried
+
+Tokens are counted with tiktoken (CONTEXT_TOKENIZER, default cl100k_base).
+It's not the served model's tokenizer, but it tracks it closely enough to
+size a budget.  If the encoding can't be loaded (tiktoken fetches it on
+first use), counts fall back to a characters/4 estimate.
+
+Each packing is recorded in the current request's ContextReport (see
+track_context), so the API can report the packed token count per request.
+"""
+
+import contextvars
+import logging
+import math
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+
+import numpy as np
+from langchain_core.documents import Document
+
+from .config import settings
+from .metrics import CONTEXT_TOKENS
+from .supabase_vectorstore import EMBEDDING_KEY, SCORE_KEY
+
+logger = logging.getLogger(__name__)
+
+DIVIDER = "\n\n---\n\n"
+
+
+@dataclass
+class ContextReport:
+    """What went into the prompt's context block for one generation."""
+    chunks_retrieved: int = 0
+    chunks_packed: int = 0
+    tokens_retrieved: int = 0
+    tokens_packed: int = 0
+    token_budget: int = 0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def update_from(self, other: "ContextReport") -> None:
+        self.__dict__.update(asdict(other))
+
+
+_current_report: contextvars.ContextVar[ContextReport | None] = contextvars.ContextVar("context_report", default=None)
+
+
+def track_context(report: ContextReport | None = None) -> ContextReport:
+    """Record packings in the current context into `report` (a new one by default)."""
+    report = report if report is not None else ContextReport()
+    _current_report.set(report)
+    return report
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding(settings.context_tokenizer)
+    except Exception as e:
+        logger.warning("tiktoken encoding %r unavailable (%s); estimating tokens from length", settings.context_tokenizer, e)
+        return None
+
+
+def count_tokens(text: str) -> int:
+    enc = _encoding()
+    if enc is None:
+        return math.ceil(len(text) / 4)
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def _render(doc: Document, index: int) -> str:
+    meta = doc.metadata
+    source = meta.get("source", meta.get("title", f"chunk-{index}"))
+    date = meta.get("date", "")
+    header = f"[{index}] {source}" + (f" ({date})" if date else "")
+    return f"{header}\n{doc.page_content}"
+
+
+def _relevance(docs: list[Document]) -> np.ndarray:
+    """Query similarity per chunk; rank-based when the store didn't return scores."""
+    n = len(docs)
+    scores = [d.metadata.get(SCORE_KEY) for d in docs]
+    if all(s is not None for s in scores):
+        return np.asarray(scores, dtype=np.float32)
+    return np.linspace(1.0, 0.5, n, dtype=np.float32) if n > 1 else np.ones(n, dtype=np.float32)
+
+
+def _pairwise(docs: list[Document]) -> np.ndarray | None:
+    """Cosine similarity between chunks from their stored vectors (0 where a vector is missing)."""
+    vectors = [d.metadata.get(EMBEDDING_KEY) for d in docs]
+    have = [i for i, v in enumerate(vectors) if v is not None]
+    if len(have) < 2:
+        return None
+    mat = np.vstack([np.asarray(vectors[i], dtype=np.float32) for i in have])
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    unit = mat / np.where(norms == 0, 1.0, norms)
+    sim = np.zeros((len(docs), len(docs)), dtype=np.float32)
+    sim[np.ix_(have, have)] = unit @ unit.T
+    return sim
+
+
+def _mmr_order(relevance: np.ndarray, pairwise: np.ndarray | None, lambda_mult: float) -> list[int]:
+    remaining = list(range(len(relevance)))
+    order: list[int] = []
+    while remaining:
+        if pairwise is None or not order:
+            best = max(remaining, key=lambda i: relevance[i])
+        else:
+            redundancy = pairwise[np.ix_(remaining, order)].max(axis=1)
+            mmr = lambda_mult * relevance[remaining] - (1 - lambda_mult) * redundancy
+            best = remaining[int(np.argmax(mmr))]
+        order.append(best)
+        remaining.remove(best)
+    return order
+
+
+def pack_context(docs: list[Document], budget: int, lambda_mult: float | None = None) -> str:
+    """
+    Context block for the prompt: MMR-ranked chunks that fit in `budget` tokens
+    (numbered in the order they are packed).  budget <= 0 keeps every chunk.
+    """
+    lambda_mult = settings.context_mmr_lambda if lambda_mult is None else lambda_mult
+    report = _current_report.get()
+    if not docs:
+        if report is not None:
+            report.token_budget = budget
+        return "No relevant context found."
+
+    order = _mmr_order(_relevance(docs), _pairwise(docs), lambda_mult)
+    divider_tokens = count_tokens(DIVIDER)
+    sections: list[str] = []
+    used = retrieved = 0
+    for i in order:
+        # Rendered with the citation number it would get if packed next
+        text = _render(docs[i], len(sections) + 1)
+        cost = count_tokens(text) + (divider_tokens if sections else 0)
+        retrieved += cost
+        if budget > 0 and used + cost > budget:
+            continue
+        sections.append(text)
+        used += cost
+
+    CONTEXT_TOKENS.labels("retrieved").observe(retrieved)
+    CONTEXT_TOKENS.labels("packed").observe(used)
+    if report is not None:
+        report.chunks_retrieved = len(docs)
+        report.chunks_packed = len(sections)
+        report.tokens_retrieved = retrieved
+        report.tokens_packed = used
+        report.token_budget = budget
+    return DIVIDER.join(sections) if sections else "No relevant context found."
@@ -2,12 +2,29 @@
 dashboard.py — Compute dashboard metrics from patient data.
 
 Used by API to serve dynamic physician dashboard: insights, adherence by week, etc.
+
+compute_dashboard parses symptom_logs and adherence once into NumPy columns
+(SymptomFrame / AdherenceFrame) and derives every chart from those, instead of
+re-walking and re-parsing the raw rows per chart.  The compute_* functions keep
+their signatures and output for callers that need a single metric.
+
+When the daily rollup table is available (migration 008, see rollups.py),
+get_dashboard_data builds the same charts from per-day rollup rows within the
+DASHBOARD_ROLLUP_DAYS window (RollupFrame), so the cost follows the weeks shown
+rather than the patient's history.  The history lists ("raw") still cover the
+patient's full history (the physician's calendar pages back to any month), and
+can be skipped with include_history=False.
 """
 
+import asyncio
+import heapq
 from datetime import datetime, timedelta
-from collections import defaultdict
+from typing import NamedTuple
+
+import numpy as np
 
-from .patient_context import fetch_patient_data
+from .patient_context import _empty_bundle, afetch_patient_data, fetch_patient_data
+from .rollups import _rollups_enabled, afetch_dashboard_rollups, fetch_dashboard_rollups
 
 
 def _parse_date(s: str | None) -> datetime | None:
@@ -34,54 +51,114 @@ def _norm_taken(v) -> bool:
     return False
 
 
-def compute_insights(data: dict) -> dict:
-    """
-    Compute flare days (30d), medication adherence %, and actionable trend.
-    """
-    now = datetime.utcnow()
-    cutoff_30 = (now - timedelta(days=30)).date().isoformat()
+class SymptomFrame(NamedTuple):
+    """Columnar view of symptom_logs, parsed once (rows with a parseable logged_at)."""
+    day: np.ndarray        # datetime64[D] — calendar date as written in logged_at
+    week: np.ndarray       # int64 year*100 + %W, same buckets as strftime("%Y-W%W")
+    severity: np.ndarray   # int64
+    names: list[str]       # sorted unique symptom names across all logs
+
+
+class AdherenceFrame(NamedTuple):
+    """Columnar view of medication adherence logs."""
+    count: int             # raw number of logs
+    norm_date: np.ndarray  # str, _norm_date(logged_date)
+    taken: np.ndarray      # bool
+    week: np.ndarray       # int64 week key, -1 where logged_date doesn't parse
+
+
+class RollupFrame(NamedTuple):
+    """Columnar view of patient_daily_rollups rows (one per patient/day)."""
+    day: np.ndarray           # datetime64[D]
+    week: np.ndarray          # int64 week key
+    max_severity: np.ndarray  # int64
+    log_count: np.ndarray     # int64
+    flare: np.ndarray         # bool
+    doses_taken: np.ndarray   # int64
+    doses_total: np.ndarray   # int64
+
+
+def _severity(v) -> int:
+    try:
+        return int(v or 0)
+    except (ValueError, TypeError):
+        return 0
 
-    flare_days = 0
-    flare_dates = set()
-    for sl in data.get("symptom_logs", []):
-        logged = sl.get("logged_at")
-        dt = _parse_date(logged)
+
+def _week_keys(days: np.ndarray) -> np.ndarray:
+    """Vectorised strftime("%Y-W%W") as sortable ints: Monday-based week, days before the first Monday are week 0."""
+    years = days.astype("datetime64[Y]")
+    yday = (days - years.astype("datetime64[D]")).astype(np.int64)
+    weekday = (days.astype(np.int64) + 3) % 7          # 1970-01-01 was a Thursday; Monday = 0
+    return (years.astype(np.int64) + 1970) * 100 + (yday + 7 - weekday) // 7
+
+
+def _symptom_name(sl: dict) -> str | None:
+    sym = sl.get("symptoms")
+    if isinstance(sym, dict):
+        return sym.get("name")
+    if isinstance(sym, list) and sym:
+        return sym[0].get("name") if isinstance(sym[0], dict) else None
+    return None
+
+
+def build_symptom_frame(logs: list) -> SymptomFrame:
+    days, sevs, names = [], [], set()
+    for sl in logs:
+        n = _symptom_name(sl)
+        if n:
+            names.add(n)
+        dt = _parse_date(sl.get("logged_at"))
         if not dt:
             continue
-        day_str = dt.date().isoformat()
-        if day_str < cutoff_30:
-            continue
-        sev = sl.get("severity")
-        try:
-            sev_int = int(sev) if sev is not None else 0
-        except (ValueError, TypeError):
-            sev_int = 0
-        if sev_int > 4:
-            flare_dates.add(day_str)
-    flare_days = len(flare_dates)
+        days.append(dt.date())
+        sevs.append(_severity(sl.get("severity")))
+    day = np.array(days, dtype="datetime64[D]")
+    return SymptomFrame(
+        day=day,
+        week=_week_keys(day),
+        severity=np.array(sevs, dtype=np.int64),
+        names=sorted(names),
+    )
 
-    # Adherence: % of logs where taken=True in last 30 days
-    adherence_logs = [
-        a for a in data.get("adherence", [])
-        if _norm_date(a.get("logged_date")) >= cutoff_30
-    ]
-    total = len(adherence_logs)
-    taken = sum(1 for a in adherence_logs if _norm_taken(a.get("taken")))
-    adherence_pct = round((taken / total * 100) if total else 0)
 
-    # Actionable: most recent symptom with severity > 4, or "Stable"
-    sl_sorted = sorted(
-        data.get("symptom_logs", []),
-        key=lambda x: x.get("logged_at", "") or "",
-        reverse=True,
+def build_adherence_frame(logs: list) -> AdherenceFrame:
+    norm_dates, taken, days = [], [], []
+    for a in logs:
+        d = a.get("logged_date")
+        norm_dates.append(_norm_date(d))
+        taken.append(_norm_taken(a.get("taken")))
+        day = None
+        if d:
+            try:
+                day = datetime.fromisoformat(str(d).split("T")[0].split(" ")[0][:10]).date()
+            except (ValueError, TypeError):
+                pass
+        days.append(day)
+    valid = np.array([d is not None for d in days], dtype=bool)
+    week = np.full(len(days), -1, dtype=np.int64)
+    if valid.any():
+        week[valid] = _week_keys(np.array([d for d in days if d is not None], dtype="datetime64[D]"))
+    return AdherenceFrame(
+        count=len(logs),
+        norm_date=np.array(norm_dates, dtype=str),
+        taken=np.array(taken, dtype=bool),
+        week=week,
     )
-    actionable_val = "Stable"
-    actionable_sub = "no concerning trends"
-    for sl in sl_sorted[:5]:
-        try:
-            sev = int(sl.get("severity") or 0)
-        except (ValueError, TypeError):
-            sev = 0
+
+
+def _last_weeks(weeks: np.ndarray, values: np.ndarray, key: str) -> list[dict]:
+    """Last 4 weeks (ascending) as W1..W4, zero-padded when fewer weeks have data."""
+    result = [{"week": f"W{i}", key: int(v)} for i, v in enumerate(values[-4:], start=1)]
+    while len(result) < 4:
+        result.append({"week": f"W{len(result) + 1}", key: 0})
+    return result
+
+
+def _actionable(latest: list) -> tuple[str, str]:
+    """Most recent symptom with severity > 4 among the latest logs, or "Stable"."""
+    for sl in latest:
+        sev = _severity(sl.get("severity"))
         if sev > 4:
             sym = sl.get("symptoms")
             if isinstance(sym, list) and sym:
@@ -90,12 +167,29 @@ def compute_insights(data: dict) -> dict:
                 sym_name = sym.get("name", "Symptom")
             else:
                 sym_name = "Symptom"
-            logged = sl.get("logged_at", "")
-            dt = _parse_date(logged)
+            dt = _parse_date(sl.get("logged_at", ""))
             date_str = dt.strftime("%b %d") if dt else ""
-            actionable_val = f"↑ {sym_name}"
-            actionable_sub = f"severity {sev}/10" + (f" since {date_str}" if date_str else "")
-            break
+            return f"↑ {sym_name}", f"severity {sev}/10" + (f" since {date_str}" if date_str else "")
+    return "Stable", "no concerning trends"
+
+
+def _insights(data: dict, symptoms: SymptomFrame, adherence: AdherenceFrame) -> dict:
+    now = datetime.utcnow()
+    cutoff_30 = (now - timedelta(days=30)).date()
+
+    # Flare days: distinct days in the last 30 with severity > 4
+    recent_flares = (symptoms.severity > 4) & (symptoms.day >= np.datetime64(cutoff_30, "D"))
+    flare_days = int(np.unique(symptoms.day[recent_flares]).size)
+
+    # Adherence: % of logs where taken=True in last 30 days
+    in_window = adherence.norm_date >= cutoff_30.isoformat() if adherence.count else np.zeros(0, dtype=bool)
+    total = int(in_window.sum())
+    taken = int((adherence.taken & in_window).sum())
+    adherence_pct = round((taken / total * 100) if total else 0)
+
+    # Actionable: most recent symptom with severity > 4, or "Stable"
+    latest = heapq.nlargest(5, data.get("symptom_logs", []), key=lambda x: x.get("logged_at", "") or "")
+    actionable_val, actionable_sub = _actionable(latest)
 
     return {
         "flare_days": flare_days,
@@ -105,164 +199,218 @@ def compute_insights(data: dict) -> dict:
     }
 
 
-def compute_adherence_by_week(data: dict) -> list[dict]:
-    """
-    Group adherence by week (W1, W2, ...) and return % taken per week.
-    """
-    logs = data.get("adherence", [])
-    if not logs:
+def _adherence_by_week(adherence: AdherenceFrame) -> list[dict]:
+    if not adherence.count:
         return [{"week": f"W{i}", "adherence": 0} for i in range(1, 5)]
+    valid = adherence.week >= 0
+    weeks, inverse = np.unique(adherence.week[valid], return_inverse=True)
+    taken = np.bincount(inverse, weights=adherence.taken[valid], minlength=len(weeks))
+    counts = np.bincount(inverse, minlength=len(weeks))
+    pcts = [round(int(t) / int(c) * 100) for t, c in zip(taken[-4:], counts[-4:])]
+    return _last_weeks(weeks, np.array(pcts, dtype=np.int64), "adherence")
+
+
+def _severity_trend(symptoms: SymptomFrame) -> list[dict]:
+    """One point per day (max severity), last 14 days with logs."""
+    if not symptoms.day.size:
+        return []
+    order = np.argsort(symptoms.day, kind="stable")
+    days, starts = np.unique(symptoms.day[order], return_index=True)
+    daily_max = np.maximum.reduceat(symptoms.severity[order], starts)
+    return [
+        {"date": d.astype(object).strftime("%b %d"), "severity": int(sev)}
+        for d, sev in zip(days[-14:], daily_max[-14:])
+    ]
 
-    # Group by week (ISO week)
-    week_counts: dict[str, list[bool]] = defaultdict(list)
-    for a in logs:
-        d = a.get("logged_date")
-        if not d:
-            continue
-        try:
-            date_part = str(d).split("T")[0].split(" ")[0][:10]
-            dt = datetime.fromisoformat(date_part)
-            week_key = dt.strftime("%Y-W%W")
-            week_counts[week_key].append(_norm_taken(a.get("taken")))
-        except (ValueError, TypeError):
-            continue
 
-    # Get last 4 weeks, ordered
-    sorted_weeks = sorted(week_counts.keys(), reverse=True)[:4]
-    sorted_weeks.reverse()
+def _flare_days_by_week(symptoms: SymptomFrame) -> list[dict]:
+    flare_days = np.unique(symptoms.day[symptoms.severity > 4])
+    weeks, counts = np.unique(_week_keys(flare_days), return_counts=True)
+    return _last_weeks(weeks, counts, "flareDays")
 
-    result = []
-    for i, wk in enumerate(sorted_weeks, start=1):
-        vals = week_counts[wk]
-        pct = round((sum(vals) / len(vals) * 100) if vals else 0)
-        result.append({"week": f"W{i}", "adherence": pct})
 
-    # Pad to 4 weeks if fewer
-    while len(result) < 4:
-        result.append({"week": f"W{len(result) + 1}", "adherence": 0})
+def _symptom_frequency_by_week(symptoms: SymptomFrame) -> list[dict]:
+    weeks, counts = np.unique(symptoms.week, return_counts=True)
+    return _last_weeks(weeks, counts, "count")
+
+
+def compute_dashboard(data: dict) -> dict:
+    """
+    All dashboard aggregates from one parse of symptom_logs and adherence.
+    Timestamps are parsed once into datetime64 columns; weekly/daily buckets
+    are vectorised groupbys over those columns.
+    """
+    symptoms = build_symptom_frame(data.get("symptom_logs", []))
+    adherence = build_adherence_frame(data.get("adherence", []))
+    return {
+        "insights": _insights(data, symptoms, adherence),
+        "adherence_by_week": _adherence_by_week(adherence),
+        "symptom_severity_trend": _severity_trend(symptoms),
+        "symptom_names": symptoms.names,
+        "flare_days_by_week": _flare_days_by_week(symptoms),
+        "symptom_frequency_by_week": _symptom_frequency_by_week(symptoms),
+    }
+
 
-    return result[:4]
+def compute_insights(data: dict) -> dict:
+    """
+    Compute flare days (30d), medication adherence %, and actionable trend.
+    """
+    return _insights(
+        data,
+        build_symptom_frame(data.get("symptom_logs", [])),
+        build_adherence_frame(data.get("adherence", [])),
+    )
+
+
+def compute_adherence_by_week(data: dict) -> list[dict]:
+    """
+    Group adherence by week (W1, W2, ...) and return % taken per week.
+    """
+    return _adherence_by_week(build_adherence_frame(data.get("adherence", [])))
 
 
 def _symptom_names_from_logs(logs: list) -> list[str]:
     """Extract unique symptom names from symptom_logs."""
-    names = set()
-    for sl in logs:
-        sym = sl.get("symptoms")
-        if isinstance(sym, dict):
-            n = sym.get("name")
-        elif isinstance(sym, list) and sym:
-            n = sym[0].get("name") if isinstance(sym[0], dict) else None
-        else:
-            n = None
-        if n:
-            names.add(n)
-    return sorted(names)
+    return sorted({n for n in map(_symptom_name, logs) if n})
 
 
 def compute_symptom_severity_trend(data: dict) -> tuple[list[dict], list[str]]:
     """
     Severity over time for line chart — one point per day (max severity), sorted by date.
     """
-    logs = data.get("symptom_logs", [])
-    by_date: dict[str, list[int]] = defaultdict(list)
-    for sl in logs:
-        logged = sl.get("logged_at")
-        dt = _parse_date(logged)
-        if not dt:
-            continue
-        try:
-            sev = int(sl.get("severity") or 0)
-        except (ValueError, TypeError):
-            sev = 0
-        by_date[dt.date().isoformat()].append(sev)
-    # One point per day: use max severity
-    points = []
-    for d, sevs in by_date.items():
-        try:
-            ts = datetime.fromisoformat(d).date()
-        except (ValueError, TypeError):
-            continue
-        points.append({"date": d, "severity": max(sevs), "_ts": ts})
-    points.sort(key=lambda x: x["_ts"])
-    result = [{"date": p["_ts"].strftime("%b %d"), "severity": p["severity"]} for p in points[-14:]]
-    symptom_names = _symptom_names_from_logs(logs)
-    return result, symptom_names
+    frame = build_symptom_frame(data.get("symptom_logs", []))
+    return _severity_trend(frame), frame.names
 
 
 def compute_flare_days_by_week(data: dict) -> list[dict]:
     """
     Count of days with severity > 4 per week (bar chart).
     """
-    logs = data.get("symptom_logs", [])
-    week_flare_dates: dict[str, set[str]] = defaultdict(set)
-    for sl in logs:
-        logged = sl.get("logged_at")
-        dt = _parse_date(logged)
-        if not dt:
-            continue
-        try:
-            sev = int(sl.get("severity") or 0)
-        except (ValueError, TypeError):
-            sev = 0
-        if sev <= 4:
-            continue
-        week_key = dt.strftime("%Y-W%W")
-        week_flare_dates[week_key].add(dt.date().isoformat())
-    sorted_weeks = sorted(week_flare_dates.keys(), reverse=True)[:4]
-    sorted_weeks.reverse()
-    result = [{"week": f"W{i}", "flareDays": len(week_flare_dates[wk])} for i, wk in enumerate(sorted_weeks, 1)]
-    while len(result) < 4:
-        result.append({"week": f"W{len(result) + 1}", "flareDays": 0})
-    return result[:4]
+    return _flare_days_by_week(build_symptom_frame(data.get("symptom_logs", [])))
 
 
 def compute_symptom_frequency_by_week(data: dict) -> list[dict]:
     """
     Count of symptom log entries per week (bar chart).
     """
-    logs = data.get("symptom_logs", [])
-    week_counts: dict[str, int] = defaultdict(int)
-    for sl in logs:
-        logged = sl.get("logged_at")
-        dt = _parse_date(logged)
-        if not dt:
-            continue
-        week_key = dt.strftime("%Y-W%W")
-        week_counts[week_key] += 1
-    sorted_weeks = sorted(week_counts.keys(), reverse=True)[:4]
-    sorted_weeks.reverse()
-    result = [{"week": f"W{i}", "count": week_counts[wk]} for i, wk in enumerate(sorted_weeks, 1)]
-    while len(result) < 4:
-        result.append({"week": f"W{len(result) + 1}", "count": 0})
-    return result[:4]
+    return _symptom_frequency_by_week(build_symptom_frame(data.get("symptom_logs", [])))
+
+
+def build_rollup_frame(days: list) -> RollupFrame:
+    day = np.array([r["day"][:10] for r in days], dtype="datetime64[D]")
+
+    def col(key: str) -> np.ndarray:
+        return np.array([r.get(key) or 0 for r in days], dtype=np.int64)
+
+    return RollupFrame(
+        day=day,
+        week=_week_keys(day),
+        max_severity=col("max_severity"),
+        log_count=col("log_count"),
+        flare=np.array([bool(r.get("flare")) for r in days], dtype=bool),
+        doses_taken=col("doses_taken"),
+        doses_total=col("doses_total"),
+    )
+
 
+def _weekly_sums(frame: RollupFrame, values: np.ndarray, mask: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    weeks, inverse = np.unique(frame.week[mask], return_inverse=True)
+    return weeks, np.bincount(inverse, weights=values[mask], minlength=len(weeks)).astype(np.int64)
 
-def get_dashboard_data(patient_id: str) -> dict:
+
+def compute_dashboard_from_rollups(rollups: dict) -> dict:
     """
-    Fetch patient data and compute all dashboard metrics.
-    Returns dict suitable for API response.
+    The compute_dashboard output, built from get_dashboard_rollups rows.
+    Each rollup day carries exactly what the raw-log charts reduce a day to
+    (max severity, log count, flare flag, doses taken/total).
     """
-    data = fetch_patient_data(patient_id)
-    patient = data.get("patient") or {}
-    disease = data.get("disease") or {}
-    insights = compute_insights(data)
-    adherence_by_week = compute_adherence_by_week(data)
-    symptom_severity_trend, symptom_names = compute_symptom_severity_trend(data)
-    flare_days_by_week = compute_flare_days_by_week(data)
-    symptom_frequency_by_week = compute_symptom_frequency_by_week(data)
+    frame = build_rollup_frame(rollups.get("days") or [])
+    cutoff_30 = np.datetime64((datetime.utcnow() - timedelta(days=30)).date(), "D")
+    recent = frame.day >= cutoff_30
+    total = int(frame.doses_total[recent].sum())
+    taken = int(frame.doses_taken[recent].sum())
+    actionable_val, actionable_sub = _actionable(rollups.get("latest_logs") or [])
+
+    dosed = frame.doses_total > 0
+    weeks, week_taken = _weekly_sums(frame, frame.doses_taken, dosed)
+    _, week_total = _weekly_sums(frame, frame.doses_total, dosed)
+    pcts = [round(int(t) / int(c) * 100) for t, c in zip(week_taken[-4:], week_total[-4:])]
+
+    logged = frame.log_count > 0
+    flare_weeks, flare_counts = np.unique(frame.week[frame.flare], return_counts=True)
+    freq_weeks, freq_counts = _weekly_sums(frame, frame.log_count, logged)
 
     return {
-        "patient": {
-            "id": patient.get("id"),
-            "name": patient.get("name", "Unknown"),
-            "condition": disease.get("name", "Unknown"),
+        "insights": {
+            "flare_days": int((frame.flare & recent).sum()),
+            "adherence_pct": round((taken / total * 100) if total else 0),
+            "actionable_val": actionable_val,
+            "actionable_sub": actionable_sub,
         },
-        "insights": insights,
-        "adherence_by_week": adherence_by_week,
-        "symptom_severity_trend": symptom_severity_trend,
-        "symptom_names": symptom_names,
-        "flare_days_by_week": flare_days_by_week,
-        "symptom_frequency_by_week": symptom_frequency_by_week,
-        "raw": data,
+        "adherence_by_week": _last_weeks(weeks, np.array(pcts, dtype=np.int64), "adherence"),
+        "symptom_severity_trend": [
+            {"date": d.astype(object).strftime("%b %d"), "severity": int(sev)}
+            for d, sev in zip(frame.day[logged][-14:], frame.max_severity[logged][-14:])
+        ],
+        "symptom_names": list(rollups.get("symptom_names") or []),
+        "flare_days_by_week": _last_weeks(flare_weeks, flare_counts, "flareDays"),
+        "symptom_frequency_by_week": _last_weeks(freq_weeks, freq_counts, "count"),
+    }
+
+
+def _patient_header(patient: dict | None, disease: dict | None) -> dict:
+    patient = patient or {}
+    disease = disease or {}
+    return {
+        "id": patient.get("id"),
+        "name": patient.get("name", "Unknown"),
+        "condition": disease.get("name", "Unknown"),
     }
+
+
+def _dashboard_from_data(data: dict, include_history: bool = True) -> dict:
+    return {
+        "patient": _patient_header(data.get("patient"), data.get("disease")),
+        **compute_dashboard(data),
+        "raw": data if include_history else _empty_bundle(),
+    }
+
+
+def _dashboard_from_rollups(rollups: dict, raw: dict | None) -> dict:
+    return {
+        "patient": _patient_header(rollups.get("patient"), rollups.get("disease")),
+        **compute_dashboard_from_rollups(rollups),
+        "raw": raw or _empty_bundle(),
+    }
+
+
+def get_dashboard_data(patient_id: str, include_history: bool = True) -> dict:
+    """
+    Fetch patient data and compute all dashboard metrics.
+    Metrics come from the daily rollups when available, so they cost
+    O(weeks shown); the history lists (include_history) are the full history.
+    Without rollups everything is computed from the full raw history.
+    Returns dict suitable for API response.
+    """
+    rollups = fetch_dashboard_rollups(patient_id)
+    if rollups is None:
+        return _dashboard_from_data(fetch_patient_data(patient_id), include_history)
+    raw = fetch_patient_data(patient_id) if include_history else None
+    return _dashboard_from_rollups(rollups, raw)
+
+
+async def aget_dashboard_data(patient_id: str, include_history: bool = True) -> dict:
+    """Async twin of get_dashboard_data (fetches via the async Supabase client)."""
+    if not _rollups_enabled():
+        return _dashboard_from_data(await afetch_patient_data(patient_id), include_history)
+    if not include_history:
+        rollups, raw = await afetch_dashboard_rollups(patient_id), None
+    else:
+        rollups, raw = await asyncio.gather(
+            afetch_dashboard_rollups(patient_id),
+            afetch_patient_data(patient_id),
+        )
+    if rollups is None:  # get_dashboard_rollups turned out to be missing
+        return _dashboard_from_data(await afetch_patient_data(patient_id), include_history)
+    return _dashboard_from_rollups(rollups, raw)
@@ -11,13 +11,244 @@ Why nomic-embed-text?
 Swap path (when ready):
   Set OLLAMA_EMBED_MODEL=<other model> or replace OllamaEmbeddings with
   langchain_openai.OpenAIEmbeddings and add OPENAI_API_KEY to .env.
+
+Caching:
+  Queries, re-ingested patient summaries and redundancy-filter passes keep
+  embedding the same text.  `CachedEmbeddings` wraps the model with two tiers
+  keyed by sha256(model, text):
+    1. in-memory LRU (EMBED_CACHE_MEMORY_SIZE entries)
+    2. on-disk SQLite store of float32 blobs (EMBED_CACHE_PATH), trimmed to
+       EMBED_CACHE_MAX_DISK_ENTRIES least-recently-used rows
+  Only misses reach Ollama, batched into a single embed call.  The async
+  methods run the disk tier in a worker thread, off the event loop.
+
+Every call on the model get_embeddings() returns is timed as the "embed"
+stage in rag_stage_seconds (metrics.py), cache hits included.
 """
 
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
 from functools import lru_cache
-from langchain_ollama import OllamaEmbeddings
+
+import numpy as np
 from langchain_core.embeddings import Embeddings
 
+from .cache import LRUCache
 from .config import settings
+from .metrics import stage_timer
+
+
+class _DiskEmbeddingStore:
+    """Content-addressed SQLite store: key → float32 vector blob."""
+
+    def __init__(self, path: str, max_entries: int):
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used_idx ON embeddings (last_used)")
+        self._conn.commit()
+        # Row count, kept up to date by put_many so writes don't scan the table
+        (self._count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+
+    def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        if not keys:
+            return {}
+        found: dict[str, list[float]] = {}
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                marks = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, k) for k in found],
+                )
+                self._conn.commit()
+        return found
+
+    def put_many(self, items: dict[str, list[float]]) -> None:
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            # Keys are content-addressed, so an existing row already holds the vector
+            added = self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(k, np.asarray(v, dtype=np.float32).tobytes(), now) for k, v in items.items()],
+            ).rowcount
+            if added < len(items):
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, k) for k in items],
+                )
+            self._count += added
+            if self._count > self.max_entries:
+                self._count -= self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN ("
+                    " SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                    (self._count - self.max_entries,),
+                ).rowcount
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        return self._count
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper with a memory LRU tier and an optional persistent disk tier.
+    Lookups go memory → disk → model; disk hits are promoted into memory.
+    """
+
+    def __init__(
+        self,
+        inner: Embeddings,
+        model_name: str,
+        memory_size: int,
+        disk_path: str | None = None,
+        max_disk_entries: int = 200_000,
+    ):
+        self.inner = inner
+        self.model_name = model_name
+        self._memory = LRUCache("embeddings", maxsize=memory_size)
+        self._disk = _DiskEmbeddingStore(disk_path, max_disk_entries) if disk_path else None
+        # Lookups run on the event loop, the API threadpool, job workers and ingest threads
+        self._counts_lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _count(self, name: str, n: int) -> None:
+        if n:
+            with self._counts_lock:
+                setattr(self, name, getattr(self, name) + n)
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def _from_memory(self, texts: list[str]) -> tuple[list[str], dict[str, list[float]], list[str]]:
+        """Return (keys, vectors found in memory, unique keys still to look up on disk)."""
+        keys = [self._key(t) for t in texts]
+        found: dict[str, list[float]] = {}
+        for key in dict.fromkeys(keys):
+            vec = self._memory.get(key)
+            if vec is not None:
+                found[key] = vec
+        self._count("memory_hits", sum(1 for k in keys if k in found))
+        pending = [k for k in dict.fromkeys(keys) if k not in found] if self._disk is not None else []
+        return keys, found, pending
+
+    def _from_disk(self, keys: list[str], pending: list[str], found: dict) -> None:
+        on_disk = self._disk.get_many(pending)
+        for key, vec in on_disk.items():
+            self._memory.set(key, vec)
+        found.update(on_disk)
+        self._count("disk_hits", sum(1 for k in keys if k in on_disk))
+
+    def _missing(self, keys: list[str], texts: list[str], found: dict) -> list[str]:
+        """Unique texts still to embed."""
+        todo: dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                todo.setdefault(key, text)
+        self._count("misses", sum(1 for k in keys if k not in found))
+        return list(todo.values())
+
+    def _remember(self, texts: list[str], vectors: list[list[float]], found: dict) -> dict[str, list[float]]:
+        """Add fresh vectors to memory and `found`; returns them for the disk tier."""
+        fresh = {self._key(t): list(v) for t, v in zip(texts, vectors)}
+        for key, vec in fresh.items():
+            self._memory.set(key, vec)
+        found.update(fresh)
+        return fresh
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys, found, pending = self._from_memory(texts)
+        if pending:
+            self._from_disk(keys, pending, found)
+        todo = self._missing(keys, texts, found)
+        if todo:
+            fresh = self._remember(todo, self.inner.embed_documents(todo), found)
+            if self._disk is not None:
+                self._disk.put_many(fresh)
+        return [found[k] for k in keys]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys, found, pending = self._from_memory(texts)
+        if pending:
+            await asyncio.to_thread(self._from_disk, keys, pending, found)
+        todo = self._missing(keys, texts, found)
+        if todo:
+            fresh = self._remember(todo, await self.inner.aembed_documents(todo), found)
+            if self._disk is not None:
+                await asyncio.to_thread(self._disk.put_many, fresh)
+        return [found[k] for k in keys]
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return (await self.aembed_documents([text]))[0]
+
+    def stats(self) -> dict:
+        with self._counts_lock:
+            memory_hits, disk_hits, misses = self.memory_hits, self.disk_hits, self.misses
+        lookups = memory_hits + disk_hits + misses
+        return {
+            "name": "embeddings",
+            "model": self.model_name,
+            "memory": self._memory.stats(),
+            "disk_entries": len(self._disk) if self._disk is not None else None,
+            "memory_hits": memory_hits,
+            "disk_hits": disk_hits,
+            "misses": misses,
+            "hit_rate": round((memory_hits + disk_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+class TimedEmbeddings(Embeddings):
+    """Embeddings wrapper recording each call in the "embed" stage histogram."""
+
+    def __init__(self, inner: Embeddings):
+        self.inner = inner
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        with stage_timer("embed"):
+            return self.inner.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        with stage_timer("embed"):
+            return self.inner.embed_query(text)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        with stage_timer("embed"):
+            return await self.inner.aembed_documents(texts)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        with stage_timer("embed"):
+            return await self.inner.aembed_query(text)
+
+    def __getattr__(self, name: str):
+        # stats() and other extras of the wrapped model
+        return getattr(self.inner, name)
 
 
 @lru_cache(maxsize=1)
@@ -26,8 +257,20 @@ def get_embeddings() -> Embeddings:
     Return a cached embedding model instance.
     Cached so the same model object is reused across ingestion and retrieval,
     which avoids re-initializing the Ollama HTTP connection repeatedly.
+    Wrapped in CachedEmbeddings unless EMBED_CACHE_ENABLED=false, and timed.
     """
-    return OllamaEmbeddings(
+    from langchain_ollama import OllamaEmbeddings  # deferred: imports the ollama client stack
+
+    model = OllamaEmbeddings(
         model=settings.ollama_embed_model,
         base_url=settings.ollama_base_url,
     )
+    if not settings.embed_cache_enabled:
+        return TimedEmbeddings(model)
+    return TimedEmbeddings(CachedEmbeddings(
+        model,
+        model_name=settings.ollama_embed_model,
+        memory_size=settings.embed_cache_memory_size,
+        disk_path=settings.embed_cache_path or None,
+        max_disk_entries=settings.embed_cache_max_disk_entries,
+    ))
@@ -1,15 +1,19 @@
+import hashlib
 import os
+import uuid
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime
-from typing import Literal
+from typing import TYPE_CHECKING, Literal
 
 from langchain_core.documents import Document
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import PyPDFLoader, Docx2txtLoader, TextLoader
 
 from .config import settings
 from .vectorstore import get_documents_store, get_patient_records_store
 
+if TYPE_CHECKING:
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
 PatientDocType = Literal[
     "symptom_log",      
     "custom_note",      
@@ -21,11 +25,20 @@ PatientDocType = Literal[
     "other",
 ]
 
-_splitter = RecursiveCharacterTextSplitter(
-    chunk_size=settings.rag_chunk_size,
-    chunk_overlap=settings.rag_chunk_overlap,
-    separators=["\n\n", "\n", ". ", " ", ""],
-)
+
+@lru_cache(maxsize=1)
+def _get_splitter() -> "RecursiveCharacterTextSplitter":
+    # Imported on first use: the langchain_text_splitters package pulls in every
+    # splitter backend (spaCy, NLTK, ...), so it loads with the first ingest
+    # instead of at startup.
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    return RecursiveCharacterTextSplitter(
+        chunk_size=settings.rag_chunk_size,
+        chunk_overlap=settings.rag_chunk_overlap,
+        separators=["\n\n", "\n", ". ", " ", ""],
+    )
+
 
 def ingest_patient_entry(
     user_id: str,
@@ -49,13 +62,114 @@ def ingest_patient_entry(
         metadata.update(extra_metadata)
 
     doc = Document(page_content=text, metadata=metadata)
-    chunks = _splitter.split_documents([doc])
+    chunks = _get_splitter().split_documents([doc])
 
     store = get_patient_records_store(user_id)
     store.add_documents(chunks)
 
     return len(chunks)
 
+# Namespace for deterministic chunk ids: the same (user, source, content) always
+# maps to the same row, so re-ingesting unchanged text is an idempotent upsert.
+_CHUNK_NAMESPACE = uuid.UUID("6f1c2a8e-4b7d-4c1e-9a3f-2d5e8b0c7a41")
+
+
+def _chunk_hash(user_id: str, source: str, text: str) -> str:
+    return hashlib.sha256(f"{user_id}\0{source}\0{text}".encode("utf-8")).hexdigest()
+
+
+def sync_patient_entries(
+    user_id: str,
+    sections: list[str],
+    source: str,
+    doc_type: PatientDocType = "other",
+    date: str | None = None,
+    extra_metadata: dict | None = None,
+) -> dict:
+    """
+    Make the stored chunks for (user_id, source) match `sections`, touching only what changed.
+
+    Each chunk is content-hashed; chunks already stored under the same hash are left
+    alone (no re-embedding), new ones are upserted under a deterministic id, and rows
+    for this source whose hash is no longer produced — including legacy rows without
+    a hash — are deleted.
+
+    Returns:
+        {"added": int, "deleted": int, "unchanged": int}
+    """
+    metadata = {
+        "user_id": user_id,
+        "doc_type": doc_type,
+        "date": date or datetime.utcnow().date().isoformat(),
+        "source": source,
+    }
+    if extra_metadata:
+        metadata.update(extra_metadata)
+        metadata["source"] = source
+
+    docs = [Document(page_content=text, metadata=dict(metadata)) for text in sections if text.strip()]
+    chunks: dict[str, Document] = {}
+    for chunk in _get_splitter().split_documents(docs):
+        content_hash = _chunk_hash(user_id, source, chunk.page_content)
+        chunk.metadata["content_hash"] = content_hash
+        chunks.setdefault(str(uuid.uuid5(_CHUNK_NAMESPACE, f"{user_id}:{content_hash}")), chunk)
+
+    store = get_patient_records_store(user_id)
+    existing = store.get_chunk_hashes({"user_id": user_id, "source": source})
+
+    new_ids = [cid for cid in chunks if cid not in existing]
+    stale_ids = [rid for rid in existing if rid not in chunks]
+
+    if new_ids:
+        store.add_documents([chunks[cid] for cid in new_ids], ids=new_ids)
+    if stale_ids:
+        store.delete(stale_ids)
+
+    return {
+        "added": len(new_ids),
+        "deleted": len(stale_ids),
+        "unchanged": len(chunks) - len(new_ids),
+    }
+
+
+SUPPORTED_SUFFIXES = (".pdf", ".docx", ".txt", ".md")
+
+
+def load_file(path: str | Path) -> list[Document]:
+    """Parse a PDF / DOCX / TXT / MD file into raw (unsplit) documents."""
+    path = Path(path)
+    suffix = path.suffix.lower()
+    # Loaders (and pypdf / docx2txt behind them) are imported only when ingesting
+    if suffix == ".pdf":
+        from langchain_community.document_loaders import PyPDFLoader
+
+        return PyPDFLoader(str(path)).load()
+    if suffix == ".docx":
+        from langchain_community.document_loaders import Docx2txtLoader
+
+        return Docx2txtLoader(str(path)).load()
+    if suffix in (".txt", ".md"):
+        from langchain_community.document_loaders import TextLoader
+
+        return TextLoader(str(path), encoding="utf-8").load()
+    raise ValueError(f"Unsupported file type: {suffix}")
+
+
+def split_knowledge_docs(
+    raw_docs: list[Document],
+    name: str,
+    doc_type: str = "knowledge",
+    date: str | None = None,
+) -> list[Document]:
+    for doc in raw_docs:
+        doc.metadata.update({
+            "source": doc.metadata.get("source", name),
+            "doc_type": doc_type,
+            "date": date or datetime.utcnow().date().isoformat(),
+        })
+    return _get_splitter().split_documents(raw_docs)
+
+
 def ingest_documents(
     source: str,
     doc_type: str = "knowledge",
@@ -63,28 +177,13 @@ def ingest_documents(
 ) -> int:
     if os.path.isfile(source):
         path = Path(source)
-        suffix = path.suffix.lower()
-        if suffix == ".pdf":
-            raw_docs = PyPDFLoader(str(path)).load()
-        elif suffix == ".docx":
-            raw_docs = Docx2txtLoader(str(path)).load()
-        elif suffix in (".txt", ".md"):
-            raw_docs = TextLoader(str(path), encoding="utf-8").load()
-        else:
-            raise ValueError(f"Unsupported file type: {suffix}")
+        raw_docs = load_file(path)
         name = path.name
     else:
         raw_docs = [Document(page_content=source, metadata={"source": "inline"})]
         name = "inline"
 
-    for doc in raw_docs:
-        doc.metadata.update({
-            "source": doc.metadata.get("source", name),
-            "doc_type": doc_type,
-            "date": date or datetime.utcnow().date().isoformat(),
-        })
-
-    chunks = _splitter.split_documents(raw_docs)
+    chunks = split_knowledge_docs(raw_docs, name, doc_type=doc_type, date=date)
     get_documents_store().add_documents(chunks)
 
     return len(chunks)
@@ -0,0 +1,299 @@
+"""
+jobs.py — Background job queue for doctor-chain generations.
+
+Summary / interpretation generations can take longer than a proxy will hold a
+request open, so they can be queued instead of run inline:
+
+  submit(kind, patient_id)  → Job (queued)      POST /jobs
+  get(job_id)               → status / result   GET  /jobs/{id}, /jobs/{id}/result
+  submit_panel(kind)        → one job per patient on the roster (POST /jobs/panel),
+                              e.g. from a nightly cron, at batch priority
+
+Besides the generation kinds in prompts.py, a "prewarm" job (prewarm.py)
+refreshes the patient's RAG context and then queues the patient's
+generations under the same batch, so one batch id tracks the whole pass.
+
+A pool of JOB_WORKERS threads drains a priority queue (interactive jobs ahead
+of batch ones); at the Ollama gate (admission.py) interactive jobs run in the
+SUMMARY class and batch jobs in BATCH, behind physician chat.  Each job runs the doctor chain for a fixed prompt from
+prompts.py and stores the answer in the result cache, so a later /summary for
+the same patient is served without generating again.
+
+Jobs live in memory; with JOB_DB_PATH set they are also written to SQLite, so
+results survive a restart and jobs that were queued or running when the
+process stopped are queued again on startup.  Finished jobs are dropped after
+JOB_RETENTION_SECONDS.
+"""
+
+import itertools
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Iterable
+
+from . import admission
+from .config import settings
+from .patient_context import build_and_ingest_patient_context
+from .prompts import GENERATION_PROMPTS
+from .result_cache import get_result, result_key
+from .roster import fetch_patient_roster
+from .singleflight import generate
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+PREWARM = "prewarm"   # refresh context, then queue every GENERATION_PROMPTS kind
+JOB_KINDS = (*GENERATION_PROMPTS, PREWARM)
+
+_UNFINISHED = ("queued", "running")
+_PRUNE_INTERVAL_SECONDS = 60
+
+
+class UnknownJobKind(ValueError):
+    """Raised when a job is submitted for a kind not in JOB_KINDS."""
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    patient_id: str
+    priority: int = PRIORITY_INTERACTIVE
+    batch_id: str | None = None
+    status: str = "queued"          # queued | running | succeeded | failed
+    result: str | None = None
+    error: str | None = None
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+_COLUMNS = [f for f in Job.__dataclass_fields__]
+
+
+class _JobStore:
+    """SQLite persistence for jobs (one row per job, rewritten on every transition)."""
+
+    def __init__(self, path: str):
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, kind TEXT NOT NULL, patient_id TEXT NOT NULL,"
+            " priority INTEGER NOT NULL, batch_id TEXT, status TEXT NOT NULL,"
+            " result TEXT, error TEXT, created_at REAL NOT NULL,"
+            " started_at REAL, finished_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_finished_at_idx ON jobs (finished_at)")
+        self._conn.commit()
+
+    def save(self, job: Job) -> None:
+        row = job.to_dict()
+        marks = ",".join("?" * len(_COLUMNS))
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO jobs ({','.join(_COLUMNS)}) VALUES ({marks})",
+                [row[c] for c in _COLUMNS],
+            )
+            self._conn.commit()
+
+    def load(self, finished_after: float) -> list[Job]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {','.join(_COLUMNS)} FROM jobs"
+                " WHERE finished_at IS NULL OR finished_at >= ? ORDER BY created_at",
+                (finished_after,),
+            ).fetchall()
+        return [Job(**dict(zip(_COLUMNS, r))) for r in rows]
+
+    def prune(self, finished_before: float) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE finished_at < ?", (finished_before,))
+            self._conn.commit()
+
+
+def run_generation(patient_id: str, prompt: str, priority: int = admission.SUMMARY) -> str:
+    """Doctor-chain answer for a fixed prompt, via the result cache (joins an identical in-flight request)."""
+    key = result_key(patient_id, prompt, settings.doctor_model)
+    answer = get_result(key)
+    if answer is None:
+        answer = generate(patient_id, prompt, key, store=True, priority=priority)
+    return answer
+
+
+class JobQueue:
+    def __init__(self, workers: int, db_path: str | None = None, retention_seconds: float = 24 * 3600):
+        self.workers = max(1, workers)
+        self.retention_seconds = retention_seconds
+        self._store = _JobStore(db_path) if db_path else None
+        self._jobs: dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._queue: queue.PriorityQueue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._threads: list[threading.Thread] = []
+        self._last_prune = 0.0
+
+        if self._store:
+            for job in self._store.load(finished_after=time.time() - retention_seconds):
+                if job.status in _UNFINISHED:
+                    job.status, job.started_at = "queued", None
+                    self._store.save(job)
+                    self._enqueue(job)
+                self._jobs[job.id] = job
+            if not self._queue.empty():
+                self._ensure_workers()
+
+    # ── workers ──────────────────────────────────────────────────────────────
+
+    def _enqueue(self, job: Job) -> None:
+        self._queue.put((job.priority, next(self._seq), job.id))
+
+    def _ensure_workers(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                t = threading.Thread(target=self._work, name=f"rag-job-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def _update(self, job: Job, **changes) -> None:
+        for k, v in changes.items():
+            setattr(job, k, v)
+        if self._store:
+            self._store.save(job)
+
+    def _work(self) -> None:
+        while True:
+            _, _, job_id = self._queue.get()
+            job = self._jobs.get(job_id)
+            if job is None or job.status != "queued":
+                continue
+            self._update(job, status="running", started_at=time.time())
+            try:
+                if job.kind == PREWARM:
+                    answer = self._prewarm(job)
+                else:
+                    llm_class = admission.BATCH if job.priority >= PRIORITY_BATCH else admission.SUMMARY
+                    answer = run_generation(job.patient_id, GENERATION_PROMPTS[job.kind], llm_class)
+            except Exception as e:
+                self._update(job, status="failed", error=str(e), finished_at=time.time())
+            else:
+                self._update(job, status="succeeded", result=answer, finished_at=time.time())
+            self._maybe_prune()
+
+    def _prewarm(self, job: Job) -> None:
+        build_and_ingest_patient_context(job.patient_id)
+        for kind in GENERATION_PROMPTS:
+            self.submit(kind, job.patient_id, priority=job.priority, batch_id=job.batch_id)
+
+    # ── public API ───────────────────────────────────────────────────────────
+
+    def _maybe_prune(self) -> None:
+        """Prune at most every _PRUNE_INTERVAL_SECONDS; called on submit and after each job."""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_prune < _PRUNE_INTERVAL_SECONDS:
+                return
+            self._last_prune = now
+        self._prune()
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.retention_seconds
+        with self._lock:
+            for job_id in [j.id for j in self._jobs.values() if j.finished_at and j.finished_at < cutoff]:
+                del self._jobs[job_id]
+        if self._store:
+            self._store.prune(cutoff)
+
+    def submit(
+        self,
+        kind: str,
+        patient_id: str,
+        priority: int = PRIORITY_INTERACTIVE,
+        batch_id: str | None = None,
+    ) -> Job:
+        if kind not in JOB_KINDS:
+            raise UnknownJobKind(f"Unknown job kind {kind!r}; expected one of {sorted(JOB_KINDS)}")
+        self._maybe_prune()
+        job = Job(id=str(uuid.uuid4()), kind=kind, patient_id=patient_id, priority=priority, batch_id=batch_id)
+        with self._lock:
+            self._jobs[job.id] = job
+        if self._store:
+            self._store.save(job)
+        self._enqueue(job)
+        self._ensure_workers()
+        return job
+
+    def submit_many(
+        self,
+        kind: str,
+        patient_ids: Iterable[str],
+        priority: int = PRIORITY_BATCH,
+    ) -> dict:
+        batch_id = str(uuid.uuid4())
+        jobs = [self.submit(kind, pid, priority=priority, batch_id=batch_id) for pid in patient_ids]
+        return {"batch_id": batch_id, "job_ids": [j.id for j in jobs]}
+
+    def submit_panel(self, kind: str, patient_ids: list[str] | None = None) -> dict:
+        """Queue `kind` for every patient on the roster (or the given ids) at batch priority."""
+        if patient_ids is None:
+            patient_ids, cursor = [], None
+            while True:
+                page = fetch_patient_roster(cursor=cursor)
+                patient_ids.extend(p["id"] for p in page["patients"])
+                cursor = page["next_cursor"]
+                if not cursor:
+                    break
+        return self.submit_many(kind, patient_ids)
+
+    def get(self, job_id: str) -> Job | None:
+        return self._jobs.get(job_id)
+
+    def batch_status(self, batch_id: str) -> dict | None:
+        jobs = [j for j in list(self._jobs.values()) if j.batch_id == batch_id]
+        if not jobs:
+            return None
+        counts = {s: 0 for s in ("queued", "running", "succeeded", "failed")}
+        for j in jobs:
+            counts[j.status] += 1
+        return {
+            "batch_id": batch_id,
+            "total": len(jobs),
+            **counts,
+            "done": counts["succeeded"] + counts["failed"] == len(jobs),
+        }
+
+    def stats(self) -> dict:
+        counts: dict[str, int] = {}
+        for j in list(self._jobs.values()):
+            counts[j.status] = counts.get(j.status, 0) + 1
+        return {"workers": self.workers, "queue_depth": self._queue.qsize(), **counts}
+
+
+_job_queue: JobQueue | None = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Process-wide job queue (workers start on the first submit)."""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue(
+                workers=settings.job_workers,
+                db_path=settings.job_db_path,
+                retention_seconds=settings.job_retention_seconds,
+            )
+        return _job_queue
@@ -1,27 +1,32 @@
 from functools import lru_cache
-from langchain_ollama import ChatOllama
 from langchain_core.language_models import BaseChatModel
 
 from .config import settings
 
+NUM_CTX = 8192  # context window for both chat models (warmup.py preloads with the same)
+
+
+@lru_cache(maxsize=4)
+def get_doctor_llm(streaming: bool = False, keep_alive: str = "10m") -> BaseChatModel:
+    from langchain_ollama import ChatOllama  # deferred: imports the ollama client stack
 
-@lru_cache(maxsize=2)   
-def get_doctor_llm(streaming: bool = False) -> BaseChatModel:
     return ChatOllama(
         model=settings.doctor_model,
         base_url=settings.ollama_base_url,
-        num_ctx=8192,
+        num_ctx=NUM_CTX,
         streaming=streaming,
-        keep_alive="10m",
+        keep_alive=keep_alive,
     )
 
 
 @lru_cache(maxsize=2)
 def get_patient_llm(streaming: bool = False) -> BaseChatModel:
+    from langchain_ollama import ChatOllama  # deferred: imports the ollama client stack
+
     return ChatOllama(
         model=settings.patient_model,
         base_url=settings.ollama_base_url,
-        num_ctx=8192,
+        num_ctx=NUM_CTX,
         streaming=streaming,
         keep_alive="10m",
     )
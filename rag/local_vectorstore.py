@@ -0,0 +1,487 @@
+"""
+local_vectorstore.py — In-process vector index, a drop-in for SupabaseVectorStoreFixed.
+
+Selected with VECTOR_BACKEND=local.  Meant for single-node clinic deployments
+(no network hop per retrieval) and offline testing.
+
+Layout on disk (one directory per table under LOCAL_INDEX_DIR):
+  index.json          embedding dim, current file generation, IVF training size
+  vectors.<gen>.f32   float32 [capacity, dim] L2-normalised embeddings, memory-mapped
+                      read/write and grown by doubling
+  rows.<gen>.jsonl    append-only row log: {"i", "id", "content", "metadata"} per
+                      write (a later line for the same row wins), {"del": id} per delete
+  ivf.npy             IVF centroids (only when LOCAL_INDEX_MODE=ivf)
+
+Writes cost O(rows written): vectors go straight into the mapping, rows are
+appended to the log and deletes leave tombstones.  Once tombstones outnumber
+live rows the table is compacted into a new generation; index.json is
+replaced last, so a crash mid-compaction leaves the previous one intact.
+flush() forces the mapping and the log to disk.
+
+Search modes:
+  exact — one vectorised dot product over the candidate rows
+  ivf   — spherical k-means coarse quantiser; only the LOCAL_IVF_PROBES nearest
+          lists are scanned.  Exact search until there are enough rows to train.
+          Training, and retraining once the table has grown by half, runs in a
+          background thread; searches keep using the previous centroids.
+
+Filtering matches match_rag_* semantics: every filter key must equal the row's
+metadata value.  `user_id` is served from a postings index so per-patient
+queries only touch that patient's rows.
+"""
+
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, TextIO, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from .metrics import stage_timer
+from .supabase_vectorstore import EMBEDDING_KEY, SCORE_KEY
+
+logger = logging.getLogger(__name__)
+
+
+def _normalise(mat: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(mat, axis=-1, keepdims=True)
+    return mat / np.where(norms == 0, 1.0, norms)
+
+
+def _train_ivf(vectors: np.ndarray, n_lists: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on unit vectors → [n_lists, dim] unit centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        for c in range(n_lists):
+            members = vectors[assign == c]
+            if len(members):
+                centroids[c] = members.sum(axis=0)
+            else:
+                centroids[c] = vectors[rng.integers(len(vectors))]
+        centroids = _normalise(centroids)
+    return centroids.astype(np.float32)
+
+
+_INITIAL_CAPACITY = 1024
+
+
+class LocalVectorStore(VectorStore):
+    def __init__(
+        self,
+        embedding: Embeddings,
+        table_name: str,
+        index_dir: str,
+        mode: str = "exact",
+        ivf_lists: int = 64,
+        ivf_probes: int = 8,
+    ) -> None:
+        self._embedding = embedding
+        self.table_name = table_name
+        self.path = Path(index_dir) / table_name
+        self.mode = mode
+        self.ivf_lists = ivf_lists
+        self.ivf_probes = ivf_probes
+        self._lock = threading.RLock()
+
+        self._dim = 0
+        self._generation = 0
+        self._mat: Optional[np.memmap] = None       # [capacity, dim]; rows [0, _n) in use
+        self._n = 0
+        self._dead = 0
+        self._alive = np.zeros(0, dtype=bool)
+        self._ids: list[Optional[str]] = []
+        self._contents: list[str] = []
+        self._metadatas: list[dict] = []
+        self._row_of: dict[str, int] = {}
+        self._by_user: dict[str, set[int]] = defaultdict(set)
+        self._log: Optional[TextIO] = None
+
+        self._centroids: Optional[np.ndarray] = None
+        self._assign = np.zeros(0, dtype=np.int64)
+        self._trained_rows = 0
+        self._training = False
+        self._touched_while_training: set[int] = set()
+        self.load()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    # ── persistence ──────────────────────────────────────────────────────────
+
+    def _files(self, generation: int) -> tuple[Path, Path]:
+        return self.path / f"vectors.{generation}.f32", self.path / f"rows.{generation}.jsonl"
+
+    def _map(self, vec_path: Path, capacity: int) -> np.memmap:
+        with open(vec_path, "r+b" if vec_path.exists() else "w+b") as f:
+            f.truncate(capacity * self._dim * 4)
+        return np.memmap(vec_path, dtype=np.float32, mode="r+", shape=(capacity, self._dim))
+
+    def _write_index(self) -> None:
+        tmp = self.path / "index.tmp.json"
+        tmp.write_text(json.dumps({
+            "dim": self._dim,
+            "generation": self._generation,
+            "ivf_trained_rows": self._trained_rows,
+        }), encoding="utf-8")
+        os.replace(tmp, self.path / "index.json")
+
+    def load(self) -> None:
+        index_path = self.path / "index.json"
+        if not index_path.exists():
+            return
+        with self._lock:
+            meta = json.loads(index_path.read_text(encoding="utf-8"))
+            self._dim, self._generation = meta["dim"], meta["generation"]
+            vec_path, rows_path = self._files(self._generation)
+            capacity = os.path.getsize(vec_path) // (4 * self._dim)
+            self._mat = np.memmap(vec_path, dtype=np.float32, mode="r+", shape=(capacity, self._dim))
+            self._alive = np.zeros(capacity, dtype=bool)
+            self._assign = np.zeros(capacity, dtype=np.int64)
+            torn = False
+            with rows_path.open(encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except json.JSONDecodeError:
+                        torn = True  # partial line from a crash mid-append
+                        continue
+                    if "del" in rec:
+                        self._remove(rec["del"])
+                    else:
+                        self._set_row(rec["i"], rec["id"], rec["content"], rec["metadata"])
+            self._log = rows_path.open("a", encoding="utf-8")
+            if torn:
+                self._log.write("\n")
+            ivf_path = self.path / "ivf.npy"
+            if ivf_path.exists():
+                self._centroids = np.load(ivf_path)
+                self._trained_rows = meta.get("ivf_trained_rows", 0)
+                self._assign[: self._n] = np.argmax(np.asarray(self._mat[: self._n]) @ self._centroids.T, axis=1)
+            self._maybe_retrain()
+
+    def flush(self) -> None:
+        """Force the vector mapping and the row log to disk."""
+        with self._lock:
+            if self._mat is None:
+                return
+            self._mat.flush()
+            self._log.flush()
+            os.fsync(self._log.fileno())
+
+    def _create(self, dim: int) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._dim = dim
+        vec_path, rows_path = self._files(self._generation)
+        self._mat = self._map(vec_path, _INITIAL_CAPACITY)
+        self._alive = np.zeros(_INITIAL_CAPACITY, dtype=bool)
+        self._assign = np.zeros(_INITIAL_CAPACITY, dtype=np.int64)
+        self._log = rows_path.open("w", encoding="utf-8")
+        self._write_index()
+
+    def _ensure_capacity(self, rows: int) -> None:
+        capacity = len(self._mat)
+        if rows <= capacity:
+            return
+        new_capacity = max(rows, 2 * capacity)
+        self._mat.flush()
+        self._mat = self._map(self._files(self._generation)[0], new_capacity)
+        grow = new_capacity - capacity
+        self._alive = np.concatenate([self._alive, np.zeros(grow, dtype=bool)])
+        self._assign = np.concatenate([self._assign, np.zeros(grow, dtype=np.int64)])
+
+    def _compact(self) -> None:
+        """Rewrite the live rows into a new generation (amortised: only when tombstones dominate)."""
+        live = np.flatnonzero(self._alive[: self._n])
+        old_files = self._files(self._generation)
+        self._generation += 1
+        vec_path, rows_path = self._files(self._generation)
+        capacity = max(_INITIAL_CAPACITY, 2 * len(live))
+        mat = self._map(vec_path, capacity)
+        mat[: len(live)] = self._mat[live]
+        mat.flush()
+        ids = [self._ids[i] for i in live]
+        contents = [self._contents[i] for i in live]
+        metadatas = [self._metadatas[i] for i in live]
+        with rows_path.open("w", encoding="utf-8") as f:
+            for j, (rid, content, meta) in enumerate(zip(ids, contents, metadatas)):
+                f.write(json.dumps({"i": j, "id": rid, "content": content, "metadata": meta}) + "\n")
+        self._write_index()
+
+        assign = self._assign[live]
+        self._log.close()
+        self._mat, self._n, self._dead = mat, len(live), 0
+        self._ids, self._contents, self._metadatas = ids, contents, metadatas
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._alive[: self._n] = True
+        self._assign = np.zeros(capacity, dtype=np.int64)
+        self._assign[: self._n] = assign
+        self._row_of = {rid: i for i, rid in enumerate(ids)}
+        self._by_user = defaultdict(set)
+        for i, meta in enumerate(metadatas):
+            if meta.get("user_id") is not None:
+                self._by_user[str(meta["user_id"])].add(i)
+        self._log = rows_path.open("a", encoding="utf-8")
+        for old in old_files:
+            old.unlink(missing_ok=True)
+
+    # ── row bookkeeping (call with self._lock held) ──────────────────────────
+
+    def _set_row(self, i: int, rid: str, content: str, meta: dict) -> None:
+        if i >= self._n:
+            grow = i + 1 - self._n
+            self._ids.extend([None] * grow)
+            self._contents.extend([""] * grow)
+            self._metadatas.extend([{}] * grow)
+            self._n = i + 1
+        old_user = self._metadatas[i].get("user_id")
+        if old_user is not None:
+            self._by_user[str(old_user)].discard(i)
+        self._ids[i], self._contents[i], self._metadatas[i] = rid, content, meta
+        self._row_of[rid] = i
+        self._alive[i] = True
+        if meta.get("user_id") is not None:
+            self._by_user[str(meta["user_id"])].add(i)
+
+    def _remove(self, rid: str) -> None:
+        i = self._row_of.pop(rid, None)
+        if i is None:
+            return
+        user = self._metadatas[i].get("user_id")
+        if user is not None:
+            self._by_user[str(user)].discard(i)
+        self._alive[i] = False
+        self._ids[i], self._contents[i], self._metadatas[i] = None, "", {}
+        self._dead += 1
+
+    # ── writes ───────────────────────────────────────────────────────────────
+
+    def add_vectors(self, vectors: List[List[float]], documents: List[Document], ids: List[str]) -> List[str]:
+        """Upsert rows by id (same contract as SupabaseVectorStore.add_vectors)."""
+        if not vectors:
+            return []
+        new = _normalise(np.asarray(vectors, dtype=np.float32))
+        with self._lock:
+            if self._mat is None:
+                self._create(new.shape[1])
+            touched, lines = [], []
+            for vec, doc, rid in zip(new, documents, ids):
+                rid = str(rid)
+                meta = {k: v for k, v in doc.metadata.items() if k not in (EMBEDDING_KEY, SCORE_KEY)}
+                row = self._row_of.get(rid)
+                if row is None:
+                    row = self._n
+                    self._ensure_capacity(row + 1)
+                self._mat[row] = vec
+                self._set_row(row, rid, doc.page_content, meta)
+                touched.append(row)
+                lines.append(json.dumps({"i": row, "id": rid, "content": doc.page_content, "metadata": meta}))
+            self._log.write("\n".join(lines) + "\n")
+            self._log.flush()
+            if self._centroids is not None:
+                rows = np.asarray(touched, dtype=np.int64)
+                self._assign[rows] = np.argmax(np.asarray(self._mat[rows]) @ self._centroids.T, axis=1)
+            if self._training:
+                self._touched_while_training.update(touched)
+            self._maybe_retrain()
+        return [str(i) for i in ids]
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        metadatas = metadatas or [{} for _ in texts]
+        docs = [Document(page_content=t, metadata=m) for t, m in zip(texts, metadatas)]
+        return self.add_vectors(self._embedding.embed_documents(texts), docs, ids)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> None:
+        if ids is None:
+            raise ValueError("No ids provided to delete.")
+        with self._lock:
+            gone = [str(i) for i in ids if str(i) in self._row_of]
+            if not gone:
+                return
+            for rid in gone:
+                self._remove(rid)
+            self._log.write("".join(json.dumps({"del": rid}) + "\n" for rid in gone))
+            self._log.flush()
+            if self._dead > max(_INITIAL_CAPACITY, self._n - self._dead) and not self._training:
+                self._compact()
+
+    def get_chunk_hashes(self, filter: Dict[str, Any]) -> Dict[str, Optional[str]]:
+        with self._lock:
+            rows = self._candidate_rows(filter)
+            return {self._ids[i]: self._metadatas[i].get("content_hash") for i in rows}
+
+    # ── IVF training (background) ────────────────────────────────────────────
+
+    def _maybe_retrain(self) -> None:
+        if self.mode != "ivf" or self._training:
+            return
+        live = self._n - self._dead
+        if live < self.ivf_lists * 4:
+            return
+        if self._centroids is not None and live <= self._trained_rows * 1.5:
+            return
+        self._training = True
+        self._touched_while_training = set()
+        threading.Thread(target=self._retrain, name=f"rag-ivf-{self.table_name}", daemon=True).start()
+
+    def _retrain(self) -> None:
+        try:
+            with self._lock:
+                generation = self._generation
+                rows = np.flatnonzero(self._alive[: self._n])
+                sample = np.asarray(self._mat[rows])
+            centroids = _train_ivf(sample, self.ivf_lists)
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            with self._lock:
+                if generation == self._generation:
+                    self._assign[rows] = assign
+                    later = sorted(self._touched_while_training | set(range(int(rows[-1]) + 1, self._n)))
+                    if later:
+                        idx = np.asarray(later, dtype=np.int64)
+                        self._assign[idx] = np.argmax(np.asarray(self._mat[idx]) @ centroids.T, axis=1)
+                    self._centroids, self._trained_rows = centroids, len(rows)
+                    np.save(self.path / "ivf.tmp.npy", centroids)
+                    os.replace(self.path / "ivf.tmp.npy", self.path / "ivf.npy")
+                    self._write_index()
+        except Exception:
+            logger.exception("IVF training for %s failed", self.table_name)
+        finally:
+            with self._lock:
+                self._training = False
+                self._touched_while_training = set()
+
+    def train_ivf(self) -> None:
+        """Train (or retrain) the IVF lists now, in this thread."""
+        with self._lock:
+            if self._training:
+                return
+            self._training = True
+        self._retrain()
+
+    # ── search ───────────────────────────────────────────────────────────────
+
+    def _candidate_rows(self, filter: Optional[Dict[str, Any]]) -> np.ndarray:
+        if filter and "user_id" in filter:
+            owned = self._by_user.get(str(filter["user_id"]), ())
+            rows = np.fromiter(owned, dtype=np.int64, count=len(owned))
+        else:
+            rows = np.flatnonzero(self._alive[: self._n])
+        rest = {k: v for k, v in (filter or {}).items() if k != "user_id"}
+        if rest:
+            rows = np.asarray(
+                [i for i in rows if all(self._metadatas[i].get(k) == v for k, v in rest.items())],
+                dtype=np.int64,
+            )
+        return rows
+
+    def _ivf_rows(self, query: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """Restrict candidate rows to the nearest IVF lists (exact until trained)."""
+        if self._centroids is None:
+            return rows
+        probes = np.argsort(-(self._centroids @ query))[: self.ivf_probes]
+        return rows[np.isin(self._assign[rows], probes)]
+
+    def similarity_search_by_vector_with_relevance_scores(
+        self,
+        query: List[float],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        postgrest_filter: Optional[str] = None,
+        score_threshold: Optional[float] = None,
+    ) -> List[Tuple[Document, float]]:
+        with stage_timer("vector_search"):
+            q = _normalise(np.asarray(query, dtype=np.float32))
+            with self._lock:
+                if self._n == self._dead:
+                    return []
+                rows = self._candidate_rows(filter)
+                if self.mode == "ivf" and len(rows):
+                    rows = self._ivf_rows(q, rows)
+                if not len(rows):
+                    return []
+                sims = np.asarray(self._mat[rows]) @ q
+                top = np.argpartition(-sims, min(k, len(sims)) - 1)[:k]
+                top = top[np.argsort(-sims[top])]
+                results = []
+                for j in top:
+                    i = int(rows[j])
+                    sim = float(sims[j])
+                    if score_threshold is not None and sim < score_threshold:
+                        continue
+                    metadata = dict(self._metadatas[i])
+                    metadata[EMBEDDING_KEY] = np.array(self._mat[i])
+                    results.append((Document(page_content=self._contents[i], metadata=metadata), sim))
+                return results
+
+    async def asimilarity_search_by_vector_with_relevance_scores(
+        self,
+        query: List[float],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        postgrest_filter: Optional[str] = None,
+        score_threshold: Optional[float] = None,
+    ) -> List[Tuple[Document, float]]:
+        # In-memory search: nothing to await, and it is cheaper than a thread hop.
+        return self.similarity_search_by_vector_with_relevance_scores(
+            query, k=k, filter=filter, score_threshold=score_threshold
+        )
+
+    def similarity_search_with_relevance_scores(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_relevance_scores(
+            self._embedding.embed_query(query), k=k, filter=filter, **kwargs
+        )
+
+    async def asimilarity_search_with_relevance_scores(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        vector = await self._embedding.aembed_query(query)
+        return self.similarity_search_by_vector_with_relevance_scores(vector, k=k, filter=filter, **kwargs)
+
+    def similarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_relevance_scores(query, k=k, filter=filter, **kwargs)]
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        **kwargs: Any,
+    ) -> "LocalVectorStore":
+        ids = kwargs.pop("ids", None)
+        store = cls(embedding=embedding, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
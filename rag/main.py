@@ -19,7 +19,7 @@ async def run_demo():
     # Step 1: Build and ingest John Harvard's full patient context
     print("\n[1/2] Fetching John Harvard's data from DB and ingesting into RAG...")
     n = build_and_ingest_patient_context(JOHN_HARVARD_PATIENT_ID, date="2026-02-28")
-    print(f"      → {n} chunk(s) stored in '{settings.patient_records_table}'")
+    print(f"      → {n} new/changed chunk(s) stored in '{settings.patient_records_table}'")
 
     # Step 2: Physician chatbot query
     print("\n[2/2] Physician chatbot query...")
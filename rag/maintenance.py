@@ -0,0 +1,101 @@
+"""
+maintenance.py — pgvector index health report and rebuilds.
+
+Uses the rag_index_health() / rebuild_rag_index() functions from
+supabase/migrations/006_hnsw_search_knobs.sql.
+
+A vector index is flagged for rebuild when:
+  - ivfflat: the table has grown past INDEX_REBUILD_GROWTH × its row count at the
+    last rebuild (clusters were fitted to the old data), or the list count is far
+    from pgvector's rows/1000 guideline
+  - any:     dead tuples exceed 20% of live rows (bloat after deletes / re-ingests)
+
+CLI:
+    python -m rag.maintenance health
+    python -m rag.maintenance rebuild [--index NAME] [--if-needed]
+"""
+
+import argparse
+import re
+
+from .config import settings
+from .vectorstore import get_supabase_client
+
+
+def _ivf_lists(options: list[str] | None) -> int | None:
+    for opt in options or []:
+        m = re.fullmatch(r"lists=(\d+)", opt)
+        if m:
+            return int(m.group(1))
+    return None
+
+
+def _assess(row: dict) -> list[str]:
+    reasons = []
+    live = row.get("live_rows") or 0
+    dead = row.get("dead_rows") or 0
+    if live and dead > 0.2 * live:
+        reasons.append(f"{dead} dead rows ({dead / live:.0%} of live)")
+    if row.get("index_method") == "ivfflat":
+        at_build = row.get("rows_at_build")
+        if at_build and live > settings.index_rebuild_growth * at_build:
+            reasons.append(f"grew from {at_build} to {live} rows since last build")
+        lists = _ivf_lists(row.get("index_options"))
+        target = max(live // 1000, 1)
+        if lists and live >= 10_000 and not (target / 4 <= lists <= target * 4):
+            reasons.append(f"lists={lists} but ~{target} recommended for {live} rows")
+    return reasons
+
+
+def index_health() -> list[dict]:
+    """One row per RAG vector index, with `needs_rebuild` and the reasons."""
+    rows = get_supabase_client().rpc("rag_index_health", {}).execute().data or []
+    for row in rows:
+        row["reasons"] = _assess(row)
+        row["needs_rebuild"] = bool(row["reasons"])
+    return rows
+
+
+def rebuild_index(index_name: str) -> None:
+    get_supabase_client().rpc("rebuild_rag_index", {"target_index": index_name}).execute()
+
+
+def rebuild_indexes(index_name: str | None = None, only_if_needed: bool = False) -> list[str]:
+    """Rebuild one index, every index, or only those flagged by index_health()."""
+    rebuilt = []
+    for row in index_health():
+        if index_name and row["index_name"] != index_name:
+            continue
+        if only_if_needed and not row["needs_rebuild"]:
+            continue
+        rebuild_index(row["index_name"])
+        rebuilt.append(row["index_name"])
+    return rebuilt
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="pgvector index maintenance for the RAG tables.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("health", help="Report vector index health")
+    rebuild = sub.add_parser("rebuild", help="Rebuild vector indexes")
+    rebuild.add_argument("--index", default=None, help="Only this index")
+    rebuild.add_argument("--if-needed", action="store_true", help="Only indexes flagged by `health`")
+    args = parser.parse_args()
+
+    if args.command == "health":
+        for row in index_health():
+            status = "REBUILD" if row["needs_rebuild"] else "ok"
+            size_mb = (row.get("index_bytes") or 0) / 1e6
+            print(
+                f"{row['index_name']:<45} {row['index_method']:<8} {row['table_name']:<22} "
+                f"live={row['live_rows']:<8} dead={row['dead_rows']:<8} {size_mb:8.1f} MB  {status}"
+            )
+            for reason in row["reasons"]:
+                print(f"    - {reason}")
+    else:
+        rebuilt = rebuild_indexes(args.index, only_if_needed=args.if_needed)
+        print(f"Rebuilt {len(rebuilt)} index(es): {', '.join(rebuilt) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+metrics.py — Prometheus metrics for the RAG pipeline and the API.
+
+A slow /chat can be spent embedding the question, in the match_rag_* RPCs,
+in the redundancy filter, waiting for an Ollama slot, in prefill or in
+decode.  Each of those is recorded as a histogram and exported on /metrics:
+
+  rag_stage_seconds{stage}                  embed | vector_search | redundancy_filter | llm
+  rag_llm_phase_seconds{model, phase}       Ollama's own timings: load | prefill | decode,
+                                            plus first_token (wall clock, after admission)
+  rag_llm_tokens{model, kind}               prompt | completion tokens per call
+  rag_llm_tokens_per_second{model, phase}   prefill | decode throughput
+  rag_admission_wait_seconds{model, priority}
+  rag_context_tokens{kind}                  retrieved | packed tokens per prompt
+  rag_singleflight_joins_total{role}        leader | follower
+  rag_http_request_seconds{method, route, status}
+
+The token counts and durations come from the final chunk Ollama sends
+(prompt_eval_count / eval_count and their durations in nanoseconds).  HTTP
+latency is per route template, measured until the response starts, so for
+SSE endpoints it is the time to the first byte.
+
+Metrics live in this process's default registry; with several API workers,
+scrape each one (or run prometheus_client in multiprocess mode).
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+_TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+_RATE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000)
+
+STAGE_SECONDS = Histogram(
+    "rag_stage_seconds", "Time spent per RAG pipeline stage", ["stage"], buckets=_LATENCY_BUCKETS,
+)
+LLM_PHASE_SECONDS = Histogram(
+    "rag_llm_phase_seconds", "Ollama generation time by phase", ["model", "phase"], buckets=_LATENCY_BUCKETS,
+)
+LLM_TOKENS = Histogram(
+    "rag_llm_tokens", "Tokens per Ollama generation", ["model", "kind"], buckets=_TOKEN_BUCKETS,
+)
+LLM_TOKENS_PER_SECOND = Histogram(
+    "rag_llm_tokens_per_second", "Ollama throughput by phase", ["model", "phase"], buckets=_RATE_BUCKETS,
+)
+ADMISSION_WAIT_SECONDS = Histogram(
+    "rag_admission_wait_seconds", "Time waited for an Ollama slot", ["model", "priority"], buckets=_LATENCY_BUCKETS,
+)
+CONTEXT_TOKENS = Histogram(
+    "rag_context_tokens", "Context tokens per prompt", ["kind"], buckets=_TOKEN_BUCKETS,
+)
+SINGLEFLIGHT_JOINS = Counter(
+    "rag_singleflight_joins", "Generations led or joined", ["role"],
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "rag_http_request_seconds", "API latency until the response starts", ["method", "route", "status"],
+    buckets=_LATENCY_BUCKETS,
+)
+
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(stage).observe(time.perf_counter() - start)
+
+
+class LLMCallTimer:
+    """Records one chat-model call: wall time, time to first token, and Ollama's counters."""
+
+    def __init__(self, model: str):
+        self.model = model
+        self.start = time.perf_counter()
+        self.first_token = False
+
+    def chunk(self, chunk: Any) -> None:
+        if not self.first_token and getattr(chunk, "content", None):
+            self.first_token = True
+            LLM_PHASE_SECONDS.labels(self.model, "first_token").observe(time.perf_counter() - self.start)
+        meta = getattr(chunk, "response_metadata", None)
+        if meta and meta.get("done"):
+            observe_ollama(self.model, meta)
+
+    def finish(self) -> None:
+        STAGE_SECONDS.labels("llm").observe(time.perf_counter() - self.start)
+
+
+def observe_ollama(model: str, meta: dict) -> None:
+    """Record the counters from Ollama's final response (durations are in nanoseconds)."""
+    for phase, key in (("load", "load_duration"), ("prefill", "prompt_eval_duration"), ("decode", "eval_duration")):
+        if meta.get(key) is not None:
+            LLM_PHASE_SECONDS.labels(model, phase).observe(meta[key] / 1e9)
+    for phase, kind, count_key, duration_key in (
+        ("prefill", "prompt", "prompt_eval_count", "prompt_eval_duration"),
+        ("decode", "completion", "eval_count", "eval_duration"),
+    ):
+        count, duration = meta.get(count_key), meta.get(duration_key)
+        if count is not None:
+            LLM_TOKENS.labels(model, kind).observe(count)
+            if duration:
+                LLM_TOKENS_PER_SECOND.labels(model, phase).observe(count / (duration / 1e9))
+
+
+def render() -> tuple[bytes, str]:
+    """Exposition body and content type for /metrics."""
+    return generate_latest(), CONTENT_TYPE_LATEST
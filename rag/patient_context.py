@@ -1,6 +1,33 @@
-from datetime import datetime
-from .vectorstore import get_supabase_client
-from .ingest import ingest_patient_entry
+import asyncio
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from postgrest.exceptions import APIError
+
+from .config import settings
+from .vectorstore import get_async_supabase_client, get_supabase_client
+from .ingest import sync_patient_entries
+from .result_cache import bump_patient_data_version
+
+
+_SYMPTOM_LOGS_HEADING = "## Symptom Logs (patient-reported, curated by doctor)"
+_NO_DATA = "No patient data found."
+
+
+def _symptom_log_line(sl: dict) -> str:
+    sym = sl.get("symptoms")
+    if isinstance(sym, list) and sym:
+        sym_name = sym[0].get("name", "N/A")
+    elif isinstance(sym, dict):
+        sym_name = sym.get("name", "N/A")
+    else:
+        sym_name = "N/A"
+    logged = sl.get("logged_at", "")[:16] if sl.get("logged_at") else "N/A"
+    sev = sl.get("severity", "N/A")
+    note = f" — {sl['notes']}" if sl.get("notes") else ""
+    curated = f" (curated by {sl['curated_by']})" if sl.get("curated_by") else ""
+    return f"- {logged} | {sym_name} | severity {sev}{note}{curated}"
 
 
 def _format_patient_context(data: dict) -> str:
@@ -42,20 +69,9 @@ def _format_patient_context(data: dict) -> str:
         lines.append("")
 
     if data.get("symptom_logs"):
-        lines.append("## Symptom Logs (patient-reported, curated by doctor)")
+        lines.append(_SYMPTOM_LOGS_HEADING)
         for sl in data["symptom_logs"]:
-            sym = sl.get("symptoms")
-            if isinstance(sym, list) and sym:
-                sym_name = sym[0].get("name", "N/A")
-            elif isinstance(sym, dict):
-                sym_name = sym.get("name", "N/A")
-            else:
-                sym_name = "N/A"
-            logged = sl.get("logged_at", "")[:16] if sl.get("logged_at") else "N/A"
-            sev = sl.get("severity", "N/A")
-            note = f" — {sl['notes']}" if sl.get("notes") else ""
-            curated = f" (curated by {sl['curated_by']})" if sl.get("curated_by") else ""
-            lines.append(f"- {logged} | {sym_name} | severity {sev}{note}{curated}")
+            lines.append(_symptom_log_line(sl))
         lines.append("")
  
     if data.get("calendar"):
@@ -77,57 +93,187 @@ def _format_patient_context(data: dict) -> str:
                 sym_name = "N/A"
             lines.append(f"- {t.get('treatment', '')} by {t.get('physician', '')} for {sym_name} (worked: {t.get('worked', True)})")
 
-    return "\n".join(lines) if lines else "No patient data found."
+    return "\n".join(lines) if lines else _NO_DATA
 
 
-def fetch_patient_data(patient_id: str) -> dict:
-    client = get_supabase_client()
-    data = {"patient": None, "disease": None, "medications": [], "adherence": [], "appointments": [], "symptom_logs": [], "calendar": [], "treatments": []}
-
-    r = client.table("patients").select("id, name, disease_id").eq("id", patient_id).maybe_single().execute()
-    if r.data:
-        data["patient"] = r.data
-        disease_id = r.data.get("disease_id")
-        if disease_id:
-            dr = client.table("diseases").select("id, name").eq("id", disease_id).maybe_single().execute()
-            if dr.data:
-                data["disease"] = dr.data
-
-    mr = client.table("medications").select("id, name, dosage, frequency, symptom_id, symptoms(name)").eq("patient_id", patient_id).execute()
-    data["medications"] = mr.data or []
-
-    med_ids = [m["id"] for m in data["medications"]]
-    if med_ids:
-        ar = client.table("medication_adherence_logs").select("medication_id, logged_date, taken, notes, medications(name)").in_("medication_id", med_ids).order("logged_date", desc=True).execute()
-        data["adherence"] = ar.data or []
-
-    apr = client.table("appointments").select("scheduled_at, physician, visit_type, notes").eq("patient_id", patient_id).order("scheduled_at").execute()
-    data["appointments"] = apr.data or []
-
-    slr = client.table("symptom_logs").select("logged_at, severity, notes, curated_by, symptoms(name)").eq("patient_id", patient_id).order("logged_at", desc=True).execute()
-    data["symptom_logs"] = slr.data or []
-
-    cr = client.table("calendar_events").select("event_at, title, description, event_type").eq("patient_id", patient_id).order("event_at").execute()
-    data["calendar"] = cr.data or []
-
-    if data.get("disease"):
-        disease_name = data["disease"].get("name", "")
-        symr = client.table("symptoms").select("id").eq("disease_id", data["disease"]["id"]).execute()
-        symptom_ids = [s["id"] for s in (symr.data or [])]
-        if symptom_ids:
-            tr = client.table("treatments").select("physician, treatment, worked, symptoms(name)").in_("symptom_id", symptom_ids).eq("worked", True).limit(10).execute()
-            data["treatments"] = tr.data or []
+def _empty_bundle() -> dict:
+    return {"patient": None, "disease": None, "medications": [], "adherence": [], "appointments": [], "symptom_logs": [], "calendar": [], "treatments": []}
+
+
+# Flipped off the first time the get_patient_bundle RPC turns out not to exist
+# (migration 007 not applied), so later calls go straight to the fallback.
+_bundle_rpc_available = True
+
+_fetch_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="patient-fetch")
+
+
+def _bundle_queries(client, patient_id: str, since: str | None = None) -> dict:
+    """
+    Independent PostgREST queries for the fallback path, built without executing
+    so the sync and async clients share them.  Joins are pushed into PostgREST
+    (disease embedded in patient, adherence filtered through medications) so
+    only treatments has to wait for another result.
+    """
+    queries = {
+        "patient": client.table("patients").select("id, name, disease_id, diseases(id, name)").eq("id", patient_id).limit(1),
+        "medications": client.table("medications").select("id, name, dosage, frequency, symptom_id, symptoms(name)").eq("patient_id", patient_id),
+        "adherence": client.table("medication_adherence_logs").select("medication_id, logged_date, taken, notes, medications!inner(name, patient_id)").eq("medications.patient_id", patient_id).order("logged_date", desc=True),
+        "appointments": client.table("appointments").select("scheduled_at, physician, visit_type, notes").eq("patient_id", patient_id).order("scheduled_at"),
+        "symptom_logs": client.table("symptom_logs").select("logged_at, severity, notes, curated_by, symptoms(name)").eq("patient_id", patient_id).order("logged_at", desc=True),
+        "calendar": client.table("calendar_events").select("event_at, title, description, event_type").eq("patient_id", patient_id).order("event_at"),
+    }
+    if since:
+        queries["adherence"] = queries["adherence"].gte("logged_date", since)
+        queries["symptom_logs"] = queries["symptom_logs"].gte("logged_at", since)
+    return queries
 
+
+def _treatments_query(client, disease_id: str):
+    return client.table("treatments").select("physician, treatment, worked, symptoms!inner(name, disease_id)").eq("symptoms.disease_id", disease_id).eq("worked", True).limit(10)
+
+
+def _split_patient(rows: list) -> tuple[dict | None, dict | None]:
+    if not rows:
+        return None, None
+    patient = dict(rows[0])
+    disease = patient.pop("diseases", None)
+    if isinstance(disease, list):
+        disease = disease[0] if disease else None
+    return patient, disease
+
+
+def _assemble(results: dict[str, list], treatments: list) -> dict:
+    patient, disease = _split_patient(results["patient"])
+    data = _empty_bundle()
+    data.update({k: v for k, v in results.items() if k != "patient"})
+    data.update({"patient": patient, "disease": disease, "treatments": treatments})
     return data
 
 
+def _from_bundle(bundle: dict) -> dict:
+    data = _empty_bundle()
+    data.update({k: v for k, v in bundle.items() if k in data and v is not None})
+    return data
+
+
+def _bundle_rpc_missing(e: APIError) -> bool:
+    # PGRST202: function not found in the schema cache
+    return getattr(e, "code", None) == "PGRST202"
+
+
+def _bundle_params(patient_id: str, since: str | None) -> dict:
+    params = {"p_patient_id": patient_id}
+    if since:
+        params["p_since"] = since
+    return params
+
+
+def fetch_patient_data(patient_id: str, since: str | None = None) -> dict:
+    """
+    Everything the dashboard and RAG context need about a patient.
+    One get_patient_bundle RPC when available; otherwise the independent queries
+    run concurrently, so latency is bounded by the slowest query, not the sum.
+    `since` (ISO date) limits adherence and symptom logs to that window.
+    """
+    global _bundle_rpc_available
+    client = get_supabase_client()
+    if settings.patient_bundle_rpc and _bundle_rpc_available:
+        try:
+            r = client.rpc("get_patient_bundle", _bundle_params(patient_id, since)).execute()
+            return _from_bundle(r.data or {})
+        except APIError as e:
+            if not _bundle_rpc_missing(e):
+                raise
+            _bundle_rpc_available = False
+
+    futures = {name: _fetch_pool.submit(q.execute) for name, q in _bundle_queries(client, patient_id, since).items()}
+
+    def treatments() -> list:
+        _, disease = _split_patient(futures["patient"].result().data or [])
+        if not disease:
+            return []
+        return _treatments_query(client, disease["id"]).execute().data or []
+
+    treatments_future = _fetch_pool.submit(treatments)
+    results = {name: f.result().data or [] for name, f in futures.items()}
+    return _assemble(results, treatments_future.result())
+
+
+async def afetch_patient_data(patient_id: str, since: str | None = None) -> dict:
+    """Async twin of fetch_patient_data for the FastAPI request path."""
+    global _bundle_rpc_available
+    client = await get_async_supabase_client()
+    if settings.patient_bundle_rpc and _bundle_rpc_available:
+        try:
+            r = await client.rpc("get_patient_bundle", _bundle_params(patient_id, since)).execute()
+            return _from_bundle(r.data or {})
+        except APIError as e:
+            if not _bundle_rpc_missing(e):
+                raise
+            _bundle_rpc_available = False
+
+    tasks = {name: asyncio.ensure_future(q.execute()) for name, q in _bundle_queries(client, patient_id, since).items()}
+
+    async def treatments() -> list:
+        _, disease = _split_patient((await tasks["patient"]).data or [])
+        if not disease:
+            return []
+        return (await _treatments_query(client, disease["id"]).execute()).data or []
+
+    names = list(tasks)
+    *responses, treatment_rows = await asyncio.gather(*(tasks[n] for n in names), treatments())
+    results = {n: r.data or [] for n, r in zip(names, responses)}
+    return _assemble(results, treatment_rows)
+
+
+def _symptom_log_week(sl: dict) -> str:
+    try:
+        day = datetime.fromisoformat(sl["logged_at"][:10]).date()
+    except (KeyError, TypeError, ValueError):
+        return "undated"
+    return (day - timedelta(days=day.weekday())).isoformat()
+
+
+def _patient_context_sections(data: dict) -> list[str]:
+    """
+    Split the formatted context at its '## ' headings so each section chunks
+    independently, and give symptom logs one section per ISO week (Monday
+    start).  Chunk boundaries inside a section shift when it grows, so the
+    long, newest-first log history is bucketed: a new log only rewrites its
+    own week's chunk and older weeks keep their hashes.
+    """
+    logs = data.get("symptom_logs") or []
+    text = _format_patient_context({**data, "symptom_logs": []})
+    sections = [sec.strip() for sec in re.split(r"(?m)^(?=## )", text) if sec.strip()]
+    if logs and sections == [_NO_DATA]:
+        sections = []
+
+    weeks: dict[str, list[str]] = {}
+    for sl in logs:
+        weeks.setdefault(_symptom_log_week(sl), []).append(_symptom_log_line(sl))
+    for week, lines in weeks.items():
+        label = "undated" if week == "undated" else f"week of {week}"
+        sections.append("\n".join([f"{_SYMPTOM_LOGS_HEADING} — {label}", *lines]))
+    return sections
+
+
 def build_and_ingest_patient_context(patient_id: str, date: str | None = None) -> int:
+    """
+    Refresh the patient's RAG context incrementally.
+    Only new or changed chunks are embedded and written; superseded chunks are removed.
+
+    Returns:
+        Number of chunks added (0 when nothing changed).
+    """
     data = fetch_patient_data(patient_id)
-    text = _format_patient_context(data)
-    return ingest_patient_entry(
+    result = sync_patient_entries(
         user_id=patient_id,
-        content=text,
+        sections=_patient_context_sections(data),
+        source="patient-context",
         doc_type="patient_summary",
         date=date or datetime.utcnow().date().isoformat(),
-        extra_metadata={"source": "patient-context", "patient_name": data.get("patient", {}).get("name", "Unknown")},
+        extra_metadata={"patient_name": (data.get("patient") or {}).get("name", "Unknown")},
     )
+    if result["added"] or result["deleted"]:
+        bump_patient_data_version(patient_id)
+    return result["added"]
@@ -0,0 +1,151 @@
+"""
+prewarm.py — Pre-generate summaries and interpretations ahead of appointments.
+
+Physicians open the patients on the day's schedule, and each open would
+otherwise generate the summary and interpretation cold.  Every
+PREWARM_INTERVAL_MINUTES the scheduler finds patients with an appointment or
+calendar event in the next PREWARM_HORIZON_HOURS and queues one "prewarm"
+job per patient (jobs.py) at batch priority, earliest appointment first.
+Each job refreshes the patient's RAG context (only changed chunks are
+re-embedded) and then queues SUMMARY_PROMPT and INTERPRETATION_PROMPT
+generations, so interactive requests still go first.
+
+Passes are rolling: the horizon overlaps the interval, so every appointment
+is seen by several passes, the first at least horizon - interval ahead of it.
+A patient seen again is cheap: the context refresh finds nothing changed and
+the generations hit the result cache, which is keyed by the patient's data
+version, so a patient who logged something since the last pass is warmed
+again.  RESULT_CACHE_TTL_SECONDS should cover the horizon.
+
+The scheduler runs inside the API process (PREWARM_ENABLED=true).  For a cron
+job instead, point the CLI at the running API so generations are cached where
+requests are served:
+    python -m rag.prewarm --api http://localhost:8000 [--horizon-hours 6]
+"""
+
+import argparse
+import json
+import logging
+import threading
+import urllib.request
+from datetime import datetime, timedelta, timezone
+
+from .config import settings
+from .jobs import PREWARM, PRIORITY_BATCH, get_job_queue
+from .patient_context import build_and_ingest_patient_context
+from .vectorstore import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+
+def upcoming_patient_ids(horizon_hours: float | None = None, now: datetime | None = None) -> list[str]:
+    """Patients with an appointment or calendar event in [now, now + horizon)."""
+    now = now or datetime.now(timezone.utc)
+    start = now.isoformat()
+    end = (now + timedelta(hours=horizon_hours or settings.prewarm_horizon_hours)).isoformat()
+    client = get_supabase_client()
+    appointments = (
+        client.table("appointments").select("patient_id, scheduled_at")
+        .gte("scheduled_at", start).lt("scheduled_at", end).order("scheduled_at").execute()
+    )
+    events = (
+        client.table("calendar_events").select("patient_id, event_at")
+        .gte("event_at", start).lt("event_at", end).order("event_at").execute()
+    )
+    # Earliest appointment first, so the first visits of the day are warmed first
+    rows = sorted(
+        [(r.get("scheduled_at") or "", r.get("patient_id")) for r in appointments.data or []]
+        + [(r.get("event_at") or "", r.get("patient_id")) for r in events.data or []]
+    )
+    return list(dict.fromkeys(pid for _, pid in rows if pid))
+
+
+def refresh_contexts(patient_ids: list[str]) -> dict[str, str]:
+    """Re-ingest each patient's context; returns {patient_id: error} for failures."""
+    errors = {}
+    for pid in patient_ids:
+        try:
+            build_and_ingest_patient_context(pid)
+        except Exception as e:
+            errors[pid] = str(e)
+    return errors
+
+
+def prewarm(horizon_hours: float | None = None) -> dict:
+    """
+    Queue one pre-warm pass on this process's job queue and return without
+    waiting for it; follow progress with GET /jobs/batches/{batch_id}.
+    """
+    patient_ids = upcoming_patient_ids(horizon_hours)
+    batch = get_job_queue().submit_many(PREWARM, patient_ids, priority=PRIORITY_BATCH)
+    return {"patients": len(patient_ids), "batch_id": batch["batch_id"]}
+
+
+class PrewarmScheduler:
+    """Daemon thread running prewarm() every `interval_minutes`, starting right away."""
+
+    def __init__(self, interval_minutes: float | None = None, horizon_hours: float | None = None):
+        self.interval_minutes = interval_minutes or settings.prewarm_interval_minutes
+        self.horizon_hours = horizon_hours or settings.prewarm_horizon_hours
+        self.last_run: dict | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="rag-prewarm", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        if settings.result_cache_ttl_seconds < self.horizon_hours * 3600:
+            logger.warning(
+                "RESULT_CACHE_TTL_SECONDS (%ss) is shorter than PREWARM_HORIZON_HOURS (%sh); "
+                "later appointments may miss the pre-warmed results",
+                settings.result_cache_ttl_seconds, self.horizon_hours,
+            )
+        if self.horizon_hours * 60 <= self.interval_minutes:
+            logger.warning(
+                "PREWARM_HORIZON_HOURS (%sh) does not exceed PREWARM_INTERVAL_MINUTES (%sm); "
+                "appointments early in each interval may not be warmed in time",
+                self.horizon_hours, self.interval_minutes,
+            )
+        while True:
+            try:
+                self.last_run = {"at": datetime.now().isoformat(), **prewarm(self.horizon_hours)}
+                logger.info("prewarm: %s", self.last_run)
+            except Exception:
+                logger.exception("prewarm run failed")
+            if self._stop.wait(self.interval_minutes * 60):
+                return
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Pre-warm summaries for upcoming appointments.")
+    parser.add_argument("--horizon-hours", type=float, default=None, help="Look-ahead window (default: PREWARM_HORIZON_HOURS)")
+    parser.add_argument("--api", default=None, help="Base URL of the running API to queue generations on")
+    args = parser.parse_args()
+
+    patient_ids = upcoming_patient_ids(args.horizon_hours)
+    errors = refresh_contexts(patient_ids)
+    ready = [pid for pid in patient_ids if pid not in errors]
+    print(f"{len(patient_ids)} upcoming patient(s), {len(ready)} context(s) refreshed")
+    for pid, err in errors.items():
+        print(f"  failed: {pid}: {err}")
+
+    if args.api and ready:
+        # The API's prewarm jobs refresh again (a no-op now) and queue the generations
+        req = urllib.request.Request(
+            f"{args.api.rstrip('/')}/jobs/panel",
+            data=json.dumps({"kind": PREWARM, "patient_ids": ready}).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(req) as resp:
+            print(f"queued {PREWARM}: batch {json.loads(resp.read())['batch_id']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -20,6 +20,11 @@ Message structure sent to both models:
 Placeholders filled at runtime by the RAG chain:
   {context}  — formatted top-k chunks from Supabase pgvector
   {question} — the user's input
+
+The fixed doctor-chain questions (summary, interpretation, chat prose
+instruction) also live here, so the API, the job queue and pre-warming send
+byte-identical prompts and share result-cache entries, as do the fixed turns
+of physician chat sessions.
 """
 
 from langchain_core.prompts import ChatPromptTemplate, HumanMessagePromptTemplate
@@ -59,3 +64,44 @@ Retrieved context (patient record + clinical literature):
 doctor_prompt = ChatPromptTemplate.from_messages([
     HumanMessagePromptTemplate.from_template(_DOCTOR_HUMAN),
 ])
+
+
+# ── Fixed doctor-chain questions ──────────────────────────────────────────────
+# Sent as {question} for the physician dashboard panels.
+
+SUMMARY_PROMPT = """Max 90 words. Do NOT mention the patient's name or disease. Start directly with symptoms. Summarize: meds and adherence, symptom severity, upcoming appointments. One paragraph, no line breaks."""
+
+INTERPRETATION_PROMPT = """Based on the retrieved patient context, write a short "In plain English" paragraph (2-3 sentences). Use simple language for quick physician review. Write in plain prose only—no markdown, newlines, bullet points, or asterisks."""
+
+CHAT_PROSE_INSTRUCTION = " Write as ONE continuous paragraph with no line breaks—no newlines, no Enter. Plain prose only."
+
+# Generation kinds that can be queued as jobs (see jobs.py)
+GENERATION_PROMPTS = {
+    "summary": SUMMARY_PROMPT,
+    "interpretation": INTERPRETATION_PROMPT,
+}
+
+
+# ── Physician chat sessions ───────────────────────────────────────────────────
+# See chat_sessions.py.  A session opens with the patient context as its own
+# turn, acknowledged, so every follow-up shares that prefix byte-for-byte and
+# Ollama only prefills what was appended since the last answer.
+
+_SESSION_CONTEXT = """\
+Retrieved context (patient record + clinical literature):
+
+{context}
+
+---
+I will ask follow-up questions about this patient. Use the context above for all of them."""
+
+SESSION_ACK = "Understood."
+
+# Prepended to the oldest turn still kept once earlier turns are compacted
+SESSION_SUMMARY_PREFIX = "Summary of our earlier discussion:\n{summary}\n\n---\n"
+
+COMPACTION_PROMPT = """Summarize our conversation about this patient so far in at most 120 words for your own later reference: the questions asked, the key findings and any open points. Plain prose only."""
+
+
+def session_context_message(context: str) -> str:
+    return _SESSION_CONTEXT.format(context=context)
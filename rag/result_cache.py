@@ -0,0 +1,184 @@
+"""
+result_cache.py — Cached LLM outputs (patient summary / interpretation).
+
+Entries are keyed by (patient_id, sha256(prompt), model, data_version).  The
+data version is patients.data_version (migration 010): row triggers bump it
+on every write to the tables the patient context is built from, and
+bump_patient_data_version() bumps it after the patient's RAG context is
+re-ingested.  A bump makes earlier entries unreachable, so repeat views are
+served from memory and only real data changes pay for a generation.
+
+Because the version lives in Supabase, a write through one API worker is
+seen by the others within DATA_VERSION_TTL_SECONDS (the local read cache);
+the worker that wrote calls patient_data_changed() and sees it at once.
+Without migration 010 the versions fall back to bounded per-process
+counters, and the result TTL bounds how long another worker's write can go
+unnoticed.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+from postgrest.exceptions import APIError
+
+from .cache import LRUCache
+from .config import settings
+from .vectorstore import get_async_supabase_client, get_supabase_client
+
+# Flipped off the first time patients.data_version turns out not to exist
+# (migration 010 not applied); versions then come from _LocalVersions.
+_db_versions = True
+
+_version_cache = LRUCache(
+    "data_versions",
+    maxsize=settings.result_cache_size * 4,
+    ttl=settings.data_version_ttl_seconds,
+)
+
+
+class _LocalVersions:
+    """
+    Bounded per-process fallback counters.  Versions are drawn from one global
+    sequence and an evicted patient reads back as the highest version evicted
+    so far, which is never lower than what its cached results were keyed by.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._versions: OrderedDict[str, int] = OrderedDict()
+        self._seq = 0
+        self._floor = 0
+        self._lock = threading.Lock()
+
+    def get(self, patient_id: str) -> int:
+        with self._lock:
+            return self._versions.get(patient_id, self._floor)
+
+    def bump(self, patient_id: str) -> int:
+        with self._lock:
+            self._seq += 1
+            self._versions[patient_id] = self._seq
+            self._versions.move_to_end(patient_id)
+            while len(self._versions) > self.maxsize:
+                _, evicted = self._versions.popitem(last=False)
+                self._floor = max(self._floor, evicted)
+            return self._seq
+
+
+_local_versions = _LocalVersions(settings.result_cache_size * 4)
+
+
+def _column_missing(e: APIError) -> bool:
+    # 42703: undefined column; PGRST202: function not found in the schema cache
+    return getattr(e, "code", None) in ("42703", "PGRST202")
+
+
+def _disable_db_versions() -> None:
+    global _db_versions
+    _db_versions = False
+    _version_cache.clear()
+
+
+def _version_from_rows(rows: list) -> int:
+    return int(rows[0].get("data_version") or 0) if rows else 0
+
+
+def patient_data_version(patient_id: str) -> int:
+    if _db_versions:
+        version = _version_cache.get(patient_id)
+        if version is not None:
+            return version
+        try:
+            r = get_supabase_client().table("patients").select("data_version").eq("id", patient_id).limit(1).execute()
+        except APIError as e:
+            if not _column_missing(e):
+                raise
+            _disable_db_versions()
+        else:
+            version = _version_from_rows(r.data)
+            _version_cache.set(patient_id, version)
+            return version
+    return _local_versions.get(patient_id)
+
+
+async def apatient_data_version(patient_id: str) -> int:
+    """Async twin of patient_data_version."""
+    if _db_versions:
+        version = _version_cache.get(patient_id)
+        if version is not None:
+            return version
+        client = await get_async_supabase_client()
+        try:
+            r = await client.table("patients").select("data_version").eq("id", patient_id).limit(1).execute()
+        except APIError as e:
+            if not _column_missing(e):
+                raise
+            _disable_db_versions()
+        else:
+            version = _version_from_rows(r.data)
+            _version_cache.set(patient_id, version)
+            return version
+    return _local_versions.get(patient_id)
+
+
+def bump_patient_data_version(patient_id: str) -> None:
+    """Invalidate cached results for a patient after a change the triggers don't see (context re-ingest)."""
+    if _db_versions:
+        try:
+            get_supabase_client().rpc("bump_patient_data_version", {"p_patient_id": patient_id}).execute()
+        except APIError as e:
+            if not _column_missing(e):
+                raise
+            _disable_db_versions()
+        else:
+            _version_cache.pop(patient_id)
+            return
+    _local_versions.bump(patient_id)
+
+
+def patient_data_changed(patient_id: str) -> None:
+    """
+    Call after writing a patient's logs: the triggers already bumped the
+    version in the database, so only this worker's cached copy is dropped
+    (or, without migration 010, the local counter is bumped).
+    """
+    if _db_versions:
+        _version_cache.pop(patient_id)
+    else:
+        _local_versions.bump(patient_id)
+
+
+_results = LRUCache(
+    "results",
+    maxsize=settings.result_cache_size,
+    ttl=settings.result_cache_ttl_seconds,
+)
+
+
+def result_key(patient_id: str, prompt: str, model: str) -> tuple:
+    """
+    Cache key for a generation, pinned to the patient's current data version.
+    Compute it before generating so a write that lands mid-generation
+    is not masked by storing the stale answer under the new version.
+    """
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    return (patient_id, digest, model, patient_data_version(patient_id))
+
+
+async def aresult_key(patient_id: str, prompt: str, model: str) -> tuple:
+    """Async twin of result_key."""
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    return (patient_id, digest, model, await apatient_data_version(patient_id))
+
+
+def get_result(key: tuple) -> str | None:
+    return _results.get(key)
+
+
+def store_result(key: tuple, value: str) -> None:
+    _results.set(key, value)
+
+
+def result_cache_stats() -> dict:
+    return _results.stats()
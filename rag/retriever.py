@@ -4,78 +4,194 @@ retriever.py — Retrieval layer: vector store → top-k relevant chunks.
 Key design choices:
   - `score_threshold` filters out low-confidence matches before they pollute the LLM prompt.
     This is critical for medical accuracy — we'd rather return fewer chunks than hallucinate.
-  - `search_type="similarity_score_threshold"` uses cosine similarity (matches pgvector index).
-  - `MergerRetriever` (ensemble) for the doctor mode merges disease-knowledge chunks
-    with patient-specific chunks in a single ranked list.  This mirrors how a clinician
-    actually thinks: disease context + patient history simultaneously.
-  - `EmbeddingsRedundantFilter` deduplicates near-identical chunks so the LLM context
-    window isn't wasted on repeated information.
+  - Matches are ranked by cosine similarity (matches the pgvector index).
+  - `DualStoreRetriever` merges disease-knowledge chunks with patient-specific chunks
+    in a single ranked list.  This mirrors how a clinician actually thinks: disease
+    context + patient history simultaneously.  The question is embedded once and the
+    match_rag_documents / match_rag_patient_records searches run concurrently
+    (thread pool for invoke, asyncio.gather for ainvoke), so retrieval costs one
+    embedding plus the slower of the two RPCs.
+  - `StoredVectorRedundantFilter` deduplicates near-identical chunks so the LLM context
+    window isn't wasted on repeated information.  It compares the embeddings the
+    match_rag_* RPCs already return from pgvector (one NumPy matrix product) rather
+    than re-embedding every retrieved chunk through Ollama.
 """
 
-from langchain_classic.retrievers import MergerRetriever, ContextualCompressionRetriever
-from langchain_classic.retrievers.document_compressors import DocumentCompressorPipeline
-from langchain_community.document_transformers import EmbeddingsRedundantFilter
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from itertools import zip_longest
+from typing import Any, Sequence
+
+import numpy as np
+from pydantic import ConfigDict
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import BaseDocumentTransformer, Document
+from langchain_core.embeddings import Embeddings
 from langchain_core.vectorstores import VectorStore
 from langchain_core.retrievers import BaseRetriever
 
 from .config import settings
 from .embeddings import get_embeddings
+from .metrics import stage_timer
+from .supabase_vectorstore import EMBEDDING_KEY, SCORE_KEY
 from .vectorstore import get_documents_store, get_patient_records_store
 
+# Shared pool for the sync path's concurrent store searches.
+_search_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="rag-search")
 
-def _base_retriever(
-    store: VectorStore,
-    top_k: int | None = None,
-    filter: dict | None = None,
-) -> BaseRetriever:
-    k = top_k or settings.rag_top_k
-    search_kwargs = {
-        "k": k,
-        "score_threshold": settings.rag_similarity_threshold,
-    }
-    if filter:
-        search_kwargs["filter"] = filter
-    return store.as_retriever(
-        search_type="similarity_score_threshold",
-        search_kwargs=search_kwargs,
-    )
 
+def _redundant_indices(vectors: np.ndarray, threshold: float) -> list[int]:
+    """
+    Indices to keep: walk in rank order and drop any chunk whose cosine similarity
+    to an already-kept chunk exceeds the threshold.
+    """
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    unit = vectors / np.where(norms == 0, 1.0, norms)
+    sim = unit @ unit.T
+    keep = np.ones(len(vectors), dtype=bool)
+    for i in range(1, len(vectors)):
+        if (sim[i, :i][keep[:i]] > threshold).any():
+            keep[i] = False
+    return np.flatnonzero(keep).tolist()
+
+
+class StoredVectorRedundantFilter(BaseDocumentTransformer):
+    """
+    Drop near-duplicate documents using the embeddings attached by the vector store
+    (metadata[EMBEDDING_KEY]).  Documents without a stored vector are embedded with
+    the fallback model, so the filter still works against older match RPCs.
+    """
+
+    def __init__(self, embeddings: Embeddings, similarity_threshold: float = 0.95):
+        self.embeddings = embeddings
+        self.similarity_threshold = similarity_threshold
+
+    @staticmethod
+    def _missing(documents: Sequence[Document]) -> list[int]:
+        return [i for i, d in enumerate(documents) if d.metadata.get(EMBEDDING_KEY) is None]
+
+    def _filter(self, documents: Sequence[Document], fallback: dict[int, list[float]]) -> list[Document]:
+        vectors = np.vstack([
+            np.asarray(fallback[i] if i in fallback else d.metadata[EMBEDDING_KEY], dtype=np.float32)
+            for i, d in enumerate(documents)
+        ])
+        return [documents[i] for i in _redundant_indices(vectors, self.similarity_threshold)]
 
-def _dedup_compressor() -> DocumentCompressorPipeline: 
-    redundancy_filter = EmbeddingsRedundantFilter(
+    def transform_documents(self, documents: Sequence[Document], **kwargs: Any) -> Sequence[Document]:
+        if len(documents) < 2:
+            return list(documents)
+        with stage_timer("redundancy_filter"):
+            missing = self._missing(documents)
+            fallback = {}
+            if missing:
+                vecs = self.embeddings.embed_documents([documents[i].page_content for i in missing])
+                fallback = dict(zip(missing, vecs))
+            return self._filter(documents, fallback)
+
+    async def atransform_documents(self, documents: Sequence[Document], **kwargs: Any) -> Sequence[Document]:
+        if len(documents) < 2:
+            return list(documents)
+        with stage_timer("redundancy_filter"):
+            missing = self._missing(documents)
+            fallback = {}
+            if missing:
+                vecs = await self.embeddings.aembed_documents([documents[i].page_content for i in missing])
+                fallback = dict(zip(missing, vecs))
+            return self._filter(documents, fallback)
+
+
+def _redundancy_filter() -> StoredVectorRedundantFilter:
+    return StoredVectorRedundantFilter(
         embeddings=get_embeddings(),
-        similarity_threshold=0.95,  
+        similarity_threshold=0.95,
     )
-    return DocumentCompressorPipeline(transformers=[redundancy_filter])
 
 
-def get_patient_retriever(patient_id: str) -> BaseRetriever:
-    disease_retriever = _base_retriever(get_documents_store())
-    patient_retriever = _base_retriever(
-        get_patient_records_store(patient_id),
-        filter={"user_id": patient_id},
-    )
+def _scored(hits: list[tuple[Document, float]]) -> list[Document]:
+    """Ranked documents with their query similarity kept in metadata[SCORE_KEY]."""
+    for doc, score in hits:
+        doc.metadata[SCORE_KEY] = score
+    return [doc for doc, _ in hits]
 
-    merged = MergerRetriever(retrievers=[disease_retriever, patient_retriever])
 
-    # Wrap in compressor to deduplicate before LLM sees the context
-    return ContextualCompressionRetriever(
-        base_compressor=_dedup_compressor(),
-        base_retriever=merged,
-    )
+def _interleave(*ranked: list[Document]) -> list[Document]:
+    """Round-robin merge of ranked lists (same order MergerRetriever produced)."""
+    return [doc for group in zip_longest(*ranked) for doc in group if doc is not None]
 
 
-def get_doctor_retriever(patient_id: str, top_k_per_source: int = 8) -> BaseRetriever:
-    disease_retriever = _base_retriever(get_documents_store(), top_k=top_k_per_source)
-    patient_retriever = _base_retriever(
-        get_patient_records_store(patient_id),
-        top_k=top_k_per_source,
-        filter={"user_id": patient_id},
-    )
+class DualStoreRetriever(BaseRetriever):
+    """
+    Disease-knowledge + patient-record retriever.
+
+    Embeds the query once, searches both stores concurrently with the same vector,
+    interleaves the ranked hits and drops near-duplicates.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    documents_store: VectorStore
+    patient_store: VectorStore
+    patient_id: str
+    k_per_source: int
+    score_threshold: float
+    embeddings: Embeddings
+    redundancy_filter: StoredVectorRedundantFilter
+
+    def _searches(self) -> list[tuple[VectorStore, dict | None]]:
+        return [
+            (self.documents_store, None),
+            (self.patient_store, {"user_id": self.patient_id}),
+        ]
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        vector = self.embeddings.embed_query(query)
+        futures = [
+            _search_pool.submit(
+                store.similarity_search_by_vector_with_relevance_scores,
+                vector,
+                k=self.k_per_source,
+                filter=filter,
+                score_threshold=self.score_threshold,
+            )
+            for store, filter in self._searches()
+        ]
+        ranked = [_scored(f.result()) for f in futures]
+        return list(self.redundancy_filter.transform_documents(_interleave(*ranked)))
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        vector = await self.embeddings.aembed_query(query)
+        results = await asyncio.gather(*[
+            store.asimilarity_search_by_vector_with_relevance_scores(
+                vector,
+                k=self.k_per_source,
+                filter=filter,
+                score_threshold=self.score_threshold,
+            )
+            for store, filter in self._searches()
+        ])
+        ranked = [_scored(hits) for hits in results]
+        return list(await self.redundancy_filter.atransform_documents(_interleave(*ranked)))
 
-    merged = MergerRetriever(retrievers=[disease_retriever, patient_retriever])
 
-    return ContextualCompressionRetriever(
-        base_compressor=_dedup_compressor(),
-        base_retriever=merged,
+def _dual_store_retriever(patient_id: str, k_per_source: int) -> DualStoreRetriever:
+    return DualStoreRetriever(
+        documents_store=get_documents_store(),
+        patient_store=get_patient_records_store(patient_id),
+        patient_id=patient_id,
+        k_per_source=k_per_source,
+        score_threshold=settings.rag_similarity_threshold,
+        embeddings=get_embeddings(),
+        redundancy_filter=_redundancy_filter(),
     )
+
+
+def get_patient_retriever(patient_id: str) -> BaseRetriever:
+    return _dual_store_retriever(patient_id, k_per_source=settings.rag_top_k)
+
+
+def get_doctor_retriever(patient_id: str, top_k_per_source: int = 8) -> BaseRetriever:
+    return _dual_store_retriever(patient_id, k_per_source=top_k_per_source)
@@ -0,0 +1,100 @@
+"""
+rollups.py — Per patient/day rollups of symptom and adherence metrics.
+
+patient_daily_rollups (supabase/migrations/008_daily_rollups.sql) holds, per
+patient and UTC day: max severity, log count, flare flag and doses taken/total.
+Row triggers on symptom_logs and medication_adherence_logs keep it current, so
+every write path (log_symptoms, log_medication_adherence, direct inserts) is
+covered.  The dashboard reads DASHBOARD_ROLLUP_DAYS of rollups with one
+get_dashboard_rollups RPC instead of the patient's whole raw history.
+
+CLI (run once after applying the migration, or to repair drift):
+    python -m rag.rollups backfill [--patient ID]
+"""
+
+import argparse
+from datetime import datetime, timedelta
+
+from postgrest.exceptions import APIError
+
+from .config import settings
+from .vectorstore import get_async_supabase_client, get_supabase_client
+
+# Flipped off the first time get_dashboard_rollups turns out not to exist
+# (migration 008 not applied), so later calls go straight to the raw path.
+_rollups_rpc_available = True
+
+
+def rollup_window_start() -> str:
+    """First day (ISO date) of the DASHBOARD_ROLLUP_DAYS window the dashboard shows."""
+    return (datetime.utcnow() - timedelta(days=settings.dashboard_rollup_days)).date().isoformat()
+
+
+def _rollup_params(patient_id: str) -> dict:
+    return {"p_patient_id": patient_id, "p_since": rollup_window_start()}
+
+
+def _rollups_rpc_missing(e: APIError) -> bool:
+    # PGRST202: function not found in the schema cache
+    return getattr(e, "code", None) == "PGRST202"
+
+
+def _rollups_enabled() -> bool:
+    return settings.dashboard_rollups and _rollups_rpc_available
+
+
+def fetch_dashboard_rollups(patient_id: str) -> dict | None:
+    """
+    Rollup days within the window plus the few raw rows the dashboard still needs
+    (latest 5 logs, distinct symptom names).  None when rollups are unavailable.
+    """
+    global _rollups_rpc_available
+    if not _rollups_enabled():
+        return None
+    try:
+        r = get_supabase_client().rpc("get_dashboard_rollups", _rollup_params(patient_id)).execute()
+    except APIError as e:
+        if not _rollups_rpc_missing(e):
+            raise
+        _rollups_rpc_available = False
+        return None
+    return r.data or {}
+
+
+async def afetch_dashboard_rollups(patient_id: str) -> dict | None:
+    """Async twin of fetch_dashboard_rollups."""
+    global _rollups_rpc_available
+    if not _rollups_enabled():
+        return None
+    client = await get_async_supabase_client()
+    try:
+        r = await client.rpc("get_dashboard_rollups", _rollup_params(patient_id)).execute()
+    except APIError as e:
+        if not _rollups_rpc_missing(e):
+            raise
+        _rollups_rpc_available = False
+        return None
+    return r.data or {}
+
+
+def backfill_rollups(patient_id: str | None = None) -> int:
+    """Rebuild rollups from raw rows for one patient, or everyone. Returns rows written."""
+    r = get_supabase_client().rpc("backfill_patient_daily_rollups", {"p_patient_id": patient_id}).execute()
+    return int(r.data or 0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Maintain the dashboard's daily rollup table.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    backfill = sub.add_parser("backfill", help="Rebuild rollups from symptom and adherence logs")
+    backfill.add_argument("--patient", default=None, help="Only this patient id")
+    args = parser.parse_args()
+
+    if args.command == "backfill":
+        n = backfill_rollups(args.patient)
+        scope = f"patient {args.patient}" if args.patient else "all patients"
+        print(f"Backfilled {n} rollup day(s) for {scope}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+roster.py — Physician panel roster (GET /patients).
+
+One `patient_roster` RPC per page (see supabase/migrations/004_patient_roster.sql)
+returns condition, last visit and the max severity of the last 5 symptom logs
+for every patient, so loading the panel costs a constant number of round trips
+regardless of how many patients it holds.
+
+Pagination is keyset-based on (name, id).  The cursor handed to the client is
+an opaque url-safe token wrapping the last row's (name, id).
+"""
+
+import base64
+import json
+from datetime import datetime
+
+from .config import settings
+from .vectorstore import get_async_supabase_client, get_supabase_client
+
+
+class InvalidCursor(ValueError):
+    """Raised when a roster cursor cannot be decoded."""
+
+
+def encode_cursor(name: str, patient_id: str) -> str:
+    raw = json.dumps([name, patient_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        name, patient_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}") from e
+    return str(name), str(patient_id)
+
+
+def _format_last_visit(value) -> str:
+    if not value:
+        return "N/A"
+    try:
+        dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        return dt.strftime("%b %d")
+    except (ValueError, TypeError):
+        return str(value)[:10]
+
+
+def _roster_entry(row: dict) -> dict:
+    max_sev = row.get("max_recent_severity") or 0
+    severity = "High" if max_sev >= 7 else ("Moderate" if max_sev >= 5 else "Low")
+    return {
+        "id": row["id"],
+        "name": row["name"],
+        "condition": row.get("condition") or "Unknown",
+        "lastVisit": _format_last_visit(row.get("last_visit_at")),
+        "severity": severity,
+        "alert": max_sev >= 6,
+    }
+
+
+def _page_size(limit: int | None) -> int:
+    size = limit or settings.roster_page_size
+    return max(1, min(size, settings.roster_max_page_size))
+
+
+def _roster_params(cursor: str | None, limit: int | None) -> dict:
+    params = {"page_size": _page_size(limit)}
+    if cursor:
+        after_name, after_id = decode_cursor(cursor)
+        params.update({"after_name": after_name, "after_id": after_id})
+    return params
+
+
+def _roster_page(rows: list[dict], page_size: int) -> dict:
+    patients = [_roster_entry(r) for r in rows]
+    next_cursor = None
+    if len(rows) == page_size:
+        last = rows[-1]
+        next_cursor = encode_cursor(last["name"], last["id"])
+    return {"patients": patients, "next_cursor": next_cursor}
+
+
+def fetch_patient_roster(cursor: str | None = None, limit: int | None = None) -> dict:
+    """
+    Return one page of the physician roster.
+
+    Args:
+        cursor: Opaque `next_cursor` from a previous page, or None for the first page.
+        limit:  Page size; defaults to settings.roster_page_size.
+
+    Returns:
+        {"patients": [...], "next_cursor": str | None}
+    """
+    params = _roster_params(cursor, limit)
+    r = get_supabase_client().rpc("patient_roster", params).execute()
+    return _roster_page(r.data or [], params["page_size"])
+
+
+async def afetch_patient_roster(cursor: str | None = None, limit: int | None = None) -> dict:
+    """Async twin of fetch_patient_roster."""
+    params = _roster_params(cursor, limit)
+    client = await get_async_supabase_client()
+    r = await client.rpc("patient_roster", params).execute()
+    return _roster_page(r.data or [], params["page_size"])
@@ -0,0 +1,264 @@
+"""
+singleflight.py — Coalesce identical in-flight doctor-chain generations.
+
+When several physicians open the same patient at once, every /summary call
+would generate the same prompt against the same context.  Generations are
+keyed like the result cache — (patient_id, sha256(prompt), model,
+data_version) — and while one is running, later callers with the same key
+join it instead of starting another:
+
+  - the first caller (leader) runs the chain and publishes each token chunk
+  - followers, streaming or not, replay the chunks produced so far and then
+    receive the rest live; non-streaming callers get the joined text
+
+Flights are shared between the event loop (API requests) and worker threads
+(job queue, pre-warming), so a click that lands while a pre-warm job is
+generating for that patient waits for the job's answer.  An async leader runs
+as its own task, so one caller disconnecting doesn't cancel the generation
+the others are waiting on.  With store=True the answer is written to the
+result cache before the flight is retired, so there's no gap where a new
+caller misses both.  The generation runs under a SharedPriority
+(admission.py) started at the leader's priority; a more urgent follower
+raises it, re-queueing the leader's pending LLM call, so a physician who
+joins a BATCH pre-warm generation is served as INTERACTIVE.
+"""
+
+import asyncio
+import threading
+from typing import AsyncIterator, Hashable
+
+from .admission import INTERACTIVE, AdmissionRejected, SharedPriority, llm_priority, llm_shared_priority
+from .chains import get_doctor_chain
+from .context_packer import ContextReport, track_context
+from .metrics import SINGLEFLIGHT_JOINS
+from .result_cache import store_result
+
+
+class Flight:
+    """One in-progress generation: token chunks so far, and its outcome."""
+
+    def __init__(self, priority: int) -> None:
+        self.priority = SharedPriority(priority)
+        self.chunks: list[str] = []
+        self.done = False
+        self.error: BaseException | None = None
+        self.context: ContextReport | None = None   # what the leader packed into the prompt
+        self._cond = threading.Condition()
+        self._async_waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    def _wake(self) -> None:
+        # Called with self._cond held
+        self._cond.notify_all()
+        for loop, fut in self._async_waiters:
+            loop.call_soon_threadsafe(_resolve, fut)
+        self._async_waiters.clear()
+
+    def publish(self, chunk: str) -> None:
+        with self._cond:
+            self.chunks.append(chunk)
+            self._wake()
+
+    def finish(self, error: BaseException | None = None) -> None:
+        with self._cond:
+            self.done = True
+            self.error = error
+            self._wake()
+
+    def text(self) -> str:
+        with self._cond:
+            return "".join(self.chunks)
+
+    def _check(self) -> None:
+        if isinstance(self.error, AdmissionRejected):
+            raise AdmissionRejected(self.error.model, self.error.priority, self.error.queued)
+        if self.error is not None:
+            raise RuntimeError(f"Coalesced generation failed: {self.error}") from self.error
+
+    def stream(self):
+        """Blocking iterator over all chunks, from the first one."""
+        i = 0
+        while True:
+            with self._cond:
+                while i == len(self.chunks) and not self.done:
+                    self._cond.wait()
+                batch, i = self.chunks[i:], len(self.chunks)
+                done = self.done
+            yield from batch
+            if done:
+                self._check()
+                return
+
+    async def astream(self) -> AsyncIterator[str]:
+        """Async iterator over all chunks, from the first one."""
+        loop = asyncio.get_running_loop()
+        i = 0
+        while True:
+            with self._cond:
+                batch, i = self.chunks[i:], len(self.chunks)
+                done = self.done
+                fut = None
+                if not batch and not done:
+                    fut = loop.create_future()
+                    self._async_waiters.append((loop, fut))
+            for chunk in batch:
+                yield chunk
+            if done:
+                self._check()
+                return
+            if fut is not None:
+                await fut
+
+    def result(self) -> str:
+        for _ in self.stream():
+            pass
+        return self.text()
+
+    async def aresult(self) -> str:
+        async for _ in self.astream():
+            pass
+        return self.text()
+
+
+def _resolve(fut: asyncio.Future) -> None:
+    if not fut.done():
+        fut.set_result(None)
+
+
+_flights: dict[Hashable, Flight] = {}
+_flights_lock = threading.Lock()
+_leader_tasks: set[asyncio.Task] = set()
+_stats = {"leaders": 0, "followers": 0}
+
+
+def _join(key: Hashable, priority: int) -> tuple[Flight, bool]:
+    """The in-flight generation for `key` and whether the caller must lead it."""
+    with _flights_lock:
+        flight = _flights.get(key)
+        if flight is not None:
+            _stats["followers"] += 1
+            SINGLEFLIGHT_JOINS.labels("follower").inc()
+            flight.priority.raise_to(priority)
+            return flight, False
+        flight = _flights[key] = Flight(priority)
+        _stats["leaders"] += 1
+        SINGLEFLIGHT_JOINS.labels("leader").inc()
+        return flight, True
+
+
+def _retire(key: Hashable, flight: Flight, error: BaseException | None = None) -> None:
+    with _flights_lock:
+        if _flights.get(key) is flight:
+            del _flights[key]
+    flight.finish(error)
+
+
+def _lead_sync(flight: Flight, key: Hashable, patient_id: str, question: str, store: bool, priority: int) -> None:
+    token = llm_priority.set(priority)
+    shared_token = llm_shared_priority.set(flight.priority)
+    track_context(flight.context)
+    try:
+        for chunk in get_doctor_chain(patient_id=patient_id, streaming=True).stream(question):
+            if chunk:
+                flight.publish(chunk)
+    except BaseException as e:
+        _retire(key, flight, e)
+        raise
+    finally:
+        llm_shared_priority.reset(shared_token)
+        llm_priority.reset(token)
+    if store:
+        store_result(key, flight.text())
+    _retire(key, flight)
+
+
+async def _lead_async(flight: Flight, key: Hashable, patient_id: str, question: str, store: bool, priority: int) -> None:
+    llm_priority.set(priority)  # this task's own context
+    llm_shared_priority.set(flight.priority)
+    track_context(flight.context)
+    try:
+        async for chunk in get_doctor_chain(patient_id=patient_id, streaming=True).astream(question):
+            if chunk:
+                flight.publish(chunk)
+    except BaseException as e:
+        _retire(key, flight, e)
+        if isinstance(e, asyncio.CancelledError):
+            raise
+        return
+    if store:
+        store_result(key, flight.text())
+    _retire(key, flight)
+
+
+def _start_async_leader(flight: Flight, key: Hashable, patient_id: str, question: str, store: bool, priority: int) -> None:
+    task = asyncio.get_running_loop().create_task(_lead_async(flight, key, patient_id, question, store, priority))
+    _leader_tasks.add(task)
+    task.add_done_callback(_leader_tasks.discard)
+
+
+def _attach(flight: Flight, leader: bool, report: ContextReport | None) -> None:
+    if leader:
+        flight.context = report if report is not None else ContextReport()
+
+
+def _copy_context(flight: Flight, leader: bool, report: ContextReport | None) -> None:
+    if not leader and report is not None and flight.context is not None:
+        report.update_from(flight.context)
+
+
+def generate(
+    patient_id: str,
+    question: str,
+    key: Hashable,
+    store: bool = False,
+    priority: int = INTERACTIVE,
+    report: ContextReport | None = None,
+) -> str:
+    """Blocking generation that joins an identical in-flight one (job workers)."""
+    flight, leader = _join(key, priority)
+    _attach(flight, leader, report)
+    if leader:
+        _lead_sync(flight, key, patient_id, question, store, priority)
+    answer = flight.result()
+    _copy_context(flight, leader, report)
+    return answer
+
+
+async def agenerate(
+    patient_id: str,
+    question: str,
+    key: Hashable,
+    store: bool = False,
+    priority: int = INTERACTIVE,
+    report: ContextReport | None = None,
+) -> str:
+    """Async generation that joins an identical in-flight one; `report` receives the packed-context stats."""
+    flight, leader = _join(key, priority)
+    _attach(flight, leader, report)
+    if leader:
+        _start_async_leader(flight, key, patient_id, question, store, priority)
+    answer = await flight.aresult()
+    _copy_context(flight, leader, report)
+    return answer
+
+
+async def astream(
+    patient_id: str,
+    question: str,
+    key: Hashable,
+    store: bool = False,
+    priority: int = INTERACTIVE,
+    report: ContextReport | None = None,
+) -> AsyncIterator[str]:
+    """Token chunks of a generation, shared with any identical in-flight request."""
+    flight, leader = _join(key, priority)
+    _attach(flight, leader, report)
+    if leader:
+        _start_async_leader(flight, key, patient_id, question, store, priority)
+    async for chunk in flight.astream():
+        yield chunk
+    _copy_context(flight, leader, report)
+
+
+def singleflight_stats() -> dict:
+    with _flights_lock:
+        return {"in_flight": len(_flights), **_stats}
@@ -1,37 +1,83 @@
 import warnings
 from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
 from langchain_core.documents import Document
 from langchain_community.vectorstores import SupabaseVectorStore
 
+from .metrics import stage_timer
+
+# Metadata key under which the stored pgvector embedding of a match is attached,
+# so downstream stages (redundancy filter) can reuse it instead of re-embedding.
+EMBEDDING_KEY = "_embedding"
+
+# Metadata key for the match's cosine similarity to the query, attached by the
+# retriever so the context packer can rank chunks without re-scoring them.
+SCORE_KEY = "_similarity"
+
+
+def parse_vector(value: Any) -> Optional[np.ndarray]:
+    """PostgREST returns pgvector columns as their text form '[0.1,0.2,...]'."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        vec = np.fromstring(value.strip("[]"), dtype=np.float32, sep=",")
+    else:
+        vec = np.asarray(value, dtype=np.float32)
+    return vec if vec.size else None
+
+
+def _match_metadata(search: Dict[str, Any]) -> Dict[str, Any]:
+    metadata = dict(search.get("metadata") or {})
+    vec = parse_vector(search.get("embedding"))
+    if vec is not None:
+        metadata[EMBEDDING_KEY] = vec
+    return metadata
+
 
 class SupabaseVectorStoreFixed(SupabaseVectorStore):
-    def _match_args(self, query: List[float], filter: Optional[Dict[str, Any]], k: int) -> Dict[str, Any]:
+    def __init__(self, *args: Any, probes: Optional[int] = None, ef_search: Optional[int] = None, **kwargs: Any) -> None:
+        """
+        probes / ef_search are the default ivfflat.probes / hnsw.ef_search sent
+        with every match RPC (None → server default); searches can override them.
+        """
+        super().__init__(*args, **kwargs)
+        self.probes = probes
+        self.ef_search = ef_search
+
+    def _match_args(
+        self,
+        query: List[float],
+        filter: Optional[Dict[str, Any]],
+        k: int,
+        probes: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> Dict[str, Any]:
         ret: Dict[str, Any] = {"query_embedding": query, "limit": k}
         if filter:
             ret["filter"] = filter
+        probes = probes if probes is not None else self.probes
+        ef_search = ef_search if ef_search is not None else self.ef_search
+        if probes is not None:
+            ret["probes"] = probes
+        if ef_search is not None:
+            ret["ef_search"] = ef_search
         return ret
 
-    def similarity_search_by_vector_with_relevance_scores(
-        self,
-        query: List[float],
-        k: int = 4,
-        filter: Optional[Dict[str, Any]] = None,
-        postgrest_filter: Optional[str] = None,
+    @staticmethod
+    def _match_results(
+        rows: List[Dict[str, Any]],
         score_threshold: Optional[float] = None,
     ) -> List[Tuple[Document, float]]:
-        params = self._match_args(query, filter, k)
-        res = self._client.rpc(self.query_name, params).execute()
-
         match_result = [
             (
                 Document(
-                    metadata=search.get("metadata", {}),
+                    metadata=_match_metadata(search),
                     page_content=search.get("content", ""),
                 ),
                 search.get("similarity", 0.0),
             )
-            for search in res.data
+            for search in rows
             if search.get("content")
         ]
 
@@ -44,3 +90,68 @@ class SupabaseVectorStoreFixed(SupabaseVectorStore):
                     f"No relevant docs retrieved with score threshold {score_threshold}"
                 )
         return match_result
+
+    def similarity_search_by_vector_with_relevance_scores(
+        self,
+        query: List[float],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        postgrest_filter: Optional[str] = None,
+        score_threshold: Optional[float] = None,
+        probes: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> List[Tuple[Document, float]]:
+        params = self._match_args(query, filter, k, probes=probes, ef_search=ef_search)
+        with stage_timer("vector_search"):
+            res = self._client.rpc(self.query_name, params).execute()
+        return self._match_results(res.data, score_threshold)
+
+    async def asimilarity_search_by_vector_with_relevance_scores(
+        self,
+        query: List[float],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        postgrest_filter: Optional[str] = None,
+        score_threshold: Optional[float] = None,
+        probes: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> List[Tuple[Document, float]]:
+        # Imported here to avoid a circular import (vectorstore imports this module).
+        from .vectorstore import get_async_supabase_client
+
+        client = await get_async_supabase_client()
+        params = self._match_args(query, filter, k, probes=probes, ef_search=ef_search)
+        with stage_timer("vector_search"):
+            res = await client.rpc(self.query_name, params).execute()
+        return self._match_results(res.data, score_threshold)
+
+    async def asimilarity_search_with_relevance_scores(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        vector = await self._embedding.aembed_query(query)
+        return await self.asimilarity_search_by_vector_with_relevance_scores(
+            vector, k=k, filter=filter, **kwargs
+        )
+
+    def get_chunk_hashes(self, filter: Dict[str, Any]) -> Dict[str, Optional[str]]:
+        """
+        Map row id → metadata.content_hash for every row whose metadata matches
+        `filter` (equality on top-level keys).  Rows ingested before hashing
+        was introduced map to None.
+        """
+        query = self._client.table(self.table_name).select("id, content_hash:metadata->>content_hash")
+        for key, value in filter.items():
+            query = query.eq(f"metadata->>{key}", value)
+        res = query.execute()
+        return {str(row["id"]): row.get("content_hash") for row in (res.data or [])}
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> None:
+        """Delete rows by id in batched `id=in.(...)` requests."""
+        if ids is None:
+            raise ValueError("No ids provided to delete.")
+        for i in range(0, len(ids), self.chunk_size):
+            self._client.table(self.table_name).delete().in_("id", ids[i:i + self.chunk_size]).execute()
@@ -11,6 +11,11 @@ Why separate tables?
   Keeps access control clean: the patient portal only ever touches rag_patient_records
   filtered to the logged-in user's ID.  The doctor portal can query both.
 
+Backends (VECTOR_BACKEND):
+  supabase — pgvector tables + match_rag_* RPCs (default)
+  local    — LocalVectorStore, an in-process memory-mapped index per table
+             (see local_vectorstore.py); same filtering, no network hop
+
 Schema:
   See supabase/schema.sql for the CREATE TABLE and match_documents() RPC that
   LangChain calls under the hood.
@@ -18,49 +23,100 @@ Schema:
 TODO: replace placeholder credentials in .env before using in production.
 """
 
+import asyncio
 from functools import lru_cache
-from supabase import create_client, Client
+from typing import TYPE_CHECKING
+
 from .supabase_vectorstore import SupabaseVectorStoreFixed as SupabaseVectorStore
 from langchain_core.vectorstores import VectorStore
 
 from .config import settings
 from .embeddings import get_embeddings
 
+if TYPE_CHECKING:
+    from supabase import AsyncClient, Client
+
+    from .local_vectorstore import LocalVectorStore
+
 
 @lru_cache(maxsize=1)
-def get_supabase_client() -> Client:
+def get_supabase_client() -> "Client":
     """Singleton Supabase client — reuses the HTTP connection pool."""
+    from supabase import create_client  # deferred with the client (see warmup.py)
+
     return create_client(settings.supabase_url, settings.supabase_service_key)
 
 
-def _supabase_client() -> Client:
+_async_client: "AsyncClient | None" = None
+_async_client_lock = asyncio.Lock()
+
+
+async def get_async_supabase_client() -> "AsyncClient":
+    """
+    Singleton async Supabase client for the FastAPI request path.
+    Created lazily on first await because client construction is itself async.
+    """
+    global _async_client
+    if _async_client is None:
+        async with _async_client_lock:
+            if _async_client is None:
+                from supabase import acreate_client
+
+                _async_client = await acreate_client(settings.supabase_url, settings.supabase_service_key)
+    return _async_client
+
+
+def _supabase_client() -> "Client":
     return get_supabase_client()
 
 
+@lru_cache(maxsize=None)
+def get_local_store(table_name: str) -> "LocalVectorStore":
+    """One shared in-process index per table (loaded once, then kept in memory)."""
+    from .local_vectorstore import LocalVectorStore  # deferred: only the local backend needs it
+
+    return LocalVectorStore(
+        embedding=get_embeddings(),
+        table_name=table_name,
+        index_dir=settings.local_index_dir,
+        mode=settings.local_index_mode,
+        ivf_lists=settings.local_ivf_lists,
+        ivf_probes=settings.local_ivf_probes,
+    )
+
+
 def get_documents_store() -> VectorStore:
     """
     Vector store for the shared disease-knowledge base.
     Used by both patient and doctor chatbots for disease-level context
     (e.g. 'What triggers flares in NMOSD?').
     """
+    if settings.vector_backend == "local":
+        return get_local_store(settings.documents_table)
     client = _supabase_client()
     return SupabaseVectorStore(
         client=client,
         embedding=get_embeddings(),
         table_name=settings.documents_table,
         query_name="match_rag_documents",   # SQL function defined in schema.sql
+        probes=settings.pgvector_probes,
+        ef_search=settings.pgvector_ef_search,
     )
 
 
 def get_patient_records_store(patient_id: str) -> VectorStore:
     """
     Vector store for per-patient clinical data.
-    Filter (user_id) is passed via retriever search_kwargs in retriever.py.
+    Filter (user_id) is applied per search by DualStoreRetriever in retriever.py.
     """
+    if settings.vector_backend == "local":
+        return get_local_store(settings.patient_records_table)
     client = _supabase_client()
     return SupabaseVectorStore(
         client=client,
         embedding=get_embeddings(),
         table_name=settings.patient_records_table,
         query_name="match_rag_patient_records",
+        probes=settings.pgvector_probes,
+        ef_search=settings.pgvector_ef_search,
     )
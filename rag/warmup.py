@@ -0,0 +1,114 @@
+"""
+warmup.py — Warm connections and models after startup; readiness for /ready.
+
+The rag package imports its heavy dependencies lazily (see rag/__init__.py),
+so the API starts quickly, but the first requests would still pay for the
+Supabase client, loading the models into Ollama and loading the tokenizer.
+On startup the API runs warm_up() in the background:
+
+  supabase    async client created and one roster row read
+  embeddings  one query embedded (loads the embedding model in Ollama)
+  llm         the doctor model (the only chat model the API serves) preloaded
+              with an empty generate, Ollama's documented way to load a model
+              (same num_ctx as the chains, so no reload)
+  tokenizer   the context packer's tiktoken encoding (the chars/4 fallback counts)
+
+Each check retries every WARMUP_RETRY_SECONDS until it passes.  /ready
+answers 200 once all of them have, 503 before that, so an autoscaler only
+routes traffic to warmed pods; /health stays the liveness probe.
+WARMUP_MODELS=false skips the llm check (e.g. when Ollama is shared and
+already warm).
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import asdict, dataclass
+from typing import Awaitable, Callable
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CheckState:
+    ready: bool = False
+    attempts: int = 0
+    ready_after_seconds: float | None = None   # since warm-up started
+    error: str | None = None
+
+
+_checks: dict[str, CheckState] = {}
+_started_at: float | None = None
+
+
+async def _supabase() -> None:
+    from .roster import afetch_patient_roster
+
+    await afetch_patient_roster(limit=1)
+
+
+async def _embeddings() -> None:
+    from .embeddings import get_embeddings
+
+    await get_embeddings().aembed_query("warm-up")
+
+
+async def _llm() -> None:
+    from ollama import AsyncClient
+
+    from .llm import NUM_CTX
+
+    client = AsyncClient(host=settings.ollama_base_url)
+    await client.generate(model=settings.doctor_model, prompt="", keep_alive="10m", options={"num_ctx": NUM_CTX})
+
+
+async def _tokenizer() -> None:
+    from .context_packer import count_tokens
+
+    await asyncio.to_thread(count_tokens, "warm-up")
+
+
+def _warmup_checks() -> dict[str, Callable[[], Awaitable[None]]]:
+    checks = {"supabase": _supabase, "embeddings": _embeddings, "tokenizer": _tokenizer}
+    if settings.warmup_models:
+        checks["llm"] = _llm
+    return checks
+
+
+async def _run_check(name: str, check: Callable[[], Awaitable[None]]) -> None:
+    state = _checks[name]
+    while True:
+        state.attempts += 1
+        try:
+            await check()
+        except Exception as e:
+            state.error = str(e) or type(e).__name__
+            logger.warning("warm-up %s failed (attempt %d): %s", name, state.attempts, state.error)
+            await asyncio.sleep(settings.warmup_retry_seconds)
+            continue
+        state.ready, state.error = True, None
+        state.ready_after_seconds = round(time.monotonic() - _started_at, 3)
+        return
+
+
+async def warm_up() -> None:
+    """Run every warm-up check concurrently, retrying each until it passes."""
+    global _started_at
+    _started_at = time.monotonic()
+    checks = _warmup_checks()
+    for name in checks:
+        _checks[name] = CheckState()
+    await asyncio.gather(*[_run_check(name, check) for name, check in checks.items()])
+    logger.info("warm-up complete in %.2fs", time.monotonic() - _started_at)
+
+
+def readiness() -> dict:
+    """{"ready": bool, "checks": {name: state}}; ready before warm-up starts only if it is disabled."""
+    if not settings.warmup_enabled:
+        return {"ready": True, "checks": {}}
+    return {
+        "ready": bool(_checks) and all(s.ready for s in _checks.values()),
+        "checks": {name: asdict(s) for name, s in _checks.items()},
+    }
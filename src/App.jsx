@@ -13,7 +13,7 @@ import DeviceData from "./components/shared/patient/DeviceData";
 // Doctor
 import DoctorDashboard from "./components/shared/doctor/DoctorDashboard";
 import DoctorPatientView from "./components/shared/doctor/DoctorPatientView";
-import { getPatients } from "./api";
+import { getPatientDashboard } from "./api";
 
 const patientNav = [
   { id: "home",     icon: "⊞", label: "Dashboard"      },
@@ -26,6 +26,10 @@ const doctorNav = [
   { id: "patients", icon: "⊜", label: "Patients" },
 ];
 
+// The patient portal has no sign-in yet, so it shows a fixed patient:
+// VITE_PATIENT_ID, or the patient from sql/patient_sample_data.sql.
+const PATIENT_ID = import.meta.env.VITE_PATIENT_ID || "b2c3d4e5-0000-0000-0000-000000000001";
+
 export default function App() {
   const [role, setRole] = useState(null);
   const [tab, setTab] = useState("home");
@@ -34,10 +38,8 @@ export default function App() {
 
   useEffect(() => {
     if (role === "patient") {
-      getPatients()
-        .then((patients) => {
-          if (patients?.length) setPatientUser({ id: patients[0].id, name: patients[0].name });
-        })
+      getPatientDashboard(PATIENT_ID, { includeHistory: false })
+        .then((dashboard) => setPatientUser({ id: PATIENT_ID, name: dashboard.patient?.name }))
         .catch(() => setPatientUser(null));
     } else {
       setPatientUser(null);
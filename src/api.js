@@ -18,13 +18,22 @@ async function fetchApi(path, options = {}) {
   return res.json();
 }
 
+/** The whole roster: GET /patients is paged, so follow next_cursor to the last page. */
 export async function getPatients() {
-  const data = await fetchApi('/patients');
-  return data.patients || [];
+  const patients = [];
+  let cursor = null;
+  do {
+    const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+    const data = await fetchApi(`/patients${query}`);
+    patients.push(...(data.patients || []));
+    cursor = data.next_cursor;
+  } while (cursor);
+  return patients;
 }
 
-export async function getPatientDashboard(patientId) {
-  return fetchApi(`/patients/${patientId}/dashboard`);
+export async function getPatientDashboard(patientId, { includeHistory = true } = {}) {
+  const query = includeHistory ? '' : '?include_history=false';
+  return fetchApi(`/patients/${patientId}/dashboard${query}`);
 }
 
 export async function getPatientSummary(patientId) {
@@ -49,6 +58,14 @@ export async function postSymptomLogs(patientId, entries) {
   });
 }
 
+/** Upload queued offline events; each needs a stable idempotency_key so retries are safe. */
+export async function postPatientSync(patientId, { symptoms = [], adherence = [] }) {
+  return fetchApi(`/patients/${patientId}/sync`, {
+    method: 'POST',
+    body: JSON.stringify({ symptoms, adherence }),
+  });
+}
+
 export async function chat(patientId, question) {
   const data = await fetchApi('/chat', {
     method: 'POST',
@@ -56,3 +73,54 @@ export async function chat(patientId, question) {
   });
   return data.answer;
 }
+
+/**
+ * Read a Server-Sent Events response and call onToken for every token chunk.
+ * Resolves with the full text once the server sends `event: done`.
+ */
+async function readTokenStream(res, onToken) {
+  if (!res.ok) {
+    const err = await res.json().catch(() => ({ detail: res.statusText }));
+    throw new Error(err.detail || res.statusText);
+  }
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let text = '';
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const events = buffer.split('\n\n');
+    buffer = events.pop();
+    for (const raw of events) {
+      const lines = raw.split('\n');
+      const event = lines.find((l) => l.startsWith('event: '))?.slice(7);
+      const data = JSON.parse(lines.find((l) => l.startsWith('data: '))?.slice(6) || '{}');
+      if (event === 'error') throw new Error(data.detail || 'Stream failed');
+      if (event === 'done') return text;
+      if (data.token) {
+        text += data.token;
+        onToken?.(data.token, text);
+      }
+    }
+  }
+  return text;
+}
+
+export async function chatStream(patientId, question, onToken) {
+  const res = await fetch(`${BASE}/chat/stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ patient_id: patientId, question }),
+  });
+  return readTokenStream(res, onToken);
+}
+
+export async function streamPatientSummary(patientId, onToken) {
+  return readTokenStream(await fetch(`${BASE}/patients/${patientId}/summary/stream`), onToken);
+}
+
+export async function streamPatientInterpretation(patientId, onToken) {
+  return readTokenStream(await fetch(`${BASE}/patients/${patientId}/interpretation/stream`), onToken);
+}
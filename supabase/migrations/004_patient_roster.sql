@@ -0,0 +1,52 @@
+-- Physician panel roster in one round trip.
+-- Replaces the per-patient appointments / symptom_logs / diseases lookups in
+-- GET /patients with a single set-based query, paged by (name, id) keyset.
+
+create index if not exists appointments_patient_scheduled_idx
+    on appointments (patient_id, scheduled_at desc);
+create index if not exists symptom_logs_patient_logged_idx
+    on symptom_logs (patient_id, logged_at desc);
+create index if not exists patients_name_id_idx
+    on patients (name, id);
+
+create or replace function patient_roster(
+    after_name  text default null,
+    after_id    uuid default null,
+    page_size   int  default 100
+)
+returns table (
+    id                   uuid,
+    name                 text,
+    condition            text,
+    last_visit_at        timestamptz,
+    max_recent_severity  int
+)
+language sql stable as $$
+    select
+        p.id,
+        p.name,
+        coalesce(d.name, 'Unknown') as condition,
+        apt.last_visit_at,
+        coalesce(sev.max_severity, 0) as max_recent_severity
+    from patients p
+    left join diseases d on d.id = p.disease_id
+    left join lateral (
+        select max(a.scheduled_at) as last_visit_at
+        from appointments a
+        where a.patient_id = p.id
+    ) apt on true
+    left join lateral (
+        select max(recent.severity)::int as max_severity
+        from (
+            select sl.severity
+            from symptom_logs sl
+            where sl.patient_id = p.id
+            order by sl.logged_at desc
+            limit 5
+        ) recent
+    ) sev on true
+    where after_id is null
+       or (p.name, p.id) > (after_name, after_id)
+    order by p.name, p.id
+    limit page_size;
+$$;
@@ -0,0 +1,44 @@
+-- Return the stored embedding with every match so the API can deduplicate
+-- retrieved chunks on the vectors already in pgvector instead of re-embedding
+-- them through Ollama.  The return type changes, so the functions are dropped
+-- and recreated.
+
+DROP FUNCTION IF EXISTS match_rag_documents(vector, jsonb, integer);
+DROP FUNCTION IF EXISTS match_rag_patient_records(vector, jsonb, integer);
+
+create or replace function match_rag_documents(
+    query_embedding  vector(768),
+    filter           jsonb default '{}',
+    "limit"          int   default 5
+)
+returns table (id uuid, content text, metadata jsonb, embedding vector(768), similarity float)
+language plpgsql as $$
+begin
+    return query
+    select d.id, d.content, d.metadata, d.embedding,
+           1 - (d.embedding <=> query_embedding) as similarity
+    from rag_documents d
+    where d.metadata @> filter
+    order by d.embedding <=> query_embedding
+    limit "limit";
+end;
+$$;
+
+create or replace function match_rag_patient_records(
+    query_embedding  vector(768),
+    filter           jsonb default '{}',
+    "limit"          int   default 5
+)
+returns table (id uuid, content text, metadata jsonb, embedding vector(768), similarity float)
+language plpgsql as $$
+begin
+    return query
+    select r.id, r.content, r.metadata, r.embedding,
+           1 - (r.embedding <=> query_embedding) as similarity
+    from rag_patient_records r
+    where (r.metadata->>'user_id') = (filter->>'user_id')
+      and r.metadata @> (filter - 'user_id')
+    order by r.embedding <=> query_embedding
+    limit "limit";
+end;
+$$;
@@ -0,0 +1,154 @@
+-- HNSW indexes + per-query recall/speed knobs for the match_rag_* RPCs,
+-- and index-health / rebuild helpers used by `python -m rag.maintenance`.
+--
+-- ivfflat clusters are fixed at build time, so recall degrades as rows are
+-- added afterwards; HNSW keeps its quality under inserts.  The ivfflat
+-- indexes are replaced (recreate them with 002's statements to roll back).
+
+create index if not exists rag_documents_embedding_hnsw_idx
+    on rag_documents using hnsw (embedding vector_cosine_ops) with (m = 16, ef_construction = 64);
+create index if not exists rag_patient_records_embedding_hnsw_idx
+    on rag_patient_records using hnsw (embedding vector_cosine_ops) with (m = 16, ef_construction = 64);
+
+drop index if exists rag_documents_embedding_idx;
+drop index if exists rag_patient_records_embedding_idx;
+
+-- probes    → ivfflat.probes  (lists scanned; higher = better recall, slower)
+-- ef_search → hnsw.ef_search  (candidate list size; higher = better recall, slower)
+-- Both are set transaction-locally, so they only affect this call.
+
+DROP FUNCTION IF EXISTS match_rag_documents(vector, jsonb, integer);
+DROP FUNCTION IF EXISTS match_rag_patient_records(vector, jsonb, integer);
+
+create or replace function match_rag_documents(
+    query_embedding  vector(768),
+    filter           jsonb default '{}',
+    "limit"          int   default 5,
+    probes           int   default null,
+    ef_search        int   default null
+)
+returns table (id uuid, content text, metadata jsonb, embedding vector(768), similarity float)
+language plpgsql as $$
+begin
+    if probes is not null then
+        perform set_config('ivfflat.probes', probes::text, true);
+    end if;
+    if ef_search is not null then
+        perform set_config('hnsw.ef_search', ef_search::text, true);
+    end if;
+    return query
+    select d.id, d.content, d.metadata, d.embedding,
+           1 - (d.embedding <=> query_embedding) as similarity
+    from rag_documents d
+    where d.metadata @> filter
+    order by d.embedding <=> query_embedding
+    limit "limit";
+end;
+$$;
+
+create or replace function match_rag_patient_records(
+    query_embedding  vector(768),
+    filter           jsonb default '{}',
+    "limit"          int   default 5,
+    probes           int   default null,
+    ef_search        int   default null
+)
+returns table (id uuid, content text, metadata jsonb, embedding vector(768), similarity float)
+language plpgsql as $$
+begin
+    if probes is not null then
+        perform set_config('ivfflat.probes', probes::text, true);
+    end if;
+    if ef_search is not null then
+        perform set_config('hnsw.ef_search', ef_search::text, true);
+    end if;
+    return query
+    select r.id, r.content, r.metadata, r.embedding,
+           1 - (r.embedding <=> query_embedding) as similarity
+    from rag_patient_records r
+    where (r.metadata->>'user_id') = (filter->>'user_id')
+      and r.metadata @> (filter - 'user_id')
+    order by r.embedding <=> query_embedding
+    limit "limit";
+end;
+$$;
+
+-- Row count at the last (re)build of each vector index.
+create table if not exists rag_index_builds (
+    index_name     text         primary key,
+    rows_at_build  bigint       not null,
+    built_at       timestamptz  not null default now()
+);
+-- No policies: only the service role (which bypasses RLS) reads or writes it.
+alter table rag_index_builds enable row level security;
+
+create or replace function rag_index_health()
+returns table (
+    table_name     text,
+    index_name     text,
+    index_method   text,
+    index_options  text[],
+    index_bytes    bigint,
+    live_rows      bigint,
+    dead_rows      bigint,
+    rows_at_build  bigint,
+    built_at       timestamptz
+)
+language sql stable security definer
+set search_path = public, pg_temp as $$
+    select
+        t.relname::text,
+        i.relname::text,
+        am.amname::text,
+        i.reloptions,
+        pg_relation_size(i.oid),
+        coalesce(s.n_live_tup, 0),
+        coalesce(s.n_dead_tup, 0),
+        b.rows_at_build,
+        b.built_at
+    from pg_index x
+    join pg_class i on i.oid = x.indexrelid
+    join pg_class t on t.oid = x.indrelid
+    join pg_am am on am.oid = i.relam
+    left join pg_stat_user_tables s on s.relid = t.oid
+    left join rag_index_builds b on b.index_name = i.relname
+    where t.relname in ('rag_documents', 'rag_patient_records')
+      and am.amname in ('ivfflat', 'hnsw');
+$$;
+
+create or replace function rebuild_rag_index(target_index text)
+returns void
+language plpgsql security definer
+set search_path = public, pg_temp as $$
+declare
+    target_table text;
+    row_count    bigint;
+begin
+    select t.relname into target_table
+    from pg_index x
+    join pg_class i on i.oid = x.indexrelid
+    join pg_class t on t.oid = x.indrelid
+    where i.relname = target_index
+      and t.relname in ('rag_documents', 'rag_patient_records');
+    if target_table is null then
+        raise exception 'Not a RAG vector index: %', target_index;
+    end if;
+
+    execute format('reindex index %I', target_index);
+    execute format('analyze %I', target_table);
+    execute format('select count(*) from %I', target_table) into row_count;
+
+    insert into rag_index_builds (index_name, rows_at_build, built_at)
+    values (target_index, row_count, now())
+    on conflict (index_name) do update
+        set rows_at_build = excluded.rows_at_build, built_at = excluded.built_at;
+end;
+$$;
+
+-- Maintenance only (rag.maintenance runs with the service-role key).  Functions
+-- are executable by PUBLIC by default and Supabase also grants anon /
+-- authenticated, which would let the public anon key trigger a blocking reindex.
+revoke execute on function rag_index_health() from public, anon, authenticated;
+revoke execute on function rebuild_rag_index(text) from public, anon, authenticated;
+grant execute on function rag_index_health() to service_role;
+grant execute on function rebuild_rag_index(text) to service_role;
@@ -0,0 +1,87 @@
+-- Whole patient bundle in one round trip for fetch_patient_data (dashboard / RAG context).
+-- Returns the same shape the PostgREST queries produce: embedded relations are
+-- nested objects ({"name": ...}) and list ordering matches the API's queries.
+-- p_since limits adherence and symptom logs to that window; null (the
+-- dashboard and RAG context) returns the full history.
+
+create index if not exists medications_patient_idx on medications (patient_id);
+create index if not exists adherence_medication_date_idx
+    on medication_adherence_logs (medication_id, logged_date desc);
+create index if not exists calendar_events_patient_event_idx
+    on calendar_events (patient_id, event_at);
+create index if not exists treatments_symptom_idx on treatments (symptom_id) where worked;
+
+drop function if exists get_patient_bundle(uuid);
+
+create or replace function get_patient_bundle(p_patient_id uuid, p_since date default null)
+returns jsonb
+language sql stable as $$
+    select jsonb_build_object(
+        'patient', (
+            select jsonb_build_object('id', p.id, 'name', p.name, 'disease_id', p.disease_id)
+            from patients p where p.id = p_patient_id
+        ),
+        'disease', (
+            select jsonb_build_object('id', d.id, 'name', d.name)
+            from patients p join diseases d on d.id = p.disease_id
+            where p.id = p_patient_id
+        ),
+        'medications', coalesce((
+            select jsonb_agg(jsonb_build_object(
+                'id', m.id, 'name', m.name, 'dosage', m.dosage, 'frequency', m.frequency,
+                'symptom_id', m.symptom_id,
+                'symptoms', case when s.id is null then null else jsonb_build_object('name', s.name) end
+            ))
+            from medications m left join symptoms s on s.id = m.symptom_id
+            where m.patient_id = p_patient_id
+        ), '[]'::jsonb),
+        'adherence', coalesce((
+            select jsonb_agg(jsonb_build_object(
+                'medication_id', a.medication_id, 'logged_date', a.logged_date,
+                'taken', a.taken, 'notes', a.notes,
+                'medications', jsonb_build_object('name', m.name)
+            ) order by a.logged_date desc)
+            from medication_adherence_logs a join medications m on m.id = a.medication_id
+            where m.patient_id = p_patient_id
+              and (p_since is null or a.logged_date >= p_since)
+        ), '[]'::jsonb),
+        'appointments', coalesce((
+            select jsonb_agg(jsonb_build_object(
+                'scheduled_at', ap.scheduled_at, 'physician', ap.physician,
+                'visit_type', ap.visit_type, 'notes', ap.notes
+            ) order by ap.scheduled_at)
+            from appointments ap where ap.patient_id = p_patient_id
+        ), '[]'::jsonb),
+        'symptom_logs', coalesce((
+            select jsonb_agg(jsonb_build_object(
+                'logged_at', sl.logged_at, 'severity', sl.severity, 'notes', sl.notes,
+                'curated_by', sl.curated_by,
+                'symptoms', case when s.id is null then null else jsonb_build_object('name', s.name) end
+            ) order by sl.logged_at desc)
+            from symptom_logs sl left join symptoms s on s.id = sl.symptom_id
+            where sl.patient_id = p_patient_id
+              and (p_since is null or sl.logged_at >= p_since)
+        ), '[]'::jsonb),
+        'calendar', coalesce((
+            select jsonb_agg(jsonb_build_object(
+                'event_at', c.event_at, 'title', c.title,
+                'description', c.description, 'event_type', c.event_type
+            ) order by c.event_at)
+            from calendar_events c where c.patient_id = p_patient_id
+        ), '[]'::jsonb),
+        'treatments', coalesce((
+            select jsonb_agg(t.obj)
+            from (
+                select jsonb_build_object(
+                    'physician', tr.physician, 'treatment', tr.treatment, 'worked', tr.worked,
+                    'symptoms', jsonb_build_object('name', s.name)
+                ) as obj
+                from treatments tr
+                join symptoms s on s.id = tr.symptom_id
+                join patients p on p.disease_id = s.disease_id
+                where p.id = p_patient_id and tr.worked
+                limit 10
+            ) t
+        ), '[]'::jsonb)
+    );
+$$;
@@ -0,0 +1,232 @@
+-- Per patient/day rollups of symptom and adherence metrics.
+-- Maintained on write by row triggers (inserts adjust the day in place; updates
+-- and deletes recompute just that day), so the dashboard reads
+-- O(days shown) rollup rows instead of the patient's whole raw history.
+-- Days are UTC calendar days, matching the timestamps PostgREST returns.
+--
+-- Backfill existing data once after applying:
+--     python -m rag.rollups backfill            (or: select backfill_patient_daily_rollups();)
+
+create table if not exists patient_daily_rollups (
+    patient_id    uuid         not null references patients(id) on delete cascade,
+    day           date         not null,
+    max_severity  smallint     not null default 0,
+    log_count     int          not null default 0,
+    flare         boolean      not null default false,   -- any log with severity > 4
+    doses_taken   int          not null default 0,
+    doses_total   int          not null default 0,
+    updated_at    timestamptz  not null default now(),
+    primary key (patient_id, day)
+);
+
+create index if not exists symptom_logs_patient_symptom_idx
+    on symptom_logs (patient_id, symptom_id);
+
+create or replace function refresh_patient_daily_rollup(p_patient_id uuid, p_day date)
+returns void
+language plpgsql as $$
+declare
+    sev_max  int;
+    n_logs   int;
+    n_taken  int;
+    n_total  int;
+begin
+    if p_patient_id is null or p_day is null then
+        return;
+    end if;
+
+    select coalesce(max(sl.severity), 0), count(*)
+      into sev_max, n_logs
+    from symptom_logs sl
+    where sl.patient_id = p_patient_id
+      and sl.logged_at >= (p_day::timestamp at time zone 'UTC')
+      and sl.logged_at <  ((p_day + 1)::timestamp at time zone 'UTC');
+
+    select count(*) filter (where a.taken), count(*)
+      into n_taken, n_total
+    from medication_adherence_logs a
+    join medications m on m.id = a.medication_id
+    where m.patient_id = p_patient_id
+      and a.logged_date = p_day;
+
+    if n_logs = 0 and n_total = 0 then
+        delete from patient_daily_rollups where patient_id = p_patient_id and day = p_day;
+    else
+        insert into patient_daily_rollups
+            (patient_id, day, max_severity, log_count, flare, doses_taken, doses_total, updated_at)
+        values
+            (p_patient_id, p_day, sev_max, n_logs, sev_max > 4, n_taken, n_total, now())
+        on conflict (patient_id, day) do update set
+            max_severity = excluded.max_severity,
+            log_count    = excluded.log_count,
+            flare        = excluded.flare,
+            doses_taken  = excluded.doses_taken,
+            doses_total  = excluded.doses_total,
+            updated_at   = now();
+    end if;
+end;
+$$;
+
+create or replace function symptom_logs_rollup_trigger()
+returns trigger
+language plpgsql as $$
+begin
+    if tg_op = 'INSERT' then
+        if new.patient_id is not null then
+            insert into patient_daily_rollups (patient_id, day, max_severity, log_count, flare)
+            values (
+                new.patient_id,
+                (new.logged_at at time zone 'UTC')::date,
+                coalesce(new.severity, 0),
+                1,
+                coalesce(new.severity, 0) > 4
+            )
+            on conflict (patient_id, day) do update set
+                max_severity = greatest(patient_daily_rollups.max_severity, excluded.max_severity),
+                log_count    = patient_daily_rollups.log_count + 1,
+                flare        = patient_daily_rollups.flare or excluded.flare,
+                updated_at   = now();
+        end if;
+        return new;
+    end if;
+
+    perform refresh_patient_daily_rollup(old.patient_id, (old.logged_at at time zone 'UTC')::date);
+    if tg_op = 'UPDATE' then
+        perform refresh_patient_daily_rollup(new.patient_id, (new.logged_at at time zone 'UTC')::date);
+        return new;
+    end if;
+    return old;
+end;
+$$;
+
+create or replace function adherence_rollup_trigger()
+returns trigger
+language plpgsql as $$
+declare
+    pid uuid;
+begin
+    if tg_op = 'INSERT' then
+        select m.patient_id into pid from medications m where m.id = new.medication_id;
+        if pid is not null then
+            insert into patient_daily_rollups (patient_id, day, doses_taken, doses_total)
+            values (pid, new.logged_date, case when new.taken then 1 else 0 end, 1)
+            on conflict (patient_id, day) do update set
+                doses_taken = patient_daily_rollups.doses_taken + excluded.doses_taken,
+                doses_total = patient_daily_rollups.doses_total + 1,
+                updated_at  = now();
+        end if;
+        return new;
+    end if;
+
+    select m.patient_id into pid from medications m where m.id = old.medication_id;
+    perform refresh_patient_daily_rollup(pid, old.logged_date);
+    if tg_op = 'UPDATE' then
+        select m.patient_id into pid from medications m where m.id = new.medication_id;
+        perform refresh_patient_daily_rollup(pid, new.logged_date);
+        return new;
+    end if;
+    return old;
+end;
+$$;
+
+drop trigger if exists symptom_logs_rollup on symptom_logs;
+create trigger symptom_logs_rollup
+    after insert or update or delete on symptom_logs
+    for each row execute function symptom_logs_rollup_trigger();
+
+drop trigger if exists medication_adherence_rollup on medication_adherence_logs;
+create trigger medication_adherence_rollup
+    after insert or update or delete on medication_adherence_logs
+    for each row execute function adherence_rollup_trigger();
+
+-- Rebuild rollups from raw rows for one patient (or everyone when null).
+create or replace function backfill_patient_daily_rollups(p_patient_id uuid default null)
+returns bigint
+language plpgsql as $$
+declare
+    n bigint;
+begin
+    delete from patient_daily_rollups
+    where p_patient_id is null or patient_id = p_patient_id;
+
+    insert into patient_daily_rollups
+        (patient_id, day, max_severity, log_count, flare, doses_taken, doses_total)
+    select patient_id, day, max(max_severity), sum(log_count), bool_or(flare), sum(doses_taken), sum(doses_total)
+    from (
+        select sl.patient_id,
+               (sl.logged_at at time zone 'UTC')::date as day,
+               coalesce(max(sl.severity), 0)           as max_severity,
+               count(*)                                as log_count,
+               coalesce(max(sl.severity), 0) > 4       as flare,
+               0                                       as doses_taken,
+               0                                       as doses_total
+        from symptom_logs sl
+        where sl.patient_id is not null
+          and (p_patient_id is null or sl.patient_id = p_patient_id)
+        group by 1, 2
+        union all
+        select m.patient_id, a.logged_date, 0, 0, false,
+               count(*) filter (where a.taken), count(*)
+        from medication_adherence_logs a
+        join medications m on m.id = a.medication_id
+        where m.patient_id is not null
+          and (p_patient_id is null or m.patient_id = p_patient_id)
+        group by 1, 2
+    ) per_source
+    group by patient_id, day;
+
+    get diagnostics n = row_count;
+    return n;
+end;
+$$;
+
+-- Everything the dashboard charts need, bounded by the requested window.
+create or replace function get_dashboard_rollups(p_patient_id uuid, p_since date)
+returns jsonb
+language sql stable as $$
+    select jsonb_build_object(
+        'patient', (
+            select jsonb_build_object('id', p.id, 'name', p.name)
+            from patients p where p.id = p_patient_id
+        ),
+        'disease', (
+            select jsonb_build_object('id', d.id, 'name', d.name)
+            from patients p join diseases d on d.id = p.disease_id
+            where p.id = p_patient_id
+        ),
+        'days', coalesce((
+            select jsonb_agg(jsonb_build_object(
+                'day', r.day, 'max_severity', r.max_severity, 'log_count', r.log_count,
+                'flare', r.flare, 'doses_taken', r.doses_taken, 'doses_total', r.doses_total
+            ) order by r.day)
+            from patient_daily_rollups r
+            where r.patient_id = p_patient_id and r.day >= p_since
+        ), '[]'::jsonb),
+        'latest_logs', coalesce((
+            select jsonb_agg(x.obj order by x.logged_at desc)
+            from (
+                select sl.logged_at,
+                       jsonb_build_object(
+                           'logged_at', sl.logged_at, 'severity', sl.severity,
+                           'symptoms', case when s.id is null then null else jsonb_build_object('name', s.name) end
+                       ) as obj
+                from symptom_logs sl
+                left join symptoms s on s.id = sl.symptom_id
+                where sl.patient_id = p_patient_id
+                order by sl.logged_at desc
+                limit 5
+            ) x
+        ), '[]'::jsonb),
+        'symptom_names', coalesce((
+            select jsonb_agg(n.name order by n.name)
+            from (
+                select distinct s.name
+                from symptoms s
+                where exists (
+                    select 1 from symptom_logs sl
+                    where sl.patient_id = p_patient_id and sl.symptom_id = s.id
+                )
+            ) n
+        ), '[]'::jsonb)
+    );
+$$;
@@ -0,0 +1,121 @@
+-- Batched write path for patient logging.
+--   - one adherence row per medication per day, so logging is a single upsert
+--     (on_conflict=medication_id,logged_date) instead of select-then-update/insert
+--   - apply_patient_sync(): a device's offline backlog of symptom and adherence
+--     events applied in one transaction, deduplicated by idempotency key
+
+-- Collapse any duplicate (medication, day) rows before enforcing uniqueness.
+-- The table has no write timestamp, so the surviving row is simply the one
+-- stored last physically (highest ctid): usually, but not necessarily, the
+-- most recently written one, since updates and vacuum can move rows.
+delete from medication_adherence_logs a
+using medication_adherence_logs b
+where a.medication_id = b.medication_id
+  and a.logged_date = b.logged_date
+  and a.ctid < b.ctid;
+
+create unique index if not exists medication_adherence_logs_medication_day_key
+    on medication_adherence_logs (medication_id, logged_date);
+
+create index if not exists symptoms_disease_lower_name_idx
+    on symptoms (disease_id, lower(name));
+
+-- Idempotency keys of sync events already applied (a retried upload is a no-op).
+create table if not exists patient_sync_events (
+    patient_id       uuid         not null references patients(id) on delete cascade,
+    idempotency_key  text         not null,
+    kind             text         not null,
+    applied_at       timestamptz  not null default now(),
+    primary key (patient_id, idempotency_key)
+);
+
+-- p_symptoms:  [{idempotency_key, symptom_name, severity, logged_at, notes}]
+-- p_adherence: [{idempotency_key, medication_id, logged_date, taken}]
+-- Returns {"applied": n, "duplicates": n, "rejected": [{idempotency_key, reason}]}.
+-- Rejected events are not recorded, so they stay rejectable on retry.
+create or replace function apply_patient_sync(
+    p_patient_id uuid,
+    p_symptoms   jsonb default '[]'::jsonb,
+    p_adherence  jsonb default '[]'::jsonb
+)
+returns jsonb
+language plpgsql as $$
+declare
+    v_disease_id  uuid;
+    ev            jsonb;
+    v_key         text;
+    v_name        text;
+    v_severity    int;
+    v_symptom_id  uuid;
+    v_med_id      uuid;
+    n_applied     int := 0;
+    n_duplicates  int := 0;
+    rejected      jsonb := '[]'::jsonb;
+begin
+    select p.disease_id into v_disease_id from patients p where p.id = p_patient_id;
+    if not found then
+        raise exception 'Patient % not found', p_patient_id using errcode = 'P0002';
+    end if;
+
+    for ev in select * from jsonb_array_elements(coalesce(p_symptoms, '[]'::jsonb)) loop
+        v_key := ev->>'idempotency_key';
+        v_name := btrim(coalesce(ev->>'symptom_name', ''));
+        v_severity := (ev->>'severity')::int;
+        if v_name = '' or v_severity is null or v_severity < 1 or v_severity > 10 or v_disease_id is null then
+            rejected := rejected || jsonb_build_object('idempotency_key', v_key, 'reason', 'invalid symptom entry');
+            continue;
+        end if;
+
+        insert into patient_sync_events (patient_id, idempotency_key, kind)
+        values (p_patient_id, v_key, 'symptom')
+        on conflict do nothing;
+        if not found then
+            n_duplicates := n_duplicates + 1;
+            continue;
+        end if;
+
+        select s.id into v_symptom_id
+        from symptoms s
+        where s.disease_id = v_disease_id and lower(s.name) = lower(v_name)
+        limit 1;
+        if v_symptom_id is null then
+            insert into symptoms (disease_id, name) values (v_disease_id, v_name)
+            returning id into v_symptom_id;
+        end if;
+
+        insert into symptom_logs (patient_id, symptom_id, logged_at, severity, notes, curated_by)
+        values (
+            p_patient_id, v_symptom_id,
+            coalesce((ev->>'logged_at')::timestamptz, now()),
+            v_severity, nullif(ev->>'notes', ''), null
+        );
+        n_applied := n_applied + 1;
+    end loop;
+
+    for ev in select * from jsonb_array_elements(coalesce(p_adherence, '[]'::jsonb)) loop
+        v_key := ev->>'idempotency_key';
+        select m.id into v_med_id
+        from medications m
+        where m.id = (ev->>'medication_id')::uuid and m.patient_id = p_patient_id;
+        if v_med_id is null or ev->>'logged_date' is null then
+            rejected := rejected || jsonb_build_object('idempotency_key', v_key, 'reason', 'medication not found for this patient');
+            continue;
+        end if;
+
+        insert into patient_sync_events (patient_id, idempotency_key, kind)
+        values (p_patient_id, v_key, 'adherence')
+        on conflict do nothing;
+        if not found then
+            n_duplicates := n_duplicates + 1;
+            continue;
+        end if;
+
+        insert into medication_adherence_logs (medication_id, logged_date, taken)
+        values (v_med_id, (ev->>'logged_date')::date, coalesce((ev->>'taken')::boolean, true))
+        on conflict (medication_id, logged_date) do update set taken = excluded.taken;
+        n_applied := n_applied + 1;
+    end loop;
+
+    return jsonb_build_object('applied', n_applied, 'duplicates', n_duplicates, 'rejected', rejected);
+end;
+$$;
@@ -0,0 +1,77 @@
+-- Per-patient data version for the result cache (rag/result_cache.py).
+-- Cached summaries / interpretations are keyed by this counter, so it has to
+-- be shared by every API worker: row triggers bump it on every write to the
+-- tables the patient context is built from, and bump_patient_data_version()
+-- is called after the patient's RAG context is re-ingested.
+
+alter table patients add column if not exists data_version bigint not null default 0;
+
+create or replace function bump_patient_data_version(p_patient_id uuid)
+returns bigint
+language sql as $$
+    update patients set data_version = data_version + 1
+    where id = p_patient_id
+    returning data_version;
+$$;
+
+revoke execute on function bump_patient_data_version(uuid) from public, anon, authenticated;
+grant execute on function bump_patient_data_version(uuid) to service_role;
+
+-- Trigger functions update the row directly (bump_patient_data_version is
+-- service-role only) and run as their owner, so writes by any role count.
+create or replace function patient_data_version_trigger()
+returns trigger
+language plpgsql security definer
+set search_path = public, pg_temp as $$
+begin
+    update patients set data_version = data_version + 1
+    where id in (
+        case when tg_op <> 'INSERT' then old.patient_id end,
+        case when tg_op <> 'DELETE' then new.patient_id end
+    );
+    return coalesce(new, old);
+end;
+$$;
+
+-- medication_adherence_logs reaches the patient through medications
+create or replace function adherence_data_version_trigger()
+returns trigger
+language plpgsql security definer
+set search_path = public, pg_temp as $$
+begin
+    update patients set data_version = data_version + 1
+    where id in (
+        select m.patient_id from medications m
+        where m.id in (
+            case when tg_op <> 'INSERT' then old.medication_id end,
+            case when tg_op <> 'DELETE' then new.medication_id end
+        )
+    );
+    return coalesce(new, old);
+end;
+$$;
+
+drop trigger if exists symptom_logs_data_version on symptom_logs;
+create trigger symptom_logs_data_version
+    after insert or update or delete on symptom_logs
+    for each row execute function patient_data_version_trigger();
+
+drop trigger if exists medications_data_version on medications;
+create trigger medications_data_version
+    after insert or update or delete on medications
+    for each row execute function patient_data_version_trigger();
+
+drop trigger if exists appointments_data_version on appointments;
+create trigger appointments_data_version
+    after insert or update or delete on appointments
+    for each row execute function patient_data_version_trigger();
+
+drop trigger if exists calendar_events_data_version on calendar_events;
+create trigger calendar_events_data_version
+    after insert or update or delete on calendar_events
+    for each row execute function patient_data_version_trigger();
+
+drop trigger if exists medication_adherence_logs_data_version on medication_adherence_logs;
+create trigger medication_adherence_logs_data_version
+    after insert or update or delete on medication_adherence_logs
+    for each row execute function adherence_data_version_trigger();